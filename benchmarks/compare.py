@@ -0,0 +1,83 @@
+"""Compare two result files of :mod:`benchmarks.suite`.
+
+Prints the change of the median time of every benchmark measured in both
+files and exits with status 1 if any of them slowed down by more than
+``--threshold``::
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+#: Benchmarks describing the setup rather than the application.
+IGNORED = {"corpus.generate"}
+
+
+def load(path: Path) -> Tuple[Dict, Dict[Tuple[int, str], float]]:
+    """Return the metadata of a result file and its medians by size and name."""
+    report = json.loads(Path(path).read_text(encoding="utf-8"))
+    medians = {
+        (r["size"], r["benchmark"]): r["median"]
+        for r in report["results"]
+        if "median" in r and r["benchmark"] not in IGNORED
+    }
+    return report.get("meta", {}), medians
+
+
+def compare(
+    base: Dict[Tuple[int, str], float],
+    new: Dict[Tuple[int, str], float],
+    threshold: float,
+) -> List[Dict]:
+    """Return one row per benchmark present in both ``base`` and ``new``."""
+    rows = []
+    for key in sorted(base.keys() & new.keys()):
+        ratio = new[key] / base[key] if base[key] else float("inf")
+        rows.append(
+            {
+                "size": key[0],
+                "benchmark": key[1],
+                "base": base[key],
+                "new": new[key],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Allowed slowdown, 0.1 = 10%%"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON rows")
+    args = parser.parse_args()
+
+    base_meta, base = load(args.base)
+    new_meta, new = load(args.new)
+    rows = compare(base, new, args.threshold)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"base {base_meta.get('commit')}  new {new_meta.get('commit')}")
+        print(f"{'size':>8}  {'benchmark':<34}{'base (ms)':>11}{'new (ms)':>11}{'change':>9}")
+        for r in rows:
+            mark = "  !" if r["regression"] else ""
+            print(
+                f"{r['size']:>8}  {r['benchmark']:<34}{r['base'] * 1000:>11.2f}"
+                f"{r['new'] * 1000:>11.2f}{(r['ratio'] - 1) * 100:>+8.1f}%{mark}"
+            )
+    sys.exit(1 if any(r["regression"] for r in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Generate a synthetic upload directory for benchmarks.
+
+Writes ``count`` safetensors files whose headers follow the key layout of
+kohya-style SD1.5 and SDXL LoRAs, with the ``ss_*`` and ``modelspec.*``
+metadata written by common trainers, plus small PNG previews::
+
+    python -m benchmarks.corpus /tmp/corpus --count 10000
+
+Tensor data is not written; files are extended to their real size as sparse
+files, so they report realistic sizes without using the disk space. No
+tensor framework is required. Headers and previews take about 200 KiB per
+model on disk, so a corpus of 100k models needs roughly 20 GiB.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from .serialization import WORDS, make_tags
+
+#: Bytes per element of the tensor dtypes used below.
+DTYPE_SIZES = {"F16": 2, "F32": 4}
+#: Category names assigned by the benchmark suite.
+CATEGORIES = [
+    "Characters", "Styles", "Concepts", "Clothing", "Poses", "Backgrounds",
+    "Vehicles", "Animals", "Architecture", "Effects",
+]
+
+# (block prefix, channels, transformer blocks per attention) for each attention
+SD15_UNET: List[Tuple[str, int, int]] = [
+    *(
+        (f"down_blocks_{b}_attentions_{a}", ch, 1)
+        for b, ch in enumerate((320, 640, 1280))
+        for a in range(2)
+    ),
+    ("mid_block_attentions_0", 1280, 1),
+    *(
+        (f"up_blocks_{b}_attentions_{a}", ch, 1)
+        for b, ch in ((1, 1280), (2, 640), (3, 320))
+        for a in range(3)
+    ),
+]
+SDXL_UNET: List[Tuple[str, int, int]] = [
+    *((f"down_blocks_1_attentions_{a}", 640, 2) for a in range(2)),
+    *((f"down_blocks_2_attentions_{a}", 1280, 10) for a in range(2)),
+    ("mid_block_attentions_0", 1280, 10),
+    *((f"up_blocks_0_attentions_{a}", 1280, 10) for a in range(3)),
+    *((f"up_blocks_1_attentions_{a}", 640, 2) for a in range(3)),
+]
+
+
+@dataclass(frozen=True)
+class Layout:
+    """Key layout of one model family."""
+
+    base_model: str
+    architecture: str
+    unet: List[Tuple[str, int, int]]
+    context_dim: int
+    #: (key prefix, hidden size, layers) of each text encoder
+    text_encoders: List[Tuple[str, int, int]]
+
+
+LAYOUTS = {
+    "sd15": Layout(
+        "sd_v1",
+        "stable-diffusion-v1/lora",
+        SD15_UNET,
+        768,
+        [("lora_te", 768, 12)],
+    ),
+    "sdxl": Layout(
+        "sdxl_base_v1-0",
+        "stable-diffusion-xl-v1-base/lora",
+        SDXL_UNET,
+        2048,
+        [("lora_te1", 768, 12), ("lora_te2", 1280, 32)],
+    ),
+}
+
+
+def lora_modules(layout: Layout) -> Iterator[Tuple[str, int, int]]:
+    """Yield ``(module, in_features, out_features)`` of every adapted layer."""
+    for block, ch, depth in layout.unet:
+        prefix = f"lora_unet_{block}"
+        yield f"{prefix}_proj_in", ch, ch
+        for t in range(depth):
+            tb = f"{prefix}_transformer_blocks_{t}"
+            for attn, ctx in (("attn1", ch), ("attn2", layout.context_dim)):
+                yield f"{tb}_{attn}_to_q", ch, ch
+                yield f"{tb}_{attn}_to_k", ctx, ch
+                yield f"{tb}_{attn}_to_v", ctx, ch
+                yield f"{tb}_{attn}_to_out_0", ch, ch
+            yield f"{tb}_ff_net_0_proj", ch, ch * 8
+            yield f"{tb}_ff_net_2", ch * 4, ch
+        yield f"{prefix}_proj_out", ch, ch
+    for prefix, hidden, layers in layout.text_encoders:
+        for i in range(layers):
+            layer = f"{prefix}_text_model_encoder_layers_{i}"
+            for proj in ("q_proj", "k_proj", "v_proj", "out_proj"):
+                yield f"{layer}_self_attn_{proj}", hidden, hidden
+            yield f"{layer}_mlp_fc1", hidden, hidden * 4
+            yield f"{layer}_mlp_fc2", hidden * 4, hidden
+
+
+def build_header(
+    layout: Layout, rank: int, metadata: Dict[str, str]
+) -> Tuple[bytes, int]:
+    """Return the encoded safetensors header and the size of the tensor data."""
+    header: Dict[str, object] = {"__metadata__": metadata}
+    offset = 0
+
+    def add(key: str, dtype: str, shape: List[int]) -> None:
+        nonlocal offset
+        size = DTYPE_SIZES[dtype]
+        for dim in shape:
+            size *= dim
+        header[key] = {"dtype": dtype, "shape": shape, "data_offsets": [offset, offset + size]}
+        offset += size
+
+    for module, fan_in, fan_out in lora_modules(layout):
+        add(f"{module}.alpha", "F32", [])
+        add(f"{module}.lora_down.weight", "F16", [rank, fan_in])
+        add(f"{module}.lora_up.weight", "F16", [fan_out, rank])
+    data = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # The header is padded with spaces to keep tensor data 8 byte aligned
+    data += b" " * (-len(data) % 8)
+    return data, offset
+
+
+def make_png(rng: random.Random, size: int = 64) -> bytes:
+    """Return a ``size`` x ``size`` single colour PNG image."""
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        crc = zlib.crc32(kind + body) & 0xFFFFFFFF
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", crc)
+
+    pixel = bytes(rng.randrange(256) for _ in range(3))
+    rows = b"".join(b"\x00" + pixel * size for _ in range(size))
+    ihdr = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", ihdr)
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def model_name(index: int) -> str:
+    return f"synthetic_lora_{index:06d}"
+
+
+def write_model(
+    path: Path, layout: Layout, rank: int, metadata: Dict[str, str]
+) -> int:
+    """Write a sparse safetensors file at ``path`` and return its size."""
+    header, data_size = build_header(layout, rank, metadata)
+    with path.open("wb") as fh:
+        fh.write(struct.pack("<Q", len(header)))
+        fh.write(header)
+        fh.truncate(8 + len(header) + data_size)
+    return 8 + len(header) + data_size
+
+
+def generate_corpus(
+    out_dir: Path,
+    count: int,
+    seed: int = 0,
+    sdxl_ratio: float = 0.3,
+    previews: int = 2,
+    tags: int = 200,
+) -> Dict[str, List[str]]:
+    """Write ``count`` models and their previews to ``out_dir``.
+
+    Existing files are kept, so a corpus can be grown by calling this again
+    with a larger ``count``. Returns the category names of every model,
+    drawn from :data:`CATEGORIES`, for the caller to assign.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    categories: Dict[str, List[str]] = {}
+    for i in range(count):
+        # Each model gets its own generator so files do not depend on ``count``
+        rng = random.Random(f"{seed}:{i}")
+        stem = model_name(i)
+        filename = f"{stem}.safetensors"
+        categories[filename] = rng.sample(CATEGORIES, rng.randint(1, 2))
+        path = out_dir / filename
+        if path.exists():
+            continue
+        layout = LAYOUTS["sdxl" if rng.random() < sdxl_ratio else "sd15"]
+        rank = rng.choice((4, 8, 16, 32))
+        words = rng.sample(WORDS, 3)
+        metadata = {
+            "modelspec.title": " ".join(w.replace("_", " ") for w in words).title(),
+            "modelspec.architecture": layout.architecture,
+            "ss_base_model_version": layout.base_model,
+            "ss_network_module": "networks.lora",
+            "ss_network_dim": str(rank),
+            "ss_network_alpha": str(rank // 2),
+            "ss_output_name": stem,
+            "ss_training_started_at": str(1_690_000_000 + i),
+            "ss_num_train_images": str(rng.randint(20, 400)),
+            "ss_tag_frequency": make_tags(rng, tags),
+        }
+        write_model(path, layout, rank, metadata)
+        for p in range(previews):
+            preview = out_dir / (f"{stem}.png" if p == 0 else f"{stem}_{p}.png")
+            preview.write_bytes(make_png(rng))
+    return categories
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sdxl-ratio", type=float, default=0.3)
+    parser.add_argument("--previews", type=int, default=2, help="Previews per model")
+    parser.add_argument("--tags", type=int, default=200, help="Tags per model")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate_corpus(
+        args.out_dir,
+        args.count,
+        seed=args.seed,
+        sdxl_ratio=args.sdxl_ratio,
+        previews=args.previews,
+        tags=args.tags,
+    )
+    print(f"Wrote {args.count} models in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Replay a traffic mix against a server and report latency per route.
+
+The mix is described by a scenario file, see ``benchmarks/scenarios``::
+
+    python -m benchmarks.load benchmarks/scenarios/mixed.toml --duration 30
+
+Each scenario defines groups of simulated users. A user picks one of its
+group's actions at random by weight, waits a random think time and repeats
+until the test ends; every user has its own connection pool and session,
+like a browser. Paths may contain ``{model}`` (a random model), ``{word}``
+(a random search term) and ``{offset}`` (the next page of a scrolling
+action). Without ``base_url`` the server is launched from this checkout on
+a free port and stopped afterwards; the load starts once ``/readyz``
+reports the index as complete.
+
+The report lists requests, errors, throughput and p50/p95/p99 latency for
+every route, ``--output`` also writes it as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python <3.11 fallback
+    import tomli as tomllib
+
+from .corpus import LAYOUTS, build_header
+from .serialization import WORDS
+
+ROOT = Path(__file__).resolve().parent.parent
+#: Seconds to wait for a launched server to become ready.
+STARTUP_TIMEOUT = 600
+#: Models fetched for the ``{model}`` placeholder.
+MODEL_SAMPLE = 1000
+#: Concurrent connections of each simulated user.
+BROWSER_CONNECTIONS = 6
+
+
+@dataclass
+class Action:
+    route: str
+    path: str
+    weight: float = 1.0
+    method: str = "GET"
+    #: Pages of 50 entries walked through before starting over at the top
+    scroll: int = 0
+    #: Fetch the ``preview_url`` of every returned entry, like the gallery
+    previews: bool = False
+    upload: bool = False
+
+
+@dataclass
+class UserGroup:
+    name: str
+    count: int
+    actions: List[Action]
+    auth: str = "guest"
+    think: tuple = (1.0, 3.0)
+
+
+@dataclass
+class Scenario:
+    groups: List[UserGroup]
+    duration: float = 60.0
+    ramp_up: float = 0.0
+    base_url: str = ""
+    workers: int = 1
+    testing: bool = True
+    token: str = ""
+    username: str = ""
+    password: str = ""
+
+
+def load_scenario(path: Path) -> Scenario:
+    """Read a scenario file."""
+    with Path(path).open("rb") as fh:
+        cfg = tomllib.load(fh)
+    groups = []
+    for group in cfg.get("users", []):
+        actions = [Action(**a) for a in group["actions"]]
+        groups.append(
+            UserGroup(
+                name=group["name"],
+                count=int(group.get("count", 1)),
+                actions=actions,
+                auth=group.get("auth", "guest"),
+                think=tuple(group.get("think", (1.0, 3.0))),
+            )
+        )
+    if not groups:
+        raise ValueError(f"{path} defines no [[users]]")
+    launch = cfg.get("launch", {})
+    auth = cfg.get("auth", {})
+    return Scenario(
+        groups=groups,
+        duration=float(cfg.get("duration", 60)),
+        ramp_up=float(cfg.get("ramp_up", 0)),
+        base_url=cfg.get("base_url", ""),
+        workers=int(launch.get("workers", 1)),
+        testing=bool(launch.get("testing", True)),
+        token=os.environ.get("MYLORA_TOKEN", auth.get("token", "")),
+        username=os.environ.get("MYLORA_USER", auth.get("username", "")),
+        password=os.environ.get("MYLORA_PASSWORD", auth.get("password", "")),
+    )
+
+
+# --- Results -----------------------------------------------------------------
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    bytes: int = 0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the ``pct`` percentile of sorted ``values`` by nearest rank."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct * len(values) / 100))
+    return values[min(rank, len(values)) - 1]
+
+
+class Recorder:
+    """Collect latencies of requests completed within the measured window."""
+
+    def __init__(self) -> None:
+        self.routes: Dict[str, RouteStats] = {}
+        self.started: Optional[float] = None
+        self.stopped: Optional[float] = None
+
+    def add(self, route: str, seconds: float, ok: bool, size: int = 0) -> None:
+        if self.started is None or self.stopped is not None:
+            return
+        stats = self.routes.setdefault(route, RouteStats())
+        stats.latencies.append(seconds)
+        stats.bytes += size
+        if not ok:
+            stats.errors += 1
+
+    def report(self) -> Dict:
+        now = time.monotonic()
+        started = now if self.started is None else self.started
+        elapsed = (now if self.stopped is None else self.stopped) - started
+        routes = {}
+        for route, stats in sorted(self.routes.items()):
+            values = sorted(stats.latencies)
+            routes[route] = {
+                "requests": len(values),
+                "errors": stats.errors,
+                "throughput": len(values) / elapsed if elapsed else 0.0,
+                "bytes": stats.bytes,
+                "mean": statistics.fmean(values) if values else 0.0,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1] if values else 0.0,
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "duration": elapsed,
+            "requests": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "throughput": total / elapsed if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+# --- Users -------------------------------------------------------------------
+
+
+def upload_payload(rng: random.Random) -> bytes:
+    """Return a small SD1.5 LoRA file with a random title."""
+    header, data_size = build_header(
+        LAYOUTS["sd15"], 4, {"modelspec.title": " ".join(rng.sample(WORDS, 2))}
+    )
+    return len(header).to_bytes(8, "little") + header + bytes(data_size)
+
+
+class User:
+    """One simulated visitor with its own session."""
+
+    def __init__(
+        self,
+        group: UserGroup,
+        client: httpx.AsyncClient,
+        recorder: Recorder,
+        models: List[str],
+        uploads: List[str],
+        rng: random.Random,
+    ) -> None:
+        self.group = group
+        self.client = client
+        self.recorder = recorder
+        self.models = models
+        self.uploads = uploads
+        self.rng = rng
+        self.weights = [a.weight for a in group.actions]
+        self.pages: Dict[str, int] = {}
+
+    def _path(self, action: Action) -> Optional[str]:
+        values = {"word": self.rng.choice(WORDS), "offset": 0, "model": ""}
+        if "{model}" in action.path:
+            if not self.models:
+                return None
+            values["model"] = self.rng.choice(self.models)
+        if action.scroll:
+            page = self.pages.get(action.route, 0)
+            self.pages[action.route] = (page + 1) % action.scroll
+            values["offset"] = page * 50
+        return action.path.format(**values)
+
+    async def _request(self, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.monotonic()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.add(route, time.monotonic() - start, ok=False)
+            return None
+        ok = response.status_code < 400
+        self.recorder.add(route, time.monotonic() - start, ok, len(response.content))
+        return response
+
+    async def act(self, action: Action) -> None:
+        path = self._path(action)
+        if path is None:
+            self.recorder.add(action.route, 0.0, ok=False)
+            return
+        kwargs = {}
+        if action.upload:
+            name = f"loadtest_{os.getpid()}_{self.rng.getrandbits(48):012x}.safetensors"
+            payload = upload_payload(self.rng)
+            kwargs["files"] = [("files", (name, payload, "application/octet-stream"))]
+            kwargs["headers"] = {"accept": "application/json"}
+        response = await self._request(action.route, action.method, path, **kwargs)
+        if response is None or response.status_code >= 400:
+            return
+        if action.upload:
+            self.uploads.append(name)
+        if action.previews:
+            urls = [e.get("preview_url") for e in response.json()]
+            await asyncio.gather(
+                *(self._request("preview", "GET", url) for url in urls if url)
+            )
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            action = self.rng.choices(self.group.actions, self.weights)[0]
+            await self.act(action)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), self.rng.uniform(*self.group.think))
+
+
+async def _make_client(scenario: Scenario, base_url: str, auth: str) -> httpx.AsyncClient:
+    # Browsers open at most six connections per host
+    limits = httpx.Limits(max_connections=BROWSER_CONNECTIONS)
+    client = httpx.AsyncClient(
+        base_url=base_url, timeout=60, follow_redirects=False, limits=limits
+    )
+    if auth == "guest":
+        return client
+    if scenario.token:
+        client.headers["Authorization"] = f"Bearer {scenario.token}"
+    elif scenario.username:
+        response = await client.post(
+            "/login", data={"username": scenario.username, "password": scenario.password}
+        )
+        if response.status_code != 303:
+            await client.aclose()
+            raise RuntimeError(f"Login as {scenario.username} failed")
+    elif not scenario.testing:
+        await client.aclose()
+        raise RuntimeError("Users with auth = \"user\" need [auth] credentials")
+    return client
+
+
+async def _sample_models(client: httpx.AsyncClient) -> List[str]:
+    response = await client.get(f"/grid_data?limit={MODEL_SAMPLE}&fields=filename")
+    if response.status_code != 200:
+        return []
+    return [e["filename"] for e in response.json()]
+
+
+async def run_load(scenario: Scenario, base_url: str, seed: int = 0) -> Dict:
+    """Run ``scenario`` against ``base_url`` and return the report."""
+    recorder = Recorder()
+    stop = asyncio.Event()
+    uploads: List[str] = []
+    rng = random.Random(seed)
+    clients: List[httpx.AsyncClient] = []
+    try:
+        probe = await _make_client(scenario, base_url, "user")
+        clients.append(probe)
+        models = await _sample_models(probe)
+        users = []
+        for group in scenario.groups:
+            for _ in range(group.count):
+                client = await _make_client(scenario, base_url, group.auth)
+                clients.append(client)
+                users.append(
+                    User(group, client, recorder, models, uploads, random.Random(rng.random()))
+                )
+        rng.shuffle(users)
+        tasks = []
+        delay = scenario.ramp_up / len(users) if users else 0
+        for user in users:
+            tasks.append(asyncio.create_task(user.run(stop)))
+            await asyncio.sleep(delay)
+        # Only the steady state after the ramp up is measured
+        recorder.started = time.monotonic()
+        await asyncio.sleep(scenario.duration)
+        recorder.stopped = time.monotonic()
+        stop.set()
+        await asyncio.gather(*tasks)
+        if uploads:
+            await probe.post(
+                "/delete", data={"files": uploads}, headers={"accept": "application/json"}
+            )
+    finally:
+        for client in clients:
+            await client.aclose()
+    report = recorder.report()
+    report["users"] = {g.name: g.count for g in scenario.groups}
+    return report
+
+
+# --- Server ------------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def launch_server(scenario: Scenario) -> Iterator[str]:
+    """Start ``main.py`` from this checkout and yield its URL once ready."""
+    port = _free_port()
+    env = dict(os.environ)
+    if scenario.testing:
+        env["TESTING"] = "1"
+    cmd = [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port)]
+    cmd += ["--workers", str(scenario.workers)]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Server exited with status {proc.returncode}")
+            try:
+                if httpx.get(f"{url}/readyz", timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Server did not become ready")
+            time.sleep(0.5)
+        yield url
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"{report['requests']} requests, {report['errors']} errors in "
+        f"{report['duration']:.1f}s ({report['throughput']:.1f} req/s)"
+    )
+    print(
+        f"{'route':<18}{'reqs':>8}{'errs':>6}{'req/s':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    )
+    for route, r in report["routes"].items():
+        print(
+            f"{route:<18}{r['requests']:>8}{r['errors']:>6}{r['throughput']:>9.1f}"
+            f"{r['p50'] * 1000:>9.1f}{r['p95'] * 1000:>9.1f}{r['p99'] * 1000:>9.1f}"
+            f"{r['max'] * 1000:>9.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenario", type=Path)
+    parser.add_argument("--base-url", help="Target server instead of launching one")
+    parser.add_argument("--duration", type=float, help="Override the measured seconds")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply all user counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    if args.duration is not None:
+        scenario.duration = args.duration
+    for group in scenario.groups:
+        group.count = max(1, round(group.count * args.scale)) if group.count else 0
+    base_url = args.base_url or scenario.base_url
+    with contextlib.ExitStack() as stack:
+        if not base_url:
+            base_url = stack.enter_context(launch_server(scenario))
+        report = asyncio.run(run_load(scenario, base_url, args.seed))
+    report["scenario"] = str(args.scenario)
+    report["base_url"] = base_url
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
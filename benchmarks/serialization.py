@@ -0,0 +1,134 @@
+"""Benchmark JSON serialization and compression of ``/search`` payloads.
+
+Builds ``--entries`` synthetic index rows shaped like the output of
+``IndexingAgent.search`` (including a realistic ``ss_tag_frequency`` blob)
+and reports payload size and encoding time for each strategy::
+
+    python benchmarks/serialization.py --entries 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import random
+import time
+from typing import Callable, Dict, List
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:  # pragma: no cover - optional dependency
+    jsonable_encoder = None
+
+WORDS = [
+    "1girl", "solo", "looking_at_viewer", "smile", "long_hair", "short_hair",
+    "blue_eyes", "red_eyes", "outdoors", "indoors", "upper_body", "portrait",
+    "landscape", "sky", "cloud", "tree", "water", "night", "city", "armor",
+    "dress", "school_uniform", "hat", "glasses", "flower", "sword", "holding",
+    "standing", "sitting", "masterpiece", "best_quality", "detailed_background",
+]
+
+
+def make_tags(rng: random.Random, n_tags: int) -> str:
+    """Return a JSON ``ss_tag_frequency`` blob with ``n_tags`` entries."""
+    tags = {}
+    for i in range(n_tags):
+        word = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}"
+        tags[word] = rng.randint(1, 400)
+    return json.dumps({"img": tags})
+
+
+def make_entries(count: int, n_tags: int, seed: int = 0) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    entries = []
+    for i in range(count):
+        entries.append(
+            {
+                "filename": f"synthetic_lora_{i:06d}.safetensors",
+                "name": f"Synthetic LoRA {i}",
+                "architecture": rng.choice(
+                    ["stable-diffusion-v1/lora", "stable-diffusion-xl-v1-base/lora"]
+                ),
+                "tags": make_tags(rng, n_tags),
+                "base_model": rng.choice(["sd_v1", "sdxl_base_v1-0"]),
+                "categories": [rng.choice(["Characters", "Styles", "Concepts"])],
+                "preview_url": f"/uploads/synthetic_lora_{i:06d}.png?v=0123456789ab",
+            }
+        )
+    return entries
+
+
+def stdlib_dumps(content) -> bytes:
+    # Same options as ``starlette.responses.JSONResponse.render``
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def timed(func: Callable[[], bytes], repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    result = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(entries: int, n_tags: int, repeat: int) -> List[Dict[str, object]]:
+    data = make_entries(entries, n_tags)
+    results: List[Dict[str, object]] = []
+
+    encoders: Dict[str, Callable[[], bytes]] = {"json": lambda: stdlib_dumps(data)}
+    if jsonable_encoder is not None:
+        encoders["jsonable_encoder+json"] = lambda: stdlib_dumps(jsonable_encoder(data))
+    if orjson is not None:
+        encoders["orjson"] = lambda: orjson.dumps(data)
+
+    payload = b""
+    for name, func in encoders.items():
+        seconds, payload = timed(func, repeat)
+        results.append({"step": f"serialize:{name}", "seconds": seconds, "bytes": len(payload)})
+
+    compressors: Dict[str, Callable[[], bytes]] = {
+        "gzip-6": lambda: gzip.compress(payload, compresslevel=6)
+    }
+    if zstandard is not None:
+        cctx = zstandard.ZstdCompressor(level=3)
+        compressors["zstd-3"] = lambda: cctx.compress(payload)
+    for name, func in compressors.items():
+        seconds, compressed = timed(func, repeat)
+        results.append({"step": f"compress:{name}", "seconds": seconds, "bytes": len(compressed)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--tags", type=int, default=400, help="Tags per model")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    results = run(args.entries, args.tags, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'step':<32}{'time (ms)':>12}{'size (KiB)':>14}")
+    for r in results:
+        print(f"{r['step']:<32}{r['seconds'] * 1000:>12.1f}{r['bytes'] / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Benchmark indexing, search and page rendering at several catalogue sizes.
+
+For every size a synthetic corpus (see :mod:`benchmarks.corpus`) is indexed
+from scratch, then searches and HTTP routes are timed against it::
+
+    python -m benchmarks.suite --sizes 1000,10000 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Each size runs in a fresh interpreter, so the module level agents of the
+application start with empty caches and the index of that size. Results
+are written as JSON together with the commit they were measured on; times
+are in seconds. Corpora are kept in ``--workdir`` and reused by later runs.
+Route benchmarks need the server dependencies (FastAPI, httpx) and are
+skipped if they are missing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+#: Catalogue sizes measured by default.
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+#: Page size used by the gallery.
+PAGE = 50
+#: Word found in the names and tags of part of the corpus.
+QUERY = "smile"
+
+
+def measure(func: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Call ``func`` ``warmup + repeat`` times and summarise the timed calls."""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "runs": len(times),
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "max": max(times),
+    }
+
+
+def run_size(size: int, workdir: Path, repeat: int, routes: bool = True) -> List[Dict]:
+    """Run all benchmarks for a catalogue of ``size`` models.
+
+    Changes the working directory to ``workdir`` so the index and user
+    databases created by the application land there. Meant to be called in
+    a fresh interpreter, see :py:func:`main`.
+    """
+    from benchmarks.corpus import CATEGORIES, LAYOUTS, generate_corpus, write_model
+
+    import config
+
+    workdir = Path(workdir).resolve()
+    results: List[Dict] = []
+
+    def record(name: str, stats: Dict[str, float]) -> None:
+        results.append({"size": size, "benchmark": name, **stats})
+
+    uploads = workdir / "uploads"
+    categories: Dict[str, List[str]] = {}
+    # Only files missing from an earlier run are written
+    record(
+        "corpus.generate",
+        measure(lambda: categories.update(generate_corpus(uploads, size)), 1, 0),
+    )
+
+    # Start from an empty index so ``reindex_all`` does the full work
+    shutil.rmtree(workdir / "loradb", ignore_errors=True)
+    os.chdir(workdir)
+    os.environ["TESTING"] = "1"
+    config.UPLOAD_DIR = uploads
+
+    from loradb.agents.indexing_agent import IndexingAgent
+
+    indexer = IndexingAgent(defer_index=True)
+    record("index.reindex_all", measure(indexer.reindex_all, repeat=1, warmup=0))
+    category_ids = {name: indexer.create_category(name) for name in CATEGORIES}
+    indexer.assign_category_many(
+        (filename, category_ids[name])
+        for filename, names in categories.items()
+        for name in names
+    )
+    cid = category_ids[CATEGORIES[0]]
+    fields = ["filename", "name"]
+    searches = {
+        "index.search": lambda: indexer.search("*", limit=PAGE, fields=fields),
+        "index.search.query": lambda: indexer.search(QUERY, limit=PAGE, fields=fields),
+        "index.search.deep_page": lambda: indexer.search(
+            "*", limit=PAGE, offset=size - PAGE, fields=fields
+        ),
+        "index.search_by_category": lambda: indexer.search_by_category(
+            cid, "*", limit=PAGE, fields=fields
+        ),
+        "index.search_by_category.query": lambda: indexer.search_by_category(
+            cid, QUERY, limit=PAGE, fields=fields
+        ),
+    }
+    for name, func in searches.items():
+        record(name, measure(func, repeat))
+
+    if not routes:
+        return results
+    try:
+        from fastapi.testclient import TestClient
+
+        import main
+    except ImportError as exc:
+        results.append({"size": size, "benchmark": "routes", "skipped": str(exc)})
+        return results
+
+    client = TestClient(main.app)
+    detail = f"/detail/{next(iter(categories))}"
+
+    def get(url: str) -> Callable[[], None]:
+        def call() -> None:
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+        return call
+
+    requests = {
+        "route.dashboard": get("/"),
+        "route.grid": get("/grid"),
+        "route.grid.query": get(f"/grid?q={QUERY}"),
+        "route.grid.category": get(f"/grid?category={cid}"),
+        "route.grid_data": get("/grid_data"),
+        "route.grid_data.query": get(f"/grid_data?q={QUERY}&fields=name,categories,preview_url"),
+        "route.detail": get(detail),
+    }
+    for name, func in requests.items():
+        record(name, measure(func, repeat))
+
+    # Uploads need a new file name for every call
+    model = workdir / "upload.safetensors"
+    write_model(model, LAYOUTS["sd15"], 4, {"modelspec.title": "Upload"})
+    payload = model.read_bytes()
+    counter = iter(range(sys.maxsize))
+
+    def upload() -> None:
+        name = f"bench_upload_{next(counter):06d}.safetensors"
+        response = client.post(
+            "/upload", files=[("files", (name, payload, "application/octet-stream"))]
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"POST /upload returned {response.status_code}")
+
+    record("route.upload", measure(upload, repeat))
+    for path in uploads.glob("bench_upload_*.safetensors"):
+        path.unlink()
+    return results
+
+
+def git_commit() -> Dict[str, object]:
+    """Return the checked out commit and whether the tree has local changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="Comma separated catalogue sizes",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per benchmark")
+    parser.add_argument("--workdir", type=Path, help="Directory keeping the corpora")
+    parser.add_argument("--output", type=Path, help="Write JSON results to this file")
+    parser.add_argument("--no-routes", action="store_true", help="Skip HTTP route benchmarks")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    workdir = args.workdir or Path(tempfile.gettempdir()) / "mylora-bench"
+    if args.child is not None:
+        results = run_size(args.child, workdir / str(args.child), args.repeat, not args.no_routes)
+        # Printed last, after anything the application logged
+        print("\n" + json.dumps(results))
+        return
+
+    results: List[Dict] = []
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        print(f"Benchmarking {size} models...", file=sys.stderr)
+        cmd = [sys.executable, "-m", "benchmarks.suite", "--child", str(size)]
+        cmd += ["--repeat", str(args.repeat), "--workdir", str(workdir.resolve())]
+        if args.no_routes:
+            cmd.append("--no-routes")
+        proc = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.PIPE, check=True)
+        results += json.loads(proc.stdout.decode("utf-8").splitlines()[-1])
+
+    report = {
+        "meta": {
+            **git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"{'size':>8}  {'benchmark':<34}{'median (ms)':>12}{'min (ms)':>12}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['size']:>8}  {r['benchmark']:<34}skipped: {r['skipped']}")
+            continue
+        print(f"{r['size']:>8}  {r['benchmark']:<34}{r['median'] * 1000:>12.2f}{r['min'] * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
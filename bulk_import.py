@@ -1,13 +1,29 @@
 from __future__ import annotations
 
 import argparse
-from pathlib import Path
+import filecmp
+import json
+import os
 import shutil
-from typing import Iterable, Dict, List, Optional
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
 
-from safetensors import safe_open
+from loradb.agents import IndexingAgent, MetadataExtractorAgent, UploaderAgent
 
-from loradb.agents import IndexingAgent, UploaderAgent
+#: Ways of placing files in the upload directory.
+TRANSFER_MODES = ("copy", "hardlink", "reflink", "copy_file_range")
+#: ``ioctl`` request cloning a file's extents (Linux ``FICLONE``).
+FICLONE = 0x40049409
+#: Image types imported as previews.
+PREVIEW_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif"}
+#: Seconds between progress updates.
+PROGRESS_INTERVAL = 0.5
+
+_extractor = MetadataExtractorAgent()
 
 
 def load_category_map(cat_dir: Path) -> Dict[str, List[str]]:
@@ -30,14 +46,208 @@ def load_category_map(cat_dir: Path) -> Dict[str, List[str]]:
 
 def extract_metadata(path: Path) -> dict[str, str]:
     """Read metadata from a safetensors file without requiring torch."""
-    metadata = {"filename": path.name}
+    return _extractor.extract(path)
+
+
+def _copy_file_range(src: Path, dest: Path) -> None:
+    """Copy ``src`` to ``dest`` inside the kernel with ``copy_file_range``."""
+    with src.open("rb") as fsrc, dest.open("wb") as fdest:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def transfer_file(src: Path, dest: Path, mode: str = "copy") -> str:
+    """Place ``src`` at ``dest`` using ``mode`` and return the method used.
+
+    ``hardlink`` and ``reflink`` share the data with the source file and
+    ``copy_file_range`` copies it without passing through user space. If
+    the requested method is not supported, e.g. across file systems, a
+    regular copy is made instead. ``dest`` is replaced atomically.
+    """
+    tmp = dest.with_name(f".{dest.name}.part")
+    tmp.unlink(missing_ok=True)
+    used = mode
     try:
-        with safe_open(str(path), framework=None) as f:
-            meta = f.metadata() or {}
-            metadata.update(meta)
-    except Exception as exc:  # pragma: no cover - best effort
-        metadata["error"] = str(exc)
-    return metadata
+        try:
+            if mode == "hardlink":
+                os.link(src, tmp)
+            elif mode == "reflink":
+                import fcntl  # Not available on Windows
+
+                with src.open("rb") as fsrc, tmp.open("wb") as fdest:
+                    fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+            elif mode == "copy_file_range":
+                _copy_file_range(src, tmp)
+            else:
+                shutil.copyfile(src, tmp)
+        except (OSError, AttributeError, ImportError):
+            if mode == "copy":
+                raise
+            tmp.unlink(missing_ok=True)
+            shutil.copyfile(src, tmp)
+            used = "copy"
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return used
+
+
+class ImportJournal:
+    """Append-only record of source files that were imported completely.
+
+    Each line identifies a file by its path relative to the import
+    directory, its size and its modification time, so files changed since
+    they were imported are imported again.
+    """
+
+    def __init__(self, path: Path, restart: bool = False) -> None:
+        self.path = path
+        self.done: Set[Tuple[str, int, int]] = set()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if restart:
+            self.path.unlink(missing_ok=True)
+        elif self.path.exists():
+            with self.path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                        self.done.add((rec["source"], rec["size"], rec["mtime_ns"]))
+                    except (ValueError, KeyError):
+                        # Line cut short by an interrupted run
+                        continue
+        self.fh: TextIO = self.path.open("a", encoding="utf-8")
+
+    @staticmethod
+    def key(source: str, path: Path) -> Tuple[str, int, int]:
+        st = path.stat()
+        return (source, st.st_size, st.st_mtime_ns)
+
+    def __contains__(self, key: Tuple[str, int, int]) -> bool:
+        return key in self.done
+
+    def record(self, keys: Iterable[Tuple[str, int, int]]) -> None:
+        """Durably mark ``keys`` as imported."""
+        for source, size, mtime_ns in keys:
+            self.fh.write(
+                json.dumps({"source": source, "size": size, "mtime_ns": mtime_ns}) + "\n"
+            )
+            self.done.add((source, size, mtime_ns))
+        self.fh.flush()
+        os.fsync(self.fh.fileno())
+
+    def close(self) -> None:
+        self.fh.close()
+
+
+@dataclass
+class ImportResult:
+    """Outcome of importing one model and its previews."""
+
+    key: Tuple[str, int, int]
+    metadata: Dict[str, str]
+    previews: int
+    bytes: int
+    fallback: bool
+
+
+@dataclass
+class ImportStats:
+    """Counters reported while and after importing."""
+
+    total: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    previews: int = 0
+    bytes: int = 0
+    fallbacks: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        done = self.imported + self.skipped + self.failed
+        return (
+            f"{done}/{self.total} files, {self.imported} imported, "
+            f"{self.skipped} skipped, {self.failed} failed | "
+            f"{self.imported / elapsed:.1f} files/s, "
+            f"{self.bytes / elapsed / 1024**2:.1f} MB/s"
+        )
+
+
+def _import_previews(
+    st_file: Path, safe_dir: Path, img_dir: Path, upload_dir: Path, mode: str
+) -> Tuple[int, int, bool]:
+    """Transfer the previews of ``st_file``.
+
+    Returns the number of previews, their total size and whether a fallback
+    copy was needed. Previews already present with identical content are
+    not imported twice.
+    """
+    rel = st_file.relative_to(safe_dir).with_suffix("")
+    preview_dir = img_dir / rel
+    if not preview_dir.is_dir():
+        return 0, 0, False
+    count = size = 0
+    fallback = False
+    index = 0
+    for img in sorted(preview_dir.iterdir()):
+        if img.suffix.lower() not in PREVIEW_SUFFIXES:
+            continue
+        if index == 0:
+            dest_name = f"{st_file.stem}{img.suffix.lower()}"
+        else:
+            dest_name = f"{st_file.stem}_{index}{img.suffix.lower()}"
+        index += 1
+        dest_path = upload_dir / dest_name
+        counter = 1
+        while dest_path.exists() and not filecmp.cmp(img, dest_path, shallow=False):
+            dest_path = upload_dir / f"{dest_path.stem}_{counter}{dest_path.suffix}"
+            counter += 1
+        if dest_path.exists():
+            # Imported by an earlier, interrupted run
+            continue
+        fallback |= transfer_file(img, dest_path, mode) != mode
+        count += 1
+        size += dest_path.stat().st_size
+    return count, size, fallback
+
+
+def _import_one(
+    st_file: Path,
+    safe_dir: Path,
+    img_dir: Path,
+    upload_dir: Path,
+    mode: str,
+    key: Tuple[str, int, int],
+) -> ImportResult:
+    """Transfer a model with its previews and read its metadata."""
+    dest = upload_dir / st_file.name
+    fallback = transfer_file(st_file, dest, mode) != mode
+    meta = extract_metadata(dest)
+    previews, preview_bytes, preview_fallback = _import_previews(
+        st_file, safe_dir, img_dir, upload_dir, mode
+    )
+    return ImportResult(
+        key=key,
+        metadata=meta,
+        previews=previews,
+        bytes=key[1] + preview_bytes,
+        fallback=fallback or preview_fallback,
+    )
+
+
+def _bounded(executor: ThreadPoolExecutor, fn, items: Iterable, limit: int) -> Iterator:
+    """Yield ``fn(item)`` results in order with at most ``limit`` tasks pending."""
+    pending = []
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= limit:
+            yield pending.pop(0)
+    yield from pending
 
 
 def import_loras(
@@ -46,39 +256,82 @@ def import_loras(
     uploader: UploaderAgent,
     indexer: IndexingAgent,
     category_map: Optional[Dict[str, List[str]]] = None,
-) -> None:
-    """Walk ``safe_dir`` and import all ``.safetensors`` files found."""
-    for st_file in safe_dir.rglob("*.safetensors"):
-        # copy LoRA file
-        with st_file.open("rb") as fh:
-            dest = uploader.save_file(st_file.name, fh)
-        meta = extract_metadata(dest)
-        indexer.add_metadata(meta)
-        if category_map and st_file.name in category_map:
-            for cat in category_map[st_file.name]:
-                cid = indexer.create_category(cat)
-                indexer.assign_category(dest.name, cid)
-
-        # copy associated previews
-        rel = st_file.relative_to(safe_dir).with_suffix("")
-        preview_dir = img_dir / rel
-        if not preview_dir.is_dir():
-            continue
-        index = 0
-        for img in sorted(preview_dir.iterdir()):
-            if img.suffix.lower() not in {".png", ".jpg", ".jpeg", ".gif"}:
+    mode: str = "copy",
+    workers: int = 1,
+    batch_size: int = 100,
+    journal: Optional[ImportJournal] = None,
+    progress: Optional[TextIO] = None,
+) -> ImportStats:
+    """Walk ``safe_dir`` and import all ``.safetensors`` files found.
+
+    Files are transferred and their metadata extracted by ``workers``
+    threads, while index updates are committed every ``batch_size`` models.
+    Models recorded in ``journal`` are skipped and completed batches are
+    added to it, so an interrupted import can be resumed. Progress is
+    written to ``progress`` if given.
+    """
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"mode must be one of {', '.join(TRANSFER_MODES)}")
+    upload_dir = Path(uploader.upload_dir)
+    stats = ImportStats()
+    todo: List[Tuple[Path, Tuple[str, int, int]]] = []
+    for st_file in sorted(safe_dir.rglob("*.safetensors")):
+        stats.total += 1
+        key = ImportJournal.key(str(st_file.relative_to(safe_dir)), st_file)
+        if journal is not None and key in journal:
+            stats.skipped += 1
+        else:
+            todo.append((st_file, key))
+
+    category_ids: Dict[str, int] = {}
+    batch: List[ImportResult] = []
+
+    def commit() -> None:
+        indexer.add_metadata_many(r.metadata for r in batch)
+        pairs = []
+        for r in batch:
+            name = r.metadata["filename"]
+            for cat in (category_map or {}).get(name, []):
+                if cat not in category_ids:
+                    category_ids[cat] = indexer.create_category(cat)
+                pairs.append((name, category_ids[cat]))
+        indexer.assign_category_many(pairs)
+        if journal is not None:
+            journal.record(r.key for r in batch)
+        batch.clear()
+
+    def run(item: Tuple[Path, Tuple[str, int, int]]) -> ImportResult:
+        return _import_one(item[0], safe_dir, img_dir, upload_dir, mode, item[1])
+
+    last_report = 0.0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # Keep the queue short so an interruption loses little finished work
+        for (st_file, _), future in zip(
+            todo, _bounded(executor, run, todo, max(1, workers) * 2)
+        ):
+            try:
+                result = future.result()
+            except OSError as exc:
+                stats.failed += 1
+                print(f"\nFailed to import {st_file}: {exc}", file=sys.stderr)
                 continue
-            if index == 0:
-                dest_name = f"{st_file.stem}{img.suffix.lower()}"
-            else:
-                dest_name = f"{st_file.stem}_{index}{img.suffix.lower()}"
-            dest_path = uploader.upload_dir / dest_name
-            counter = 1
-            while dest_path.exists():
-                dest_path = uploader.upload_dir / f"{dest_path.stem}_{counter}{dest_path.suffix}"
-                counter += 1
-            shutil.copyfile(img, dest_path)
-            index += 1
+            batch.append(result)
+            stats.imported += 1
+            stats.previews += result.previews
+            stats.bytes += result.bytes
+            stats.fallbacks += result.fallback
+            if len(batch) >= batch_size:
+                commit()
+            if progress and time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                progress.write("\r" + stats.line())
+                progress.flush()
+    if batch:
+        commit()
+    if progress:
+        progress.write("\r" + stats.line() + "\n")
+        progress.flush()
+    return stats
 
 
 def main() -> None:
@@ -91,13 +344,61 @@ def main() -> None:
         nargs="?",
         help="Optional directory with category text files",
     )
+    parser.add_argument(
+        "--mode",
+        choices=TRANSFER_MODES,
+        default="copy",
+        help="How files are placed in the upload directory (default: copy)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Parallel transfers (default: 4)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Models indexed per database commit (default: 100)",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        help="Checkpoint file of imported models (default: next to the index)",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint journal and import everything again",
+    )
     args = parser.parse_args()
 
     uploader = UploaderAgent()
     indexer = IndexingAgent()
+    journal = ImportJournal(
+        args.journal or indexer.db_path.with_name("bulk_import.journal"),
+        restart=args.restart,
+    )
 
     cat_map = load_category_map(args.categories) if args.categories else {}
-    import_loras(args.safetensors, args.images, uploader, indexer, cat_map)
+    try:
+        stats = import_loras(
+            args.safetensors,
+            args.images,
+            uploader,
+            indexer,
+            cat_map,
+            mode=args.mode,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            journal=journal,
+            progress=sys.stderr,
+        )
+    finally:
+        journal.close()
+    if stats.fallbacks:
+        print(
+            f"{stats.fallbacks} models were copied because {args.mode} "
+            "is not supported between the directories"
+        )
 
 
 if __name__ == "__main__":  # pragma: no cover - script entry
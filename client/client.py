@@ -1,16 +1,29 @@
 """Lazy LoRA downloader client.
 
-This small helper mirrors remote `.safetensors` files as 0-byte placeholders.
-When an application opens a placeholder, the file is fetched from the MyLora
-server and stored locally until it has not been accessed for a while.
+This small helper mirrors remote `.safetensors` files as sparse placeholders
+of their real size and keeps them in sync with the server's catalogue. When
+an application opens a placeholder, the file is fetched from the MyLora
+server and kept locally. Downloaded files are evicted in least recently (or
+least frequently) used order once they exceed a configurable byte budget.
+Models that are likely to be opened next are prefetched in the background.
+Several mount directories can share one content-addressed blob cache.
 """
 
 from __future__ import annotations
 
+import contextlib
+import fcntl
+import hashlib
+import os
+import shutil
+import sqlite3
 import threading
 import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import httpx
 from inotify_simple import INotify, flags
@@ -22,6 +35,565 @@ except ModuleNotFoundError:  # Python <3.11 fallback
 
 CONFIG_PATH = Path(__file__).with_name("config.toml")
 
+#: Default byte budget for downloaded files (20 GiB).
+DEFAULT_CACHE_BYTES = 20 * 1024**3
+#: Block size used when streaming downloads to disk.
+CHUNK_SIZE = 1024 * 1024
+#: Supported eviction policies.
+EVICTION_POLICIES = ("lru", "lfu")
+#: Models opened within this many seconds of each other count as co-accessed.
+CO_ACCESS_WINDOW = 300.0
+#: Prefetching pauses once the cache is filled beyond this share of the budget.
+PREFETCH_HEADROOM = 0.8
+#: ``nice`` increment applied to the prefetch thread.
+PREFETCH_NICENESS = 10
+#: Maximum number of filenames per ``/manifest?files=`` request.
+MANIFEST_BATCH = 1000
+#: Seconds between prefetch hit rate reports.
+REPORT_INTERVAL = 600.0
+#: Category assigned by the server to models without a category. It groups
+#: unrelated models and is ignored when predicting accesses.
+NO_CATEGORY_NAME = "No Category"
+
+
+def _lower_thread_priority() -> None:
+    """Lower the scheduling priority of the calling thread where supported."""
+    try:
+        # On Linux a thread id addresses only that thread
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+#: ``ioctl`` request cloning a file's extents (Linux ``FICLONE``).
+FICLONE = 0x40049409
+
+
+def write_placeholder(path: Path, size: int) -> None:
+    """Atomically replace ``path`` with a sparse file of ``size`` bytes."""
+    # Creating the file under a hidden name and renaming it keeps the
+    # watcher from mistaking our own OPEN event for an application access
+    tmp = path.with_name(f".{path.name}.placeholder")
+    with tmp.open("wb") as fh:
+        fh.truncate(size)
+    os.replace(tmp, path)
+
+
+def is_placeholder(path: Path) -> bool:
+    """Return ``True`` if ``path`` is a sparse placeholder without data."""
+    st = path.stat()
+    return st.st_size > 0 and st.st_blocks == 0
+
+
+def clone_file(src: Path, dst: Path) -> str:
+    """Make ``src`` available at ``dst`` without copying data where possible.
+
+    Tries a hardlink, then a reflink (copy-on-write clone) and finally falls
+    back to a regular copy. Returns the method used.
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+    with src.open("rb") as fsrc, dst.open("wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return "reflink"
+        except OSError:
+            shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+    return "copy"
+
+
+class CacheState:
+    """Download state and access statistics of mirrored files, in SQLite.
+
+    For every file the size on the server, whether it is downloaded, the size
+    of the local copy (``0`` for a placeholder), the number of accesses and
+    the time of the last access are stored. Writes are batched and committed
+    by :py:meth:`flush`.
+    """
+
+    #: Columns added after the first release with their definition
+    ADDED_COLUMNS = {
+        "prefetched": "INTEGER NOT NULL DEFAULT 0",
+        "remote_size": "INTEGER NOT NULL DEFAULT 0",
+        "downloaded": "INTEGER NOT NULL DEFAULT 0",
+        "sha256": "TEXT",
+    }
+
+    def __init__(self, db_path: Path) -> None:
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL DEFAULT 0,
+                hits INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = [r[1] for r in self.conn.execute("PRAGMA table_info(cache_entries)")]
+        for column, definition in self.ADDED_COLUMNS.items():
+            if column not in columns:
+                self.conn.execute(
+                    f"ALTER TABLE cache_entries ADD COLUMN {column} {definition}"
+                )
+                if column == "downloaded":
+                    # Older versions marked placeholders by a size of zero
+                    self.conn.execute(
+                        "UPDATE cache_entries SET downloaded = 1, remote_size = size "
+                        "WHERE size > 0"
+                    )
+        # Number of times ``b`` was opened shortly after ``a``
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS co_access (
+                a TEXT NOT NULL,
+                b TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (a, b)
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS counters (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Position in the server's change feed
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+        self.dirty = False
+
+    def record_access(self, name: str) -> None:
+        """Count an access to ``name``."""
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO cache_entries(name, hits, last_access) VALUES (?, 1, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    hits = hits + 1, last_access = excluded.last_access
+                """,
+                (name, time.time()),
+            )
+            self.dirty = True
+
+    def mark_downloaded(self, name: str, size: int) -> None:
+        """Record that ``name`` was downloaded and occupies ``size`` bytes."""
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO cache_entries(name, size, remote_size, downloaded)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT(name) DO UPDATE SET
+                    size = excluded.size,
+                    remote_size = excluded.remote_size,
+                    downloaded = 1
+                """,
+                (name, size, size),
+            )
+            self.dirty = True
+
+    def mark_placeholder(
+        self, name: str, remote_size: int, sha256: Optional[str] = None
+    ) -> None:
+        """Record that ``name`` is a placeholder for a file of ``remote_size`` bytes.
+
+        ``sha256`` is the content hash reported by the server; ``None`` keeps
+        the previously known hash.
+        """
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO cache_entries(name, size, remote_size, downloaded, sha256)
+                VALUES (?, 0, ?, 0, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    size = 0,
+                    remote_size = excluded.remote_size,
+                    downloaded = 0,
+                    sha256 = COALESCE(excluded.sha256, sha256)
+                """,
+                (name, remote_size, sha256),
+            )
+            self.dirty = True
+
+    def set_sha256(self, name: str, sha256: str) -> None:
+        with self.lock:
+            self.conn.execute(
+                "UPDATE cache_entries SET sha256 = ? WHERE name = ?", (sha256, name)
+            )
+            self.dirty = True
+
+    def entry(self, name: str) -> Optional[Tuple[bool, int, Optional[str]]]:
+        """Return ``(downloaded, remote_size, sha256)`` or ``None`` if unknown."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT downloaded, remote_size, sha256 FROM cache_entries WHERE name = ?",
+                (name,),
+            ).fetchone()
+        return (bool(row[0]), int(row[1]), row[2]) if row else None
+
+    def is_downloaded(self, name: str) -> bool:
+        entry = self.entry(name)
+        return bool(entry and entry[0])
+
+    def names(self) -> set[str]:
+        """Return the names of all tracked files."""
+        with self.lock:
+            return {r[0] for r in self.conn.execute("SELECT name FROM cache_entries")}
+
+    def forget(self, name: str) -> None:
+        """Drop all state of a model that was removed from the server."""
+        with self.lock:
+            self.conn.execute("DELETE FROM cache_entries WHERE name = ?", (name,))
+            self.conn.execute("DELETE FROM co_access WHERE a = ? OR b = ?", (name, name))
+            self.dirty = True
+
+    def sync_value(self, key: str) -> Optional[int]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def set_sync_value(self, key: str, value: int) -> None:
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state(key, value) VALUES (?, ?)",
+                (key, value),
+            )
+            self.dirty = True
+
+    def record_co_access(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """Count each ``(a, b)`` pair as ``b`` opened shortly after ``a``."""
+        with self.lock:
+            self.conn.executemany(
+                """
+                INSERT INTO co_access(a, b, count) VALUES (?, ?, 1)
+                ON CONFLICT(a, b) DO UPDATE SET count = count + 1
+                """,
+                list(pairs),
+            )
+            self.dirty = True
+
+    def co_accessed(self, name: str, limit: int) -> List[Tuple[str, int]]:
+        """Return models most often opened after ``name`` with their counts."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT b, count FROM co_access WHERE a = ? ORDER BY count DESC LIMIT ?",
+                (name, limit),
+            ).fetchall()
+        return [(r[0], int(r[1])) for r in rows]
+
+    def hits(self, names: Iterable[str]) -> Dict[str, int]:
+        """Return the access counts of ``names``."""
+        names = list(names)
+        result: Dict[str, int] = {}
+        with self.lock:
+            # Stay below SQLite's limit on bound parameters
+            for i in range(0, len(names), 500):
+                batch = names[i : i + 500]
+                marks = ", ".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT name, hits FROM cache_entries WHERE name IN ({marks})",
+                    batch,
+                ).fetchall()
+                result.update((r[0], int(r[1])) for r in rows)
+        return result
+
+    def set_prefetched(self, name: str, prefetched: bool) -> bool:
+        """Set the prefetch marker of ``name`` and return its previous value."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT prefetched FROM cache_entries WHERE name = ?", (name,)
+            ).fetchone()
+            self.conn.execute(
+                """
+                INSERT INTO cache_entries(name, prefetched) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET prefetched = excluded.prefetched
+                """,
+                (name, int(prefetched)),
+            )
+            self.dirty = True
+        return bool(row and row[0])
+
+    def increment(self, key: str) -> None:
+        """Increment the counter ``key``."""
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO counters(key, value) VALUES (?, 1)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1
+                """,
+                (key,),
+            )
+            self.dirty = True
+
+    def counters(self) -> Dict[str, int]:
+        """Return all counters."""
+        with self.lock:
+            rows = self.conn.execute("SELECT key, value FROM counters").fetchall()
+        return {r[0]: int(r[1]) for r in rows}
+
+    def cached_bytes(self) -> int:
+        """Return the total size of all downloaded files."""
+        with self.lock:
+            row = self.conn.execute("SELECT SUM(size) FROM cache_entries").fetchone()
+        return int(row[0] or 0)
+
+    def eviction_order(self, policy: str) -> list[tuple[str, int]]:
+        """Return ``(name, size)`` of downloaded files, best eviction candidate first."""
+        order = "last_access" if policy == "lru" else "hits, last_access"
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT name, size FROM cache_entries WHERE downloaded = 1 ORDER BY {order}"
+            ).fetchall()
+        return [(r[0], int(r[1])) for r in rows]
+
+    def flush(self) -> None:
+        """Commit pending updates."""
+        with self.lock:
+            if self.dirty:
+                self.conn.commit()
+                self.dirty = False
+
+
+class BlobStore:
+    """Content-addressed model cache shared by several mount directories.
+
+    Blobs are stored once under ``root/objects`` keyed by their SHA-256 and
+    linked into each mount directory. The blob index lives in
+    ``root/blobs.db`` and is shared by all client processes, so one byte
+    budget applies across every mount. Downloads of the same blob are
+    serialised with a file lock, so concurrent requests collapse into a
+    single transfer.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        (root / "objects").mkdir(parents=True, exist_ok=True)
+        (root / "locks").mkdir(exist_ok=True)
+        (root / "tmp").mkdir(exist_ok=True)
+        # Several processes share the database; wait for their writes
+        self.conn = sqlite3.connect(root / "blobs.db", timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Mount paths currently linked to a blob
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS links (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS links_sha256 ON links(sha256)")
+        self.conn.commit()
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    @contextlib.contextmanager
+    def locked(self, sha256: str) -> Iterator[None]:
+        """Hold an exclusive inter-process lock on ``sha256``."""
+        with (self.root / "locks" / sha256).open("a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+            self.conn.commit()
+        return rows
+
+    def materialize(
+        self, sha256: str, dest: Path, download: Callable[[Path], str]
+    ) -> int:
+        """Place the blob ``sha256`` at ``dest``, downloading it if necessary.
+
+        ``download`` writes the content to the given path and returns its
+        SHA-256, which must match. ``dest`` is replaced atomically. Returns
+        the blob size.
+        """
+        path = self.blob_path(sha256)
+        tmp = dest.with_name(f".{dest.name}.link")
+        with self.locked(sha256):
+            if not path.exists():
+                part = self.root / "tmp" / f"{sha256}.{os.getpid()}.part"
+                try:
+                    digest = download(part)
+                    if digest != sha256:
+                        raise ValueError(f"Hash mismatch for blob {sha256}")
+                    path.parent.mkdir(exist_ok=True)
+                    os.replace(part, path)
+                finally:
+                    part.unlink(missing_ok=True)
+                self._execute(
+                    "INSERT OR REPLACE INTO blobs(sha256, size) VALUES (?, ?)",
+                    (sha256, path.stat().st_size),
+                )
+            tmp.unlink(missing_ok=True)
+            clone_file(path, tmp)
+            os.replace(tmp, dest)
+            self._execute(
+                "INSERT OR REPLACE INTO links(path, sha256) VALUES (?, ?)",
+                (str(dest.resolve()), sha256),
+            )
+            self.record_access(sha256)
+        return path.stat().st_size
+
+    def record_access(self, sha256: str) -> None:
+        self._execute(
+            "UPDATE blobs SET hits = hits + 1, last_access = ? WHERE sha256 = ?",
+            (time.time(), sha256),
+        )
+
+    def total_bytes(self) -> int:
+        """Return the size of all blobs."""
+        return int(self._execute("SELECT SUM(size) FROM blobs")[0][0] or 0)
+
+    def enforce_budget(
+        self, budget: int, policy: str, keep: Callable[[Path], bool]
+    ) -> None:
+        """Evict blobs until all of them fit into ``budget`` bytes.
+
+        Every mount file linked to an evicted blob is replaced by a sparse
+        placeholder. Blobs with a linked path for which ``keep`` returns
+        ``True`` are skipped. Applications that still have the file open keep
+        reading the old inode until they close it.
+        """
+        total = self.total_bytes()
+        if total <= budget:
+            return
+        order = "last_access" if policy == "lru" else "hits, last_access"
+        for sha256, size in self._execute(f"SELECT sha256, size FROM blobs ORDER BY {order}"):
+            if total <= budget:
+                break
+            paths = [
+                Path(r[0])
+                for r in self._execute("SELECT path FROM links WHERE sha256 = ?", (sha256,))
+            ]
+            if any(keep(p) for p in paths):
+                continue
+            with self.locked(sha256):
+                blob = self.blob_path(sha256)
+                for path in paths:
+                    # Skip paths that were replaced or evicted in the meantime
+                    with contextlib.suppress(OSError):
+                        if path.stat().st_size == size and not is_placeholder(path):
+                            write_placeholder(path, size)
+                blob.unlink(missing_ok=True)
+                self._execute("DELETE FROM links WHERE sha256 = ?", (sha256,))
+                self._execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            total -= size
+
+
+class PrefetchPolicy:
+    """Predict which models will be opened next.
+
+    Models that were previously opened shortly after the current one score
+    by how often that happened. Models sharing a category with it add a
+    smaller score, so predictions work before any history exists.
+    """
+
+    #: Score added per category shared with the opened model.
+    CATEGORY_WEIGHT = 0.5
+
+    def __init__(self, state: CacheState, window: float = CO_ACCESS_WINDOW) -> None:
+        self.state = state
+        self.window = window
+        self.recent: Deque[Tuple[float, str]] = deque()
+        self.categories: Dict[str, List[str]] = {}
+        self.members: Dict[str, List[str]] = {}
+
+    def set_categories(self, name: str, categories: Iterable[str]) -> None:
+        """Record the server-side categories of ``name``."""
+        for category in self.categories.get(name, []):
+            self.members[category].remove(name)
+        cats = [c for c in categories if c != NO_CATEGORY_NAME]
+        self.categories[name] = cats
+        for category in cats:
+            self.members.setdefault(category, []).append(name)
+
+    def remove(self, name: str) -> None:
+        """Forget the categories of a model removed from the server."""
+        self.set_categories(name, [])
+        del self.categories[name]
+
+    def observe(self, name: str, now: Optional[float] = None) -> None:
+        """Learn from an access to ``name``."""
+        now = time.time() if now is None else now
+        if self.recent and self.recent[-1][1] == name:
+            # Applications open a file several times while loading it
+            self.recent[-1] = (now, name)
+            return
+        while self.recent and now - self.recent[0][0] > self.window:
+            self.recent.popleft()
+        previous = {n for _, n in self.recent if n != name}
+        if previous:
+            self.state.record_co_access((p, name) for p in previous)
+        self.recent.append((now, name))
+
+    def predict(self, name: str, limit: int) -> List[str]:
+        """Return up to ``limit`` models likely to be opened after ``name``."""
+        scores: Dict[str, float] = {}
+        for other, count in self.state.co_accessed(name, limit * 4):
+            scores[other] = float(count)
+        siblings = set()
+        for category in self.categories.get(name, []):
+            siblings.update(self.members.get(category, []))
+        siblings.discard(name)
+        for other in siblings:
+            shared = len(set(self.categories[other]) & set(self.categories[name]))
+            scores[other] = scores.get(other, 0.0) + self.CATEGORY_WEIGHT * shared
+        # Break ties in favour of models that are opened often in general
+        popularity = self.state.hits(scores)
+        ranked = sorted(scores, key=lambda n: (scores[n], popularity.get(n, 0)), reverse=True)
+        return ranked[:limit]
+
+
+@dataclass
+class ClientConfig:
+    """Settings read from ``config.toml``."""
+
+    server_url: str = "http://127.0.0.1:5000"
+    data_dir: Path = Path("./lora_mount")
+    username: str = ""
+    password: str = ""
+    api_token: str = ""
+    cache_bytes: int = DEFAULT_CACHE_BYTES
+    eviction: str = "lru"
+    download_workers: int = 4
+    prefetch: int = 3
+    sync_interval: float = 30.0
+    blob_dir: Optional[Path] = None
+
 
 class LazyDownloader:
     """Monitor placeholder files and download them on demand."""
@@ -30,50 +602,433 @@ class LazyDownloader:
         self,
         server_url: str,
         data_dir: Path,
-        expire_seconds: int = 60,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        eviction: str = "lru",
+        download_workers: int = 4,
+        prefetch: int = 3,
+        sync_interval: float = 30.0,
         username: Optional[str] = None,
         password: Optional[str] = None,
+        state_path: Optional[Path] = None,
+        blob_dir: Optional[Path] = None,
+        api_token: Optional[str] = None,
     ) -> None:
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {', '.join(EVICTION_POLICIES)}")
         self.server_url = server_url.rstrip("/")
         self.data_dir = data_dir
-        self.expire_seconds = expire_seconds
+        self.cache_bytes = cache_bytes
+        self.eviction = eviction
         self.username = username or ""
         self.password = password or ""
-        self.access_times: Dict[Path, float] = {}
+        self.api_token = api_token or ""
+        self.prefetch = prefetch
+        self.sync_interval = sync_interval
+        self.state = CacheState(state_path or data_dir / ".lazy_cache.db")
+        self.policy = PrefetchPolicy(self.state)
+        # With a shared blob store the byte budget covers all mounts using it
+        self.blobs = BlobStore(blob_dir) if blob_dir else None
+        # Files currently opened by applications are never evicted
+        self.open_files: Counter[str] = Counter()
+        self.pending: Dict[str, Future] = {}
+        # Names in ``pending`` that are prefetches and may be paused
+        self.background: set[str] = set()
+        # Reentrant because cancelling a future runs its done callback
+        # synchronously, which takes the lock again
+        self.lock = threading.RLock()
+        # Notified whenever a download finishes
+        self.idle = threading.Condition(self.lock)
+        self.evict_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=download_workers, thread_name_prefix="lora-download"
+        )
+        # A single low priority thread keeps prefetching from competing with
+        # on-demand downloads for CPU and bandwidth
+        self.prefetch_executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="lora-prefetch",
+            initializer=_lower_thread_priority,
+        )
+        self.last_report = time.monotonic()
         self.inotify = INotify()
         # `inotify_simple` does not provide a combined CLOSE flag, so listen to
         # both close events explicitly
         close_flags = flags.CLOSE_WRITE | flags.CLOSE_NOWRITE
         self.inotify.add_watch(str(self.data_dir), flags.OPEN | close_flags)
-        self.client = httpx.Client(follow_redirects=False)
+        # An API token authenticates every request without a login
+        headers = {"Authorization": f"Bearer {self.api_token}"} if self.api_token else {}
+        self.client = httpx.Client(follow_redirects=False, headers=headers)
 
-    def ensure_placeholders(self) -> None:
-        resp = self.client.get(f"{self.server_url}/search", params={"query": "*"})
-        resp.raise_for_status()
-        for entry in resp.json():
-            path = self.data_dir / entry["filename"]
-            path.touch(exist_ok=True)
+    def make_placeholder(
+        self, path: Path, size: int, sha256: Optional[str] = None
+    ) -> None:
+        """Replace ``path`` with a sparse placeholder of ``size`` bytes.
+
+        The placeholder reports the real file size but occupies no disk
+        space. Whether a file is downloaded is tracked in the state database.
+        """
+        write_placeholder(path, size)
+        self.state.mark_placeholder(path.name, size, sha256)
+
+    def is_local(self, name: str) -> bool:
+        """Return ``True`` if ``name`` is downloaded and was not evicted since."""
+        if not self.state.is_downloaded(name):
+            return False
+        path = self.data_dir / name
+        if path.exists() and not is_placeholder(path):
+            return True
+        # Evicted from the shared blob store by another mount
+        entry = self.state.entry(name)
+        self.state.mark_placeholder(name, entry[1])
+        if self.state.set_prefetched(name, False):
+            self.state.increment("prefetch_wasted")
+        return False
+
+    def _cached_bytes(self) -> int:
+        if self.blobs is not None:
+            return self.blobs.total_bytes()
+        return self.state.cached_bytes()
+
+    def _busy(self, name: str) -> bool:
+        with self.lock:
+            return self.open_files[name] > 0 or name in self.pending
+
+    def _apply_entry(self, row: dict) -> None:
+        """Create or refresh the placeholder for a ``/manifest`` entry."""
+        name = row["filename"]
+        size = int(row.get("size") or 0)
+        sha256 = row.get("sha256")
+        self.policy.set_categories(name, row.get("categories") or [])
+        path = self.data_dir / name
+        entry = self.state.entry(name)
+        if (
+            path.exists()
+            and entry
+            and entry[1] == size
+            and (sha256 is None or entry[2] in (None, sha256))
+        ):
+            if sha256 and entry[2] is None:
+                # Known from a sync without hashes
+                self.state.set_sha256(name, sha256)
+            return
+        if path.exists() and self._busy(name):
+            return
+        # New model, legacy empty placeholder or replaced on the server
+        self.make_placeholder(path, size, sha256)
 
-    def download(self, name: str) -> None:
-        url = f"{self.server_url}/uploads/{name}"
-        resp = self.client.get(url)
+    def _remove(self, name: str) -> None:
+        """Delete a model that no longer exists on the server."""
+        if self._busy(name):
+            return
+        (self.data_dir / name).unlink(missing_ok=True)
+        self.state.forget(name)
+        if name in self.policy.categories:
+            self.policy.remove(name)
+
+    @property
+    def _hashes(self) -> str:
+        # Hashing is costly on the server and only needed to share blobs
+        return "true" if self.blobs is not None else "false"
+
+    def _get_json(self, path: str, params: dict, timeout: float = 30.0) -> dict:
+        resp = self.client.get(f"{self.server_url}{path}", params=params, timeout=timeout)
         resp.raise_for_status()
-        (self.data_dir / name).write_bytes(resp.content)
-
-    def cleanup(self) -> None:
-        now = time.time()
-        for path, ts in list(self.access_times.items()):
-            if (
-                now - ts > self.expire_seconds
-                and path.exists()
-                and path.stat().st_size > 0
+        return resp.json()
+
+    def ensure_placeholders(self) -> None:
+        """Mirror the complete catalogue and remove models missing on the server.
+
+        The change feed position reported with the first page is stored so
+        :py:meth:`sync_changes` continues from there.
+        """
+        seen: set[str] = set()
+        seq = None
+        after = 0
+        while True:
+            page = self._get_json(
+                "/manifest", {"after": after, "limit": MANIFEST_BATCH, "hashes": self._hashes}
+            )
+            if seq is None:
+                seq = page["seq"]
+            for row in page["entries"]:
+                self._apply_entry(row)
+                seen.add(row["filename"])
+            if page["next"] is None:
+                break
+            after = page["next"]
+        local = {p.name for p in self.data_dir.glob("*.safetensors")}
+        for name in (local | self.state.names()) - seen:
+            self._remove(name)
+        self.state.set_sync_value("since", seq)
+        self.state.flush()
+
+    def sync_changes(self, wait: float = 0) -> None:
+        """Apply catalogue changes recorded since the last synchronisation.
+
+        With ``wait`` the server holds the request open until a change
+        arrives. Falls back to a full resync if the position is no longer
+        available on the server.
+        """
+        since = self.state.sync_value("since")
+        if since is None:
+            self.ensure_placeholders()
+            return
+        while True:
+            resp = self.client.get(
+                f"{self.server_url}/changes",
+                params={"since": since, "limit": MANIFEST_BATCH, "wait": wait},
+                timeout=wait + 30,
+            )
+            if resp.status_code == 410:
+                self.ensure_placeholders()
+                return
+            resp.raise_for_status()
+            payload = resp.json()
+            changed: set[str] = set()
+            removed: set[str] = set()
+            resync = False
+            for change in payload["changes"]:
+                name = change.get("filename")
+                if change["kind"] == "remove":
+                    removed.add(name)
+                    changed.discard(name)
+                elif change["kind"] == "category_delete":
+                    # Affects the categories of many models at once
+                    resync = True
+                elif name and change["kind"] != "preview":
+                    changed.add(name)
+                    removed.discard(name)
+            if resync:
+                self.ensure_placeholders()
+                return
+            for name in removed:
+                self._remove(name)
+            if changed:
+                page = self._get_json(
+                    "/manifest", {"files": ",".join(sorted(changed)), "hashes": self._hashes}
+                )
+                for row in page["entries"]:
+                    self._apply_entry(row)
+                    changed.discard(row["filename"])
+                # Added and removed again before we looked
+                for name in changed:
+                    self._remove(name)
+            since = payload["last_seq"]
+            self.state.set_sync_value("since", since)
+            self.state.flush()
+            if not payload["has_more"]:
+                return
+            wait = 0
+
+    def _sync_loop(self) -> None:
+        while True:
+            try:
+                self.sync_changes(wait=self.sync_interval)
+            except httpx.HTTPError as exc:
+                print(f"Catalogue sync failed: {exc}")
+                time.sleep(self.sync_interval)
+
+    def _stream_to(self, name: str, dest: Path, background: bool) -> str:
+        """Write the content of ``name`` to ``dest`` and return its SHA-256."""
+        digest = hashlib.sha256()
+        with self.client.stream("GET", f"{self.server_url}/download/{name}") as resp:
+            resp.raise_for_status()
+            with dest.open("wb") as fh:
+                for chunk in resp.iter_bytes(CHUNK_SIZE):
+                    if background:
+                        self._wait_for_idle(name)
+                    digest.update(chunk)
+                    fh.write(chunk)
+        return digest.hexdigest()
+
+    def download(self, name: str, background: bool = False) -> None:
+        """Stream ``name`` to a temporary file and move it into place.
+
+        With a shared blob store the content is fetched only if no other
+        mount holds it yet and is then linked into place. Background
+        downloads pause while an on-demand download is running.
+        """
+        path = self.data_dir / name
+        entry = self.state.entry(name)
+        sha256 = entry[2] if entry else None
+        if self.blobs is not None and sha256:
+            size = self.blobs.materialize(
+                sha256, path, lambda tmp: self._stream_to(name, tmp, background)
+            )
+        else:
+            tmp = path.with_name(f".{name}.part")
+            try:
+                self._stream_to(name, tmp, background)
+                size = tmp.stat().st_size
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+        self.state.mark_downloaded(name, size)
+        self.enforce_budget()
+
+    def request_download(self, name: str) -> Future:
+        """Queue a download of ``name`` unless one is already running."""
+        with self.lock:
+            future = self.pending.get(name)
+            if future is not None and name in self.background:
+                # Promote the prefetch: still queued prefetches are replaced by
+                # an on-demand download, running ones are no longer cancelled
+                self.background.discard(name)
+                if future.cancel():
+                    future = None
+            if future is None:
+                future = self.executor.submit(self.download, name)
+                self.pending[name] = future
+                future.add_done_callback(lambda f: self._download_done(name, f))
+            return future
+
+    def _download_done(self, name: str, future: Future) -> None:
+        with self.lock:
+            if self.pending.get(name) is future:
+                del self.pending[name]
+                self.background.discard(name)
+            self.idle.notify_all()
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            print(f"Download of {name} failed: {exc}")
+
+    def _wait_for_idle(self, name: str) -> None:
+        """Block the prefetch of ``name`` while on-demand downloads are running."""
+        with self.idle:
+            while name in self.background and any(
+                n not in self.background for n in self.pending
             ):
-                path.unlink(missing_ok=True)
-                path.touch()
-                del self.access_times[path]
+                self.idle.wait()
+
+    def schedule_prefetch(self, name: str) -> None:
+        """Queue background downloads of the models predicted to follow ``name``."""
+        if self.prefetch <= 0:
+            return
+        if self._cached_bytes() >= self.cache_bytes * PREFETCH_HEADROOM:
+            return
+        for candidate in self.policy.predict(name, self.prefetch):
+            path = self.data_dir / candidate
+            if not path.exists() or self.is_local(candidate):
+                continue
+            with self.lock:
+                if candidate in self.pending:
+                    continue
+                future = self.prefetch_executor.submit(self._prefetch, candidate)
+                self.pending[candidate] = future
+                self.background.add(candidate)
+            future.add_done_callback(lambda f, n=candidate: self._download_done(n, f))
+
+    def _prefetch(self, name: str) -> None:
+        self._wait_for_idle(name)
+        if self._cached_bytes() >= self.cache_bytes * PREFETCH_HEADROOM:
+            return
+        if self.is_local(name):
+            return
+        self.download(name, background=True)
+        self.state.increment("prefetched")
+        with self.lock:
+            promoted = name not in self.background
+        if promoted:
+            # Opened while the prefetch was running
+            self.state.increment("prefetch_hits")
+        else:
+            self.state.set_prefetched(name, True)
+
+    def prefetch_stats(self) -> Dict[str, float]:
+        """Return prefetch counters and the hit rate.
+
+        The hit rate is the share of completed prefetches whose model was
+        opened (or requested while still downloading) before being evicted.
+        """
+        counters = self.state.counters()
+        prefetched = counters.get("prefetched", 0)
+        hits = counters.get("prefetch_hits", 0)
+        return {
+            "prefetched": prefetched,
+            "hits": hits,
+            "wasted": counters.get("prefetch_wasted", 0),
+            "hit_rate": hits / prefetched if prefetched else 0.0,
+        }
+
+    def report(self) -> str:
+        stats = self.prefetch_stats()
+        return (
+            f"Prefetch: {stats['hits']} of {stats['prefetched']} prefetched models "
+            f"used ({stats['hit_rate']:.0%}), {stats['wasted']} evicted unused"
+        )
+
+    def enforce_budget(self) -> None:
+        """Evict downloaded files until the cache fits into ``cache_bytes``."""
+        if self.blobs is not None:
+            # Files of other mounts are evicted too; they notice on next open
+            mount = self.data_dir.resolve()
+            self.blobs.enforce_budget(
+                self.cache_bytes,
+                self.eviction,
+                keep=lambda p: p.parent == mount and self._busy(p.name),
+            )
+            return
+        with self.evict_lock:
+            total = self.state.cached_bytes()
+            if total <= self.cache_bytes:
+                return
+            for name, size in self.state.eviction_order(self.eviction):
+                if total <= self.cache_bytes:
+                    break
+                if self._busy(name):
+                    continue
+                self.make_placeholder(self.data_dir / name, size)
+                if self.state.set_prefetched(name, False):
+                    self.state.increment("prefetch_wasted")
+                total -= size
+
+    def handle_event(self, event) -> None:
+        name = event.name
+        # Ignore our own temporary files and anything that is not a model
+        if name.startswith(".") or not name.endswith(".safetensors"):
+            return
+        path = self.data_dir / name
+        if event.mask & flags.OPEN:
+            with self.lock:
+                self.open_files[name] += 1
+            self.state.record_access(name)
+            entry = self.state.entry(name)
+            if self.blobs is not None and entry and entry[2]:
+                self.blobs.record_access(entry[2])
+            if path.exists() and not self.is_local(name):
+                self.request_download(name)
+            elif self.state.set_prefetched(name, False):
+                self.state.increment("prefetch_hits")
+            self.policy.observe(name)
+            self.schedule_prefetch(name)
+        elif event.mask & (flags.CLOSE_WRITE | flags.CLOSE_NOWRITE):
+            with self.lock:
+                if self.open_files[name] > 0:
+                    self.open_files[name] -= 1
+
+    def reconcile(self) -> None:
+        """Check the recorded download state against the files on disk."""
+        for name in self.state.names():
+            path = self.data_dir / name
+            entry = self.state.entry(name)
+            if not path.exists() or (entry[0] and path.stat().st_size != entry[1]):
+                # Deleted or modified locally
+                self.make_placeholder(path, entry[1])
+        for path in self.data_dir.glob("*.safetensors"):
+            if self.state.entry(path.name) is not None:
+                continue
+            st = path.stat()
+            # Sparse placeholders have (almost) no blocks allocated
+            if st.st_size and st.st_blocks * 512 >= st.st_size:
+                self.state.mark_downloaded(path.name, st.st_size)
+            else:
+                self.state.mark_placeholder(path.name, st.st_size)
+        self.state.flush()
 
     def run(self) -> None:
-        if self.username and self.password:
+        if not self.api_token and self.username and self.password:
             resp = self.client.post(
                 f"{self.server_url}/login",
                 data={"username": self.username, "password": self.password},
@@ -83,40 +1038,62 @@ class LazyDownloader:
             # is disabled.
             if resp.status_code != 303:
                 resp.raise_for_status()
-        self.ensure_placeholders()
+        self.reconcile()
+        self.sync_changes()
+        self.enforce_budget()
+        threading.Thread(target=self._sync_loop, daemon=True).start()
         while True:
             for event in self.inotify.read(timeout=1000):
-                path = self.data_dir / event.name
-                if event.mask & flags.OPEN:
-                    if path.stat().st_size == 0:
-                        self.download(event.name)
-                    self.access_times[path] = time.time()
-                elif event.mask & (flags.CLOSE_WRITE | flags.CLOSE_NOWRITE):
-                    self.access_times[path] = time.time()
-            self.cleanup()
+                self.handle_event(event)
+            self.state.flush()
+            if time.monotonic() - self.last_report >= REPORT_INTERVAL:
+                self.last_report = time.monotonic()
+                print(self.report())
 
 
-def load_config() -> tuple[str, Path, str, str]:
+def load_config() -> ClientConfig:
     with CONFIG_PATH.open("rb") as fh:
         cfg = tomllib.load(fh)
-    server_url = cfg.get("server_url", "http://127.0.0.1:5000")
-    data_dir = Path(cfg.get("data_dir", "./lora_mount"))
-    username = cfg.get("username", "")
-    password = cfg.get("password", "")
-    data_dir.mkdir(parents=True, exist_ok=True)
-    return server_url, data_dir, username, password
+    config = ClientConfig(
+        server_url=cfg.get("server_url", "http://127.0.0.1:5000"),
+        data_dir=Path(cfg.get("data_dir", "./lora_mount")),
+        username=cfg.get("username", ""),
+        password=cfg.get("password", ""),
+        api_token=cfg.get("api_token", ""),
+        cache_bytes=int(float(cfg.get("cache_size_gb", 20)) * 1024**3),
+        eviction=cfg.get("eviction", "lru"),
+        download_workers=int(cfg.get("download_workers", 4)),
+        prefetch=int(cfg.get("prefetch", 3)),
+        sync_interval=float(cfg.get("sync_interval", 30)),
+        blob_dir=Path(cfg["blob_dir"]) if cfg.get("blob_dir") else None,
+    )
+    config.data_dir.mkdir(parents=True, exist_ok=True)
+    return config
 
 
 def main() -> None:
-    server, data_dir, username, password = load_config()
-    downloader = LazyDownloader(server, data_dir, username=username, password=password)
+    config = load_config()
+    downloader = LazyDownloader(
+        config.server_url,
+        config.data_dir,
+        cache_bytes=config.cache_bytes,
+        eviction=config.eviction,
+        download_workers=config.download_workers,
+        prefetch=config.prefetch,
+        sync_interval=config.sync_interval,
+        username=config.username,
+        password=config.password,
+        api_token=config.api_token,
+        blob_dir=config.blob_dir,
+    )
     thread = threading.Thread(target=downloader.run, daemon=True)
     thread.start()
-    print(f"Listening for accesses in {data_dir} (Ctrl+C to stop)")
+    print(f"Listening for accesses in {config.data_dir} (Ctrl+C to stop)")
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
+        print(downloader.report())
         print("Stopping...")
 
 
@@ -15,5 +15,27 @@ STATIC_DIR = BASE_DIR / "loradb" / "static"
 # Directory containing Jinja2 templates
 TEMPLATE_DIR = BASE_DIR / "loradb" / "templates"
 
+# Optional directory mirroring the catalogue as a tree of links to the
+# uploaded files, for tools running on the same host. ``None`` disables it.
+PUBLISH_DIR = None
+# Path of each link below PUBLISH_DIR. Placeholders: {category}, {base_model},
+# {architecture}, {name}, {stem} and {filename}.
+PUBLISH_TEMPLATE = "{category}/{filename}"
+# "hardlink" (same file system as UPLOAD_DIR) or "symlink"
+PUBLISH_MODE = "hardlink"
+
+# Index files added to or removed from UPLOAD_DIR outside the API, e.g. by
+# rsync. Uses inotify where available and rescans the directory otherwise.
+WATCH_UPLOADS = True
+# Seconds a file must stay unchanged before it is indexed
+WATCH_DEBOUNCE = 1.0
+# Seconds between rescans when inotify is unavailable
+WATCH_POLL_INTERVAL = 2.0
+
+# Statements on the index taking longer than this many seconds are logged
+# with their query plan and listed on /admin/slow_queries. ``None`` disables
+# tracing.
+SLOW_QUERY_THRESHOLD = 0.1
+
 # Secret key for session cookies
 SECRET_KEY = "change_this_secret"
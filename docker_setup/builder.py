@@ -33,6 +33,7 @@ FROM python:3.11-slim
 WORKDIR /app
 COPY . /app
 RUN pip install --no-cache-dir -r requirements.txt
+RUN python precompress_static.py
 EXPOSE 5000
 CMD [\"python\", \"main.py\"]
 """
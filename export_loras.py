@@ -7,13 +7,15 @@ instance and organise them into a structured folder layout for offline use.
 from __future__ import annotations
 
 import argparse
+import asyncio
+import json
+import os
 import sys
 import time
-from dataclasses import dataclass
-from html.parser import HTMLParser
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable
-from urllib.parse import urljoin
+from typing import AsyncIterator, Iterable
+from urllib.parse import urlsplit
 
 import httpx
 
@@ -23,6 +25,19 @@ import httpx
 MYLORA_HOST = "http://127.0.0.1:5000"
 MYLORA_USERNAME = ""
 MYLORA_PASSWORD = ""
+# API token created via ``POST /api_tokens`` or ``usersetup.py --api-token``.
+# Takes precedence over username and password and avoids the login request.
+MYLORA_TOKEN = ""
+
+#: Name of the manifest written to the export destination.
+MANIFEST_NAME = "export_manifest.json"
+#: Block size used when streaming files to disk.
+CHUNK_SIZE = 1024 * 1024
+
+
+def auth_headers(token: str) -> dict[str, str]:
+    """Return the headers authenticating requests with an API ``token``."""
+    return {"Authorization": f"Bearer {token}"} if token else {}
 
 
 @dataclass
@@ -33,46 +48,85 @@ class LoraEntry:
     name: str
     tags: str
     categories: list[str]
+    size: int | None = None
+    sha256: str | None = None
+    previews: list[str] = field(default_factory=list)
 
     @property
     def stem(self) -> str:
         return Path(self.filename).stem
 
 
-class PreviewImageParser(HTMLParser):
-    """Parse preview image URLs from a MyLora detail page."""
+class ExportManifest:
+    """Record of exported files used to skip unchanged models on later runs.
+
+    The manifest is rewritten atomically and at most every ``save_interval``
+    seconds unless a save is forced.
+    """
 
-    def __init__(self) -> None:
-        super().__init__()
-        self._urls: set[str] = set()
+    def __init__(self, path: Path, save_interval: float = 10.0) -> None:
+        self.path = path
+        self.save_interval = save_interval
+        self.entries: dict[str, dict] = {}
+        self.dirty = False
+        self.last_save = time.monotonic()
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                self.entries = dict(data.get("entries") or {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, filename: str) -> dict | None:
+        return self.entries.get(filename)
 
-    def handle_starttag(self, tag: str, attrs: Iterable[tuple[str, str | None]]) -> None:
-        if tag != "img":
+    def update(self, filename: str, **fields: object) -> None:
+        self.entries.setdefault(filename, {}).update(fields)
+        self.dirty = True
+        self.save()
+
+    def save(self, force: bool = False) -> None:
+        if not self.dirty:
+            return
+        if not force and time.monotonic() - self.last_save < self.save_interval:
             return
-        for key, value in attrs:
-            if key == "src" and value and value.startswith("/uploads/"):
-                self._urls.add(value)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": 1, "entries": self.entries}, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        self.last_save = time.monotonic()
 
-    @property
-    def urls(self) -> list[str]:
-        return sorted(self._urls)
 
+class AsyncLoraExporter:
+    """Concurrent, resumable exporter built on ``httpx.AsyncClient``.
 
-class MyLoraExporter:
-    """Export LoRA models and preview images from a MyLora instance."""
+    Files are streamed to ``.part`` files and renamed into place once
+    complete. Interrupted downloads resume with ``Range``/``If-Range`` and
+    models recorded in the manifest are revalidated with ``If-None-Match``
+    instead of being downloaded again.
+    """
 
     def __init__(
         self,
         base_url: str,
         username: str,
         password: str,
+        destination: Path,
         *,
+        concurrency: int = 4,
         timeout: float = 30.0,
         retries: int = 3,
         retry_backoff: float = 2.0,
+        token: str = "",
     ) -> None:
         if not base_url:
             raise ValueError("MYLORA_HOST is not configured")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
         if retries < 1:
             raise ValueError("retries must be at least 1")
         if timeout <= 0:
@@ -83,43 +137,39 @@ class MyLoraExporter:
         self.base_url = base_url.rstrip("/")
         self.username = username
         self.password = password
+        self.token = token
+        self.destination = destination
+        self.concurrency = concurrency
         self.retries = retries
         self.retry_backoff = retry_backoff
-        timeout_config = httpx.Timeout(timeout, connect=timeout, read=timeout, write=timeout)
-        self.client = httpx.Client(
-            base_url=self.base_url, follow_redirects=False, timeout=timeout_config
+        self.timeout = httpx.Timeout(timeout, connect=timeout, read=timeout, write=timeout)
+        self.manifest = ExportManifest(destination / MANIFEST_NAME)
+        self.client: httpx.AsyncClient | None = None
+        self.successful: list[LoraEntry] = []
+        self.skipped = 0
+        self.total_online = 0
+
+    async def __aenter__(self) -> "AsyncLoraExporter":
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            follow_redirects=False,
+            timeout=self.timeout,
+            headers=auth_headers(self.token),
+            limits=httpx.Limits(max_connections=self.concurrency * 2),
         )
+        return self
 
-    def _get_with_retry(
-        self,
-        url: str,
-        *,
-        headers: dict[str, str] | None = None,
-        params: dict[str, object] | None = None,
-    ) -> httpx.Response:
-        """Issue a GET request and retry on read timeouts."""
+    async def __aexit__(self, *exc_info) -> None:
+        self.manifest.save(force=True)
+        if self.client is not None:
+            await self.client.aclose()
 
-        last_exception: httpx.ReadTimeout | None = None
-        for attempt in range(1, self.retries + 1):
-            try:
-                return self.client.get(url, headers=headers, params=params)
-            except httpx.ReadTimeout as exc:
-                last_exception = exc
-                if attempt == self.retries:
-                    break
-                wait_time = self.retry_backoff ** (attempt - 1)
-                time.sleep(wait_time)
-
-        raise RuntimeError(
-            f"Request to {url} timed out after {self.retries} attempts"
-        ) from last_exception
-
-    def login(self) -> None:
+    async def login(self) -> None:
         """Authenticate against the MyLora instance if credentials are provided."""
 
-        if not self.username or not self.password:
+        if self.token or not self.username or not self.password:
             return
-        resp = self.client.post(
+        resp = await self.client.post(
             "/login",
             data={"username": self.username, "password": self.password},
             headers={"Accept": "text/html"},
@@ -129,89 +179,163 @@ class MyLoraExporter:
                 "Login failed – verify MYLORA_USERNAME and MYLORA_PASSWORD"
             )
 
-    def iter_entries(self, limit: int = 100) -> Iterable[LoraEntry]:
-        """Yield LoRA entries in batches to avoid loading the full catalogue."""
+    async def iter_entries(self, limit: int = 1000) -> AsyncIterator[LoraEntry]:
+        """Yield LoRA entries from the server's export manifest, page by page."""
 
-        if limit < 1:
-            raise ValueError("limit must be at least 1")
-
-        seen: set[str] = set()
-        offset = 0
+        after = 0
         while True:
-            resp = self._get_with_retry(
-                "/grid_data",
-                params={"q": "*", "limit": limit, "offset": offset},
+            resp = await self.client.get(
+                "/manifest",
+                params={"after": after, "limit": limit, "hashes": "true"},
                 headers={"Accept": "application/json"},
             )
             if resp.status_code == 303:
                 raise RuntimeError("Access denied. Please provide valid credentials.")
             resp.raise_for_status()
             payload = resp.json()
-            if not payload:
-                break
-            for row in payload:
-                filename = row.get("filename")
-                if not filename:
-                    continue
-                if filename in seen:
-                    continue
-                entry = LoraEntry(
+            for row in payload["entries"]:
+                filename = row["filename"]
+                yield LoraEntry(
                     filename=filename,
                     name=row.get("name") or Path(filename).stem,
                     tags=row.get("tags") or "",
                     categories=list(row.get("categories") or []),
+                    size=row.get("size"),
+                    sha256=row.get("sha256"),
+                    previews=list(row.get("previews") or []),
                 )
-                seen.add(filename)
-                yield entry
-            if len(payload) < limit:
+            if payload.get("next") is None:
                 break
-            offset += limit
-
-    def fetch_entries(self, limit: int = 100) -> list[LoraEntry]:
-        """Return all LoRA entries available in MyLora."""
-
-        return list(self.iter_entries(limit=limit))
+            after = payload["next"]
 
-    def download_lora(self, entry: LoraEntry, target_dir: Path) -> Path:
-        """Download the `.safetensors` file for ``entry`` into ``target_dir``."""
+    async def download_lora(self, entry: LoraEntry, target_dir: Path) -> bool:
+        """Download ``entry`` into ``target_dir``; return ``False`` if it was unchanged."""
 
         target_dir.mkdir(parents=True, exist_ok=True)
         lora_path = target_dir / entry.filename
-        resp = self._get_with_retry(
-            f"/uploads/{entry.filename}",
-            headers={"Accept": "application/octet-stream"},
-        )
-        resp.raise_for_status()
-        lora_path.write_bytes(resp.content)
-        return lora_path
-
-    def fetch_preview_urls(self, filename: str) -> list[str]:
-        """Retrieve preview image URLs for ``filename`` by parsing the detail view."""
-
-        resp = self._get_with_retry(f"/detail/{filename}", headers={"Accept": "text/html"})
-        if resp.status_code == 303:
-            raise RuntimeError("Preview access denied – check permissions.")
-        resp.raise_for_status()
-        parser = PreviewImageParser()
-        parser.feed(resp.text)
-        return parser.urls
-
-    def download_previews(self, urls: Iterable[str], target_dir: Path) -> list[Path]:
-        """Download preview images referenced by ``urls`` into ``target_dir``."""
-
-        target_dir.mkdir(parents=True, exist_ok=True)
-        saved_paths: list[Path] = []
+        part_path = lora_path.with_name(lora_path.name + ".part")
+        etag_path = part_path.with_name(part_path.name + ".etag")
+        headers = {"Accept": "application/octet-stream"}
+
+        record = self.manifest.get(entry.filename)
+        if (
+            record
+            and entry.sha256
+            and record.get("sha256") == entry.sha256
+            and lora_path.exists()
+            and lora_path.stat().st_size == entry.size
+        ):
+            # Same content hash as the exported copy, no request needed
+            return False
+        if (
+            record
+            and record.get("etag")
+            and lora_path.exists()
+            and lora_path.stat().st_size == record.get("size")
+        ):
+            headers["If-None-Match"] = record["etag"]
+        offset = 0
+        if part_path.exists() and etag_path.exists():
+            offset = part_path.stat().st_size
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = etag_path.read_text(encoding="utf-8").strip()
+
+        async with self.client.stream(
+            "GET", f"/download/{entry.filename}", headers=headers
+        ) as resp:
+            if resp.status_code == 304:
+                self.manifest.update(entry.filename, sha256=entry.sha256)
+                return False
+            if resp.status_code == 303:
+                raise RuntimeError("Download access denied – check permissions.")
+            if resp.status_code == 416:
+                # The partial file is already complete or belongs to an old version
+                total = resp.headers.get("content-range", "").rpartition("/")[2]
+                if total.isdigit() and int(total) == offset:
+                    etag = headers["If-Range"]
+                else:
+                    part_path.unlink(missing_ok=True)
+                    etag_path.unlink(missing_ok=True)
+                    raise RuntimeError("Partial download is stale, restarting")
+            else:
+                resp.raise_for_status()
+                etag = resp.headers.get("etag", "")
+                etag_path.write_text(etag, encoding="utf-8")
+                mode = "ab" if resp.status_code == 206 else "wb"
+                with part_path.open(mode) as fh:
+                    async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                        await asyncio.to_thread(fh.write, chunk)
+
+        size = part_path.stat().st_size
+        os.replace(part_path, lora_path)
+        etag_path.unlink(missing_ok=True)
+        self.manifest.update(entry.filename, size=size, etag=etag, sha256=entry.sha256)
+        return True
+
+    async def download_previews(self, entry: LoraEntry, urls: Iterable[str], target_dir: Path) -> None:
+        """Download preview images not yet present in ``target_dir``."""
+
+        record = self.manifest.get(entry.filename) or {}
+        known: dict[str, str] = dict(record.get("previews") or {})
         for url in urls:
-            absolute = urljoin(self.base_url + "/", url.lstrip("/"))
-            filename = Path(url).name
-            resp = self._get_with_retry(absolute, headers={"Accept": "image/*"})
+            name = Path(urlsplit(url).path).name
+            path = target_dir / name
+            # Preview URLs carry a content fingerprint, an unchanged URL means
+            # an unchanged image
+            if path.exists() and known.get(name) == url:
+                continue
+            resp = await self.client.get(url, headers={"Accept": "image/*"})
             if resp.status_code == 404:
                 continue
             resp.raise_for_status()
-            path = target_dir / filename
-            path.write_bytes(resp.content)
-            saved_paths.append(path)
-        return saved_paths
+            target_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".part")
+            tmp_path.write_bytes(resp.content)
+            os.replace(tmp_path, path)
+            known[name] = url
+        self.manifest.update(entry.filename, previews=known)
+
+    async def export_entry(self, entry: LoraEntry) -> None:
+        """Export a single model with retries; resumes partial files on retry."""
+
+        lora_dir = self.destination / entry.stem
+        images_dir = lora_dir / f"{entry.stem}-Images"
+        for attempt in range(1, self.retries + 1):
+            try:
+                changed = await self.download_lora(entry, lora_dir)
+                await self.download_previews(entry, entry.previews, images_dir)
+                if not changed:
+                    self.skipped += 1
+                self.successful.append(entry)
+                return
+            except (httpx.TransportError, RuntimeError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.retry_backoff ** (attempt - 1))
+
+    async def _export_guarded(self, entry: LoraEntry, slots: asyncio.Semaphore) -> None:
+        try:
+            await self.export_entry(entry)
+        except Exception as exc:  # noqa: BLE001
+            print(f"Failed to export {entry.filename}: {exc}", file=sys.stderr)
+        finally:
+            slots.release()
+
+    async def run(self, batch_size: int = 1000) -> None:
+        """Export every model, running up to ``concurrency`` exports at once."""
+
+        await self.login()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task] = set()
+        async for entry in self.iter_entries(limit=batch_size):
+            self.total_online += 1
+            # Acquire before creating the task so pending work stays bounded
+            await slots.acquire()
+            task = asyncio.create_task(self._export_guarded(entry, slots))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
 
 
 def build_summary(entries: list[LoraEntry]) -> str:
@@ -249,6 +373,12 @@ def parse_args() -> argparse.Namespace:
         default=MYLORA_PASSWORD,
         help="MyLora password (defaults to MYLORA_PASSWORD)",
     )
+    parser.add_argument(
+        "--token",
+        default=MYLORA_TOKEN,
+        help="MyLora API token used instead of username and password "
+        "(defaults to MYLORA_TOKEN)",
+    )
     parser.add_argument(
         "--timeout",
         type=float,
@@ -270,45 +400,48 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=100,
-        help="Number of entries to request per batch during export (default: 100)",
+        default=1000,
+        help="Number of entries to request per batch during export (default: 1000)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of models exported in parallel (default: 4)",
     )
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
-    destination: Path = args.destination
-    exporter = MyLoraExporter(
+async def export_all(args: argparse.Namespace) -> AsyncLoraExporter:
+    async with AsyncLoraExporter(
         args.host,
         args.username,
         args.password,
+        args.destination,
+        concurrency=args.concurrency,
         timeout=args.timeout,
         retries=args.retries,
         retry_backoff=args.retry_backoff,
-    )
-    exporter.login()
-    successful: list[LoraEntry] = []
-    total_online = 0
+        token=args.token,
+    ) as exporter:
+        await exporter.run(batch_size=args.batch_size)
+    return exporter
 
-    for entry in exporter.iter_entries(limit=args.batch_size):
-        total_online += 1
-        lora_dir = destination / entry.stem
-        images_dir = lora_dir / f"{entry.stem}-Images"
-        try:
-            exporter.download_lora(entry, lora_dir)
-            preview_urls = exporter.fetch_preview_urls(entry.filename)
-            exporter.download_previews(preview_urls, images_dir)
-            successful.append(entry)
-        except Exception as exc:  # noqa: BLE001
-            print(f"Failed to export {entry.filename}: {exc}", file=sys.stderr)
 
-    summary_text = build_summary(successful)
+def main() -> None:
+    args = parse_args()
+    destination: Path = args.destination
+    if args.batch_size < 1:
+        raise ValueError("limit must be at least 1")
+    exporter = asyncio.run(export_all(args))
+
+    summary_text = build_summary(exporter.successful)
     destination.mkdir(parents=True, exist_ok=True)
     (destination / "exported_loras.txt").write_text(summary_text, encoding="utf-8")
 
-    print(f"Loras Online in MyLora: {total_online}")
-    print(f"Loras Offline exportiert: {len(successful)}")
+    print(f"Loras Online in MyLora: {exporter.total_online}")
+    print(f"Loras Offline exportiert: {len(exporter.successful)}")
+    print(f"Davon unverändert übersprungen: {exporter.skipped}")
 
 
 if __name__ == "__main__":
@@ -2,10 +2,16 @@ from .uploader_agent import UploaderAgent
 from .metadata_extractor_agent import MetadataExtractorAgent
 from .indexing_agent import IndexingAgent
 from .frontend_agent import FrontendAgent
+from .download_agent import DownloadAgent
+from .publish_agent import PublishAgent
+from .watch_agent import WatchAgent
 
 __all__ = [
     "UploaderAgent",
     "MetadataExtractorAgent",
     "IndexingAgent",
     "FrontendAgent",
+    "DownloadAgent",
+    "PublishAgent",
+    "WatchAgent",
 ]
@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+
+class DownloadAgent:
+    """Aggregate per-model download statistics and persist them in batches.
+
+    Counters are collected in memory and written to SQLite at most once per
+    ``flush_interval`` seconds, so serving a download never waits on a
+    database write of its own.
+    """
+
+    def __init__(self, db_path: Path | None = None, flush_interval: float = 30.0) -> None:
+        self.db_path = Path(db_path or "loradb/search_index/index.db")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.flush_interval = flush_interval
+        # Mapping of filename to ``[downloads, bytes_served]`` not yet flushed
+        self.pending: Dict[str, List[int]] = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self._ensure_table()
+
+    def _ensure_table(self) -> None:
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS download_stats (
+                filename TEXT PRIMARY KEY,
+                downloads INTEGER NOT NULL DEFAULT 0,
+                bytes_served INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self.conn.commit()
+
+    def record(self, filename: str, offset: int, sent: int) -> None:
+        """Account ``sent`` bytes served for ``filename`` starting at ``offset``.
+
+        Only transfers starting at the beginning of the file count as a new
+        download; resumed or parallel segments just add to the byte total.
+        """
+        with self.lock:
+            entry = self.pending.setdefault(filename, [0, 0])
+            if offset == 0:
+                entry[0] += 1
+            entry[1] += sent
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending counters to the database in one transaction."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        self.conn.executemany(
+            """
+            INSERT INTO download_stats(filename, downloads, bytes_served)
+            VALUES (?, ?, ?)
+            ON CONFLICT(filename) DO UPDATE SET
+                downloads = downloads + excluded.downloads,
+                bytes_served = bytes_served + excluded.bytes_served
+            """,
+            [(name, counts[0], counts[1]) for name, counts in pending.items()],
+        )
+        self.conn.commit()
+
+    def stats(self) -> List[Dict[str, int]]:
+        """Return download statistics including counters not yet flushed."""
+        rows = self.conn.execute(
+            "SELECT filename, downloads, bytes_served FROM download_stats"
+        ).fetchall()
+        totals = {r[0]: [int(r[1]), int(r[2])] for r in rows}
+        with self.lock:
+            for name, counts in self.pending.items():
+                entry = totals.setdefault(name, [0, 0])
+                entry[0] += counts[0]
+                entry[1] += counts[1]
+        result = [
+            {"filename": name, "downloads": counts[0], "bytes_served": counts[1]}
+            for name, counts in totals.items()
+        ]
+        result.sort(key=lambda r: r["downloads"], reverse=True)
+        return result
@@ -1,10 +1,15 @@
 import random
 import re
+import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, List
 
 from jinja2 import Environment, FileSystemLoader
 
+from .. import metrics
+from ..coherence import SharedGenerations
+from ..static_assets import asset_url, static_url
+
 
 class FrontendAgent:
     """Render HTML views for the LoRA gallery using Bootstrap."""
@@ -12,13 +17,21 @@ class FrontendAgent:
     def __init__(self, uploads_dir: Path, template_dir: Path) -> None:
         self.uploads_dir = uploads_dir
         self.env = Environment(loader=FileSystemLoader(template_dir))
+        self.env.globals["static_url"] = static_url
         # Cache mapping a file stem to the list of preview URLs
         self.preview_cache: Dict[str, List[str]] = {}
+        # Bumped whenever previews are invalidated so HTTP validators change
+        self.preview_generation = 0
+        self.preview_last_modified = time.time()
+        # Set when several worker processes serve the same uploads
+        self.shared: SharedGenerations | None = None
 
     def _find_previews(self, stem: str) -> List[str]:
         """Return preview URLs for ``stem`` using a simple cache."""
-        if stem in self.preview_cache:
-            return self.preview_cache[stem]
+        cached = self.preview_cache.get(stem)
+        metrics.cache_lookup("preview", cached is not None)
+        if cached is not None:
+            return cached
         # Only match files for this exact stem. We allow either an exact
         # filename match (``<stem>.png``) or a numeric suffix
         # (``<stem>_1.png``). Previous glob patterns like ``<stem>_*.png``
@@ -31,17 +44,74 @@ class FrontendAgent:
         for p in self.uploads_dir.iterdir():
             if pattern.match(p.name):
                 matches.append(str(p))
-        urls = [f"/uploads/{Path(m).name}" for m in sorted(matches)]
+        # Fingerprinted URLs change whenever a preview is replaced, so the
+        # images can be cached as immutable by browsers. They are derived from
+        # mtime and size as hashing would block the event loop.
+        urls = [
+            asset_url("/uploads", self.uploads_dir, Path(m).name, content=False)
+            for m in sorted(matches)
+        ]
         self.preview_cache[stem] = urls
         return urls
 
+    def find_previews_bulk(self, stems: Iterable[str]) -> Dict[str, List[str]]:
+        """Return preview URLs for several ``stems`` with one directory scan.
+
+        Equivalent to calling :py:meth:`_find_previews` for every stem, but
+        stems missing from the cache are resolved together instead of listing
+        the uploads directory once per stem.
+        """
+        stems = list(stems)
+        result = {s: self.preview_cache[s] for s in stems if s in self.preview_cache}
+        missing = {s for s in stems if s not in result}
+        metrics.CACHE_REQUESTS.inc(len(result), cache="preview", result="hit")
+        metrics.CACHE_REQUESTS.inc(len(missing), cache="preview", result="miss")
+        if not missing:
+            return result
+        found: Dict[str, List[str]] = {s: [] for s in missing}
+        pattern = re.compile(r"^(.+?)((?:_[0-9]+)?)\.(?:png|jpg)$", re.IGNORECASE)
+        for p in self.uploads_dir.iterdir():
+            m = pattern.match(p.name)
+            if not m:
+                continue
+            # ``<stem>_1.png`` may belong to ``<stem>`` or to ``<stem>_1``
+            for candidate in {m.group(1), m.group(1) + m.group(2)}:
+                if candidate in found:
+                    found[candidate].append(p.name)
+        for stem, names in found.items():
+            urls = [
+                asset_url("/uploads", self.uploads_dir, n, content=False)
+                for n in sorted(names)
+            ]
+            self.preview_cache[stem] = urls
+            result[stem] = urls
+        return result
+
     def invalidate_preview_cache(self, stem: str | None = None) -> None:
         """Remove ``stem`` from the preview cache or clear it entirely."""
+        if self.shared is not None:
+            # Other workers drop their whole cache, see ``_previews_changed``
+            self.preview_generation, self.preview_last_modified = self.shared.bump(
+                "previews"
+            )
+        else:
+            self.preview_generation += 1
+            self.preview_last_modified = time.time()
         if stem is None:
             self.preview_cache.clear()
         else:
             self.preview_cache.pop(stem, None)
 
+    def share(self, shared: SharedGenerations) -> None:
+        """Invalidate the preview cache when another worker changes previews."""
+        self.shared = shared
+        shared.subscribe("previews", self._previews_changed)
+
+    def _previews_changed(self, value: int, updated: float) -> None:
+        self.preview_cache.clear()
+        self.preview_generation = value
+        self.preview_last_modified = max(self.preview_last_modified, updated)
+
     def refresh_preview_cache(self, stem: str) -> List[str]:
         """Force re-scan of previews for ``stem`` and return the result."""
         self.invalidate_preview_cache(stem)
@@ -147,3 +217,19 @@ class FrontendAgent:
     ) -> str:
         template = self.env.get_template("user_admin.html")
         return template.render(title="User Administration", users=users, user=user)
+
+    def render_slow_queries(
+        self,
+        queries: List[Dict],
+        threshold: float | None,
+        sort: str,
+        user: Dict[str, str] | None = None,
+    ) -> str:
+        template = self.env.get_template("slow_queries.html")
+        return template.render(
+            title="Slow Queries",
+            queries=queries,
+            threshold=threshold,
+            sort=sort,
+            user=user,
+        )
@@ -1,32 +1,183 @@
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Tuple
+import hashlib
+import logging
 import math
+import threading
+import time
 
 import sqlite3
 from pathlib import Path
 
 import config
+from .. import metrics, query_log
+from ..coherence import SharedGenerations, process_lock
 from .metadata_extractor_agent import MetadataExtractorAgent
 
+logger = logging.getLogger(__name__)
 
+@metrics.instrument
 class IndexingAgent:
-    """Maintain search index for LoRA metadata using SQLite FTS5."""
+    """Maintain search index for LoRA metadata using SQLite FTS5.
+
+    Public methods are timed and their SQLite statements counted for the
+    ``/metrics`` endpoint, see :py:func:`loradb.metrics.instrument`.
+    """
 
     #: ID used for the dynamic "no category" entry returned by
     #: :py:meth:`list_categories`.
     NO_CATEGORY_ID = 0
     #: Display name for the dynamic "no category" entry.
     NO_CATEGORY_NAME = "No Category"
+    #: Change feed entries older than this many seconds are compacted.
+    CHANGE_RETENTION = 30 * 24 * 3600
+    #: Run compaction after this many recorded changes.
+    COMPACT_EVERY = 1000
+    #: Columns of the ``lora_index`` table in schema order.
+    COLUMNS = ("filename", "name", "architecture", "tags", "base_model")
+    #: Location of the index unless another path is given.
+    DEFAULT_DB_PATH = Path("loradb/search_index/index.db")
+    #: Files indexed per transaction by :py:meth:`reindex_all`.
+    REINDEX_BATCH = 200
+    #: Seconds between checks while another worker builds the initial index.
+    INDEX_POLL_INTERVAL = 0.5
+
+    def __init__(self, db_path: Path | None = None, defer_index: bool = False) -> None:
+        """Open the index at ``db_path``, creating it if needed.
 
-    def __init__(self, db_path: Path | None = None) -> None:
-        self.db_path = Path(db_path or "loradb/search_index/index.db")
+        An empty index is filled from the upload directory. With
+        ``defer_index`` this is left to :py:meth:`start_initial_index`, so
+        the caller can serve requests while the index is being built.
+        """
+        self.db_path = Path(db_path or self.DEFAULT_DB_PATH)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        recreated = self._ensure_table()
-        if recreated or self._is_index_empty():
+        self._local = threading.local()
+        # WAL lets long running readers (e.g. catalogue streams) coexist with
+        # writers instead of blocking them for the duration of the read.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Write generation, bumped on every mutation. Used together with
+        # ``last_modified`` to build validators for conditional requests.
+        self.generation = 0
+        self.last_modified = time.time()
+        # Set when several worker processes share the index, see ``share``
+        self.shared: SharedGenerations | None = None
+        self._changes_since_compaction = 0
+        # Held by every write transaction, so writers from different threads
+        # queue here instead of failing with "database is locked"
+        self.write_lock = threading.RLock()
+        # Set once the initial index is complete, see ``index_status``
+        self.ready = threading.Event()
+        self.progress = {"state": "pending", "done": 0, "total": 0}
+        # Files waiting for their content hash, see ``hash_in_background``
+        self.pending_hashes: Dict[str, Path] = {}
+        self._hash_lock = threading.Lock()
+        self._hash_thread: threading.Thread | None = None
+        self._ensure_table()
+        if self._index_complete():
+            self._set_ready()
+        elif not defer_index:
+            self._build_initial_index()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection to the index owned by the calling thread.
+
+        Request handlers, the initial index and the upload watcher run in
+        different threads. Sharing one connection between them lets a commit
+        include another thread's half finished transaction and can deadlock
+        in the trace callback.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = query_log.connect(self.db_path)
+            conn.set_trace_callback(metrics.count_query)
+        return conn
+
+    @property
+    def _lock_path(self) -> Path:
+        return self.db_path.with_name(self.db_path.name + ".lock")
+
+    def _set_ready(self) -> None:
+        self.progress["state"] = "ready"
+        self.ready.set()
+
+    def _index_complete(self) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM index_state WHERE name = 'initial_index'"
+        ).fetchone()
+        return row is not None
+
+    def _initial_index(self) -> None:
+        self.progress["state"] = "indexing"
+        try:
             self.reindex_all()
+            with self.write_lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO index_state(name, value) "
+                    "VALUES ('initial_index', 'complete')"
+                )
+                self.conn.commit()
+        except (OSError, sqlite3.Error):
+            self.progress["state"] = "failed"
+            raise
+        self._set_ready()
+
+    def _build_initial_index(self) -> bool:
+        """Build the initial index unless another worker process does.
+
+        Only the worker holding the index lock indexes. The others wait for
+        it to finish and take over if it exits early. Returns ``True`` if
+        this process built the index.
+        """
+        while True:
+            with process_lock(self._lock_path, blocking=False) as owner:
+                if owner:
+                    if self._index_complete():
+                        self._set_ready()
+                        return False
+                    self._initial_index()
+                    return True
+            if self._index_complete():
+                self._set_ready()
+                return False
+            self.progress.update(state="indexing", done=self.lora_count())
+            time.sleep(self.INDEX_POLL_INTERVAL)
+
+    def start_initial_index(self) -> threading.Thread | None:
+        """Build a deferred initial index in a background thread.
+
+        Returns ``None`` if the index is already complete. Progress is
+        reported by :py:meth:`index_status`; searches return partial results
+        until it is done.
+        """
+        if self.ready.is_set():
+            return None
+
+        def run() -> None:
+            start = time.monotonic()
+            try:
+                built = self._build_initial_index()
+            except (OSError, sqlite3.Error):
+                logger.exception("Initial indexing failed")
+                return
+            if built:
+                logger.info(
+                    "Indexed %d models in %.1fs",
+                    self.progress["done"],
+                    time.monotonic() - start,
+                )
+
+        thread = threading.Thread(target=run, name="initial-index", daemon=True)
+        thread.start()
+        return thread
 
-    def _ensure_table(self) -> bool:
+    def index_status(self) -> Dict[str, int | str]:
+        """Return the state of the initial index and the files indexed so far."""
+        return dict(self.progress)
+
+    def _ensure_table(self) -> None:
         cur = self.conn.cursor()
+        # Workers starting at the same time must not migrate twice
+        cur.execute("BEGIN IMMEDIATE")
         # Check existing table schema; recreate if outdated
         cur.execute("PRAGMA table_info(lora_index)")
         cols = [r[1] for r in cur.fetchall()]
@@ -38,6 +189,7 @@ class IndexingAgent:
         elif cols != required:
             # Existing table uses an old schema, drop it so we can recreate
             cur.execute("DROP TABLE IF EXISTS lora_index")
+            cur.execute("DROP TABLE IF EXISTS lora_files")
             recreated = True
         cur.execute(
             """
@@ -50,6 +202,30 @@ class IndexingAgent:
             )
             """
         )
+        # FTS5 tables cannot index a column, so lookups by filename go
+        # through this table instead of scanning ``lora_index``
+        has_files = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lora_files'"
+        ).fetchone()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lora_files (
+                filename TEXT PRIMARY KEY,
+                index_rowid INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        if not has_files:
+            # Older indexes may hold several rows for one file; keep the
+            # newest and drop the rest so they stop showing up in searches
+            cur.execute(
+                "INSERT INTO lora_files(filename, index_rowid) "
+                "SELECT filename, MAX(rowid) FROM lora_index GROUP BY filename"
+            )
+            cur.execute(
+                "DELETE FROM lora_index WHERE rowid NOT IN "
+                "(SELECT index_rowid FROM lora_files)"
+            )
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS categories (
@@ -67,15 +243,99 @@ class IndexingAgent:
             )
             """
         )
+        # Append-only change feed used for incremental synchronisation
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                filename TEXT,
+                category_id INTEGER
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS changes_ts ON changes(ts)")
+        # Content hashes of model files, recomputed when mtime or size change
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                filename TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            )
+            """
+        )
+        # Set once the initial index is complete, see ``_build_initial_index``
+        has_state = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'index_state'"
+        ).fetchone()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS index_state (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """
+        )
+        if recreated:
+            cur.execute("DELETE FROM index_state")
+        elif not has_state:
+            # Indexes created before the marker count as complete unless empty
+            cur.execute(
+                "INSERT INTO index_state(name, value) "
+                "SELECT 'initial_index', 'complete' WHERE EXISTS "
+                "(SELECT 1 FROM lora_index)"
+            )
         self.conn.commit()
-        return recreated
 
-    def _is_index_empty(self) -> bool:
-        """Return True if the index table has no rows."""
-        cur = self.conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM lora_index")
-        count = cur.fetchone()[0]
-        return count == 0
+    def _touch(self) -> None:
+        """Record that the index or category tables changed."""
+        if self.shared is not None:
+            self.generation, self.last_modified = self.shared.bump("index")
+        else:
+            self.generation += 1
+            self.last_modified = time.time()
+
+    def share(self, shared: SharedGenerations) -> None:
+        """Keep the write generation in sync with other worker processes."""
+        self.shared = shared
+        shared.subscribe("index", self._generation_changed)
+
+    def _generation_changed(self, value: int, updated: float) -> None:
+        self.generation = value
+        self.last_modified = max(self.last_modified, updated)
+
+    def _log_change(
+        self, kind: str, filename: str | None = None, category_id: int | None = None
+    ) -> None:
+        """Append a change feed entry within the current transaction."""
+        self.conn.execute(
+            "INSERT INTO changes(ts, kind, filename, category_id) VALUES (?, ?, ?, ?)",
+            (time.time(), kind, filename, category_id),
+        )
+        self._changes_since_compaction += 1
+
+    def _after_write(self) -> None:
+        """Bump validators and compact the change feed when due."""
+        self._touch()
+        if self._changes_since_compaction >= self.COMPACT_EVERY:
+            self.compact_changes()
+
+    def _columns(self, fields: Iterable[str] | None) -> List[str]:
+        """Return the index columns to select for the requested ``fields``.
+
+        ``None`` selects every column. ``filename`` is always included as it
+        identifies the entry. Unknown names raise ``ValueError``.
+        """
+        if fields is None:
+            return list(self.COLUMNS)
+        wanted = set(fields)
+        unknown = wanted - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return [c for c in self.COLUMNS if c == "filename" or c in wanted]
 
     def _uncategorized_exists(self) -> bool:
         """Return ``True`` if any LoRA has no category assigned."""
@@ -166,36 +426,92 @@ class IndexingAgent:
 
         return categories
 
-    def add_metadata(self, data: Dict[str, str]) -> None:
-        self.conn.execute(
-            """
-            INSERT INTO lora_index(filename, name, architecture, tags, base_model)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                data.get("filename", ""),
-                data.get("modelspec.title", ""),
-                data.get("modelspec.architecture", ""),
-                data.get("ss_tag_frequency", ""),
-                data.get("ss_base_model_version", ""),
-            ),
+    @staticmethod
+    def _index_row(data: Dict[str, str]) -> Tuple[str, str, str, str, str]:
+        """Map extracted safetensors metadata to a ``lora_index`` row."""
+        return (
+            data.get("filename", ""),
+            data.get("modelspec.title", ""),
+            data.get("modelspec.architecture", ""),
+            data.get("ss_tag_frequency", ""),
+            data.get("ss_base_model_version", ""),
         )
-        self.conn.commit()
+
+    def add_metadata(self, data: Dict[str, str]) -> None:
+        """Index a LoRA, replacing an existing entry with the same filename.
+
+        Replacing keeps the index free of duplicates when the upload endpoint
+        and the upload directory watcher both report a new file.
+        """
+        self.add_metadata_many([data])
+
+    def add_metadata_many(self, entries: Iterable[Dict[str, str]]) -> int:
+        """Index several LoRAs in a single transaction.
+
+        Existing entries with the same filename are replaced, so importing a
+        batch again after an interruption does not create duplicates.
+        Returns the number of entries written.
+        """
+        # The last entry of a file wins if it is listed more than once
+        rows = list({r[0]: r for r in map(self._index_row, entries)}.values())
+        if not rows:
+            return 0
+        names = [r[0] for r in rows]
+        with self.write_lock:
+            replaced: List[int] = []
+            for i in range(0, len(names), 500):
+                chunk = names[i : i + 500]
+                replaced += [
+                    r[0]
+                    for r in self.conn.execute(
+                        "SELECT index_rowid FROM lora_files "
+                        f"WHERE filename IN ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                ]
+            for i in range(0, len(replaced), 500):
+                chunk = replaced[i : i + 500]
+                self.conn.execute(
+                    "DELETE FROM lora_index "
+                    f"WHERE rowid IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            last = self.conn.execute("SELECT MAX(rowid) FROM lora_index").fetchone()[0]
+            self.conn.executemany(
+                """
+                INSERT INTO lora_index(filename, name, architecture, tags, base_model)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            # New rows get rowids above the previous maximum
+            self.conn.execute(
+                "INSERT OR REPLACE INTO lora_files(filename, index_rowid) "
+                "SELECT filename, rowid FROM lora_index WHERE rowid > ?",
+                (last or 0,),
+            )
+            for name in names:
+                self._log_change("add", filename=name)
+            self.conn.commit()
+            self._after_write()
+            return len(rows)
 
     def search(
         self,
         query: str,
         limit: int | None = None,
         offset: int = 0,
+        fields: Iterable[str] | None = None,
     ) -> List[Dict[str, str]]:
+        """Search the index, selecting only the columns named in ``fields``."""
         cur = self.conn.cursor()
+        columns = self._columns(fields)
+        select = ", ".join(columns)
         if query == "*":
-            sql = (
-                "SELECT filename, name, architecture, tags, base_model FROM lora_index"
-            )
+            sql = f"SELECT {select} FROM lora_index"
             params = []
         else:
-            sql = "SELECT filename, name, architecture, tags, base_model FROM lora_index WHERE lora_index MATCH ?"
+            sql = f"SELECT {select} FROM lora_index WHERE lora_index MATCH ?"
             params = [query]
         if limit is not None:
             sql += " LIMIT ? OFFSET ?"
@@ -204,23 +520,214 @@ class IndexingAgent:
             sql += " LIMIT -1 OFFSET ?"
             params.append(offset)
         rows = cur.execute(sql, params).fetchall()
-        return [
-            {
-                "filename": r[0],
-                "name": r[1],
-                "architecture": r[2],
-                "tags": r[3],
-                "base_model": r[4],
-            }
-            for r in rows
-        ]
+        return [dict(zip(columns, r)) for r in rows]
+
+    def iter_entries(
+        self,
+        query: str = "*",
+        category_id: int | None = None,
+        fields: Iterable[str] | None = None,
+        with_categories: bool = False,
+        batch_size: int = 500,
+    ) -> Iterator[Dict[str, str]]:
+        """Yield index entries one at a time from a dedicated connection.
+
+        Rows are fetched in batches of ``batch_size`` so memory use stays
+        constant regardless of the catalogue size. ``category_id`` and
+        ``query`` filter like :py:meth:`search_by_category`. With
+        ``with_categories`` each entry also lists its category names.
+        """
+        columns = self._columns(fields)
+        select = ", ".join(f"l.{c}" for c in columns)
+        if with_categories:
+            select += (
+                ", (SELECT group_concat(c.name, char(31)) FROM categories c "
+                "JOIN lora_category_map cm ON c.id = cm.category_id "
+                "WHERE cm.filename = l.filename)"
+            )
+        sql = f"SELECT {select} FROM lora_index l"
+        conditions: List[str] = []
+        params: List = []
+        if category_id == self.NO_CATEGORY_ID:
+            sql += " LEFT JOIN lora_category_map m ON l.filename = m.filename"
+            conditions.append("m.filename IS NULL")
+        elif category_id is not None:
+            sql += " JOIN lora_category_map m ON l.filename = m.filename"
+            conditions.append("m.category_id = ?")
+            params.append(category_id)
+        if query and query != "*":
+            conditions.append("l.lora_index MATCH ?")
+            params.append(query)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        # The generator may be advanced from different worker threads
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            cur = conn.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                for r in rows:
+                    entry = dict(zip(columns, r))
+                    if with_categories:
+                        names = r[-1].split("\x1f") if r[-1] else []
+                        entry["categories"] = sorted(names) or [self.NO_CATEGORY_NAME]
+                    yield entry
+        finally:
+            conn.close()
+
+    def page_entries(
+        self,
+        after: int = 0,
+        limit: int = 1000,
+        fields: Iterable[str] | None = None,
+        with_categories: bool = False,
+        filenames: Iterable[str] | None = None,
+    ) -> Tuple[List[Dict[str, str]], int | None]:
+        """Return up to ``limit`` entries following the cursor ``after``.
+
+        Pages are keyed on the index rowid rather than an offset, so each page
+        is a cheap range scan and entries are neither skipped nor repeated
+        when the index changes between requests. Returns the entries and the
+        cursor for the next page, which is ``None`` after the last page.
+        ``filenames`` restricts the page to the given files.
+        """
+        columns = self._columns(fields)
+        select = ", ".join(f"l.{c}" for c in columns)
+        if with_categories:
+            select += (
+                ", (SELECT group_concat(c.name, char(31)) FROM categories c "
+                "JOIN lora_category_map cm ON c.id = cm.category_id "
+                "WHERE cm.filename = l.filename)"
+            )
+        sql = f"SELECT l.rowid, {select} FROM lora_index l WHERE l.rowid > ?"
+        params: List = [after]
+        if filenames is not None:
+            names = list(filenames)
+            sql += (
+                " AND l.rowid IN (SELECT index_rowid FROM lora_files "
+                f"WHERE filename IN ({', '.join('?' * len(names))}))"
+            )
+            params.extend(names)
+        rows = self.conn.execute(
+            sql + " ORDER BY l.rowid LIMIT ?", (*params, limit)
+        ).fetchall()
+        entries: List[Dict[str, str]] = []
+        for r in rows:
+            entry = dict(zip(columns, r[1:]))
+            if with_categories:
+                names = r[-1].split("\x1f") if r[-1] else []
+                entry["categories"] = sorted(names) or [self.NO_CATEGORY_NAME]
+            entries.append(entry)
+        cursor = rows[-1][0] if len(rows) == limit else None
+        return entries, cursor
+
+    def file_hash(self, path: Path) -> str | None:
+        """Return the SHA-256 digest of ``path`` or ``None`` if it is missing.
+
+        Digests are stored in the ``file_hashes`` table and only recomputed
+        when the file's modification time or size changes. Storing a new
+        digest records a ``hash`` change, so synchronising clients fetch it.
+        """
+        conn = self.conn
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        row = conn.execute(
+            "SELECT mtime_ns, size, sha256 FROM file_hashes WHERE filename = ?",
+            (path.name,),
+        ).fetchone()
+        if row and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+            return row[2]
+        digest = hashlib.sha256()
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self.write_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_hashes(filename, mtime_ns, size, sha256) "
+                "VALUES (?, ?, ?, ?)",
+                (path.name, st.st_mtime_ns, st.st_size, value),
+            )
+            self._log_change("hash", filename=path.name)
+            conn.commit()
+        return value
+
+    def cached_hashes(self, paths: Iterable[Path]) -> Dict[str, str | None]:
+        """Return the stored digests of ``paths`` by file name without reading files.
+
+        Digests that are missing or outdated are ``None`` and are computed by
+        :py:meth:`hash_in_background`.
+        """
+        stats: Dict[str, Tuple[Path, int, int]] = {}
+        for path in paths:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            stats[path.name] = (path, st.st_mtime_ns, st.st_size)
+        result: Dict[str, str | None] = dict.fromkeys(stats)
+        names = list(stats)
+        for i in range(0, len(names), 500):
+            chunk = names[i : i + 500]
+            rows = self.conn.execute(
+                "SELECT filename, mtime_ns, size, sha256 FROM file_hashes "
+                f"WHERE filename IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for name, mtime_ns, size, digest in rows:
+                if stats[name][1:] == (mtime_ns, size):
+                    result[name] = digest
+        self.hash_in_background(stats[n][0] for n, d in result.items() if d is None)
+        return result
+
+    def hash_in_background(self, paths: Iterable[Path]) -> None:
+        """Compute the digests of ``paths`` in a background thread.
+
+        The thread exits once the queue is empty.
+        """
+        with self._hash_lock:
+            for path in paths:
+                self.pending_hashes[path.name] = path
+            if self.pending_hashes and self._hash_thread is None:
+                self._hash_thread = threading.Thread(
+                    target=self._hash_pending, name="file-hashes", daemon=True
+                )
+                self._hash_thread.start()
+
+    def _hash_pending(self) -> None:
+        while True:
+            with self._hash_lock:
+                if not self.pending_hashes:
+                    self._hash_thread = None
+                    return
+                name, path = next(iter(self.pending_hashes.items()))
+            try:
+                # One worker hashes a file at a time; the others then find
+                # the stored digest instead of reading the file again
+                with process_lock(self.db_path.with_name("hashes.lock")):
+                    self.file_hash(path)
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("Hashing %s failed: %s", path, exc)
+            with self._hash_lock:
+                if self.pending_hashes.get(name) is path:
+                    del self.pending_hashes[name]
+
+    def hash_seq(self) -> int:
+        """Return a number that grows whenever a digest is stored."""
+        row = self.conn.execute("SELECT MAX(rowid) FROM file_hashes").fetchone()
+        return row[0] or 0
 
     def get_entry(self, filename: str) -> Dict[str, str] | None:
         """Return a single index entry identified by ``filename``."""
         cur = self.conn.cursor()
         row = cur.execute(
-            "SELECT filename, name, architecture, tags, base_model "
-            "FROM lora_index WHERE filename = ?",
+            "SELECT filename, name, architecture, tags, base_model FROM lora_index "
+            "WHERE rowid = (SELECT index_rowid FROM lora_files WHERE filename = ?)",
             (filename,),
         ).fetchone()
         if row:
@@ -234,33 +741,59 @@ class IndexingAgent:
         return None
 
     def reindex_all(self) -> None:
-        """Index all safetensors files found in the upload directory."""
+        """Index all safetensors files found in the upload directory.
+
+        Files are committed in batches, so searches see a growing index and
+        ``progress`` reports the number of files done.
+        """
         uploads = Path(config.UPLOAD_DIR)
         if not uploads.exists():
             return
+        files = sorted(uploads.glob("*.safetensors"))
+        self.progress.update(done=0, total=len(files))
         extractor = MetadataExtractorAgent()
-        for file in uploads.glob("*.safetensors"):
-            meta = extractor.extract(file)
-            self.add_metadata(meta)
+        for i in range(0, len(files), self.REINDEX_BATCH):
+            batch = files[i : i + self.REINDEX_BATCH]
+            self.add_metadata_many(extractor.extract(f) for f in batch)
+            self.progress["done"] += len(batch)
 
     def remove_metadata(self, filename: str) -> None:
         """Remove a LoRA entry from the index by filename."""
-        self.conn.execute(
-            "DELETE FROM lora_index WHERE filename = ?",
-            (filename,),
-        )
-        self.conn.commit()
+        with self.write_lock:
+            self.conn.execute(
+                "DELETE FROM lora_index "
+                "WHERE rowid = (SELECT index_rowid FROM lora_files WHERE filename = ?)",
+                (filename,),
+            )
+            self.conn.execute("DELETE FROM lora_files WHERE filename = ?", (filename,))
+            self.conn.execute("DELETE FROM file_hashes WHERE filename = ?", (filename,))
+            self._log_change("remove", filename=filename)
+            self.conn.commit()
+            self._after_write()
+
+    def record_change(self, kind: str, filename: str | None = None) -> None:
+        """Record a change that happened outside the index, e.g. new previews."""
+        with self.write_lock:
+            self._log_change(kind, filename=filename)
+            self.conn.commit()
+            self._after_write()
 
     # --- Category management helpers ------------------------------------
 
     def create_category(self, name: str) -> int:
         """Create a category if it does not exist and return its id."""
-        cur = self.conn.cursor()
-        cur.execute("INSERT OR IGNORE INTO categories(name) VALUES (?)", (name,))
-        self.conn.commit()
-        cur.execute("SELECT id FROM categories WHERE name = ?", (name,))
-        row = cur.fetchone()
-        return int(row[0]) if row else 0
+        with self.write_lock:
+            cur = self.conn.cursor()
+            cur.execute("INSERT OR IGNORE INTO categories(name) VALUES (?)", (name,))
+            created = cur.rowcount > 0
+            if created:
+                self._log_change("category_create", category_id=cur.lastrowid)
+            self.conn.commit()
+            if created:
+                self._after_write()
+            cur.execute("SELECT id FROM categories WHERE name = ?", (name,))
+            row = cur.fetchone()
+            return int(row[0]) if row else 0
 
     def list_categories(self) -> List[Dict[str, str]]:
         cur = self.conn.cursor()
@@ -306,27 +839,60 @@ class IndexingAgent:
 
     def delete_category(self, category_id: int) -> None:
         """Delete a category and its assignments."""
-        self.conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
-        self.conn.execute(
-            "DELETE FROM lora_category_map WHERE category_id = ?",
-            (category_id,),
-        )
-        self.conn.commit()
+        with self.write_lock:
+            self.conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+            self.conn.execute(
+                "DELETE FROM lora_category_map WHERE category_id = ?",
+                (category_id,),
+            )
+            self._log_change("category_delete", category_id=category_id)
+            self.conn.commit()
+            self._after_write()
 
     def assign_category(self, filename: str, category_id: int) -> None:
-        self.conn.execute(
-            "INSERT OR IGNORE INTO lora_category_map(filename, category_id) VALUES (?, ?)",
-            (filename, category_id),
-        )
-        self.conn.commit()
+        with self.write_lock:
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO lora_category_map(filename, category_id) "
+                "VALUES (?, ?)",
+                (filename, category_id),
+            )
+            changed = cur.rowcount > 0
+            if changed:
+                self._log_change("category_assign", filename, category_id)
+            self.conn.commit()
+            if changed:
+                self._after_write()
+
+    def assign_category_many(self, pairs: Iterable[Tuple[str, int]]) -> None:
+        """Assign ``(filename, category_id)`` pairs in a single transaction."""
+        changed = False
+        with self.write_lock:
+            for filename, category_id in pairs:
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO lora_category_map(filename, category_id) "
+                    "VALUES (?, ?)",
+                    (filename, category_id),
+                )
+                if cur.rowcount > 0:
+                    self._log_change("category_assign", filename, category_id)
+                    changed = True
+            self.conn.commit()
+            if changed:
+                self._after_write()
 
     def unassign_category(self, filename: str, category_id: int) -> None:
         """Remove ``filename`` from the given ``category_id`` mapping."""
-        self.conn.execute(
-            "DELETE FROM lora_category_map WHERE filename = ? AND category_id = ?",
-            (filename, category_id),
-        )
-        self.conn.commit()
+        with self.write_lock:
+            cur = self.conn.execute(
+                "DELETE FROM lora_category_map WHERE filename = ? AND category_id = ?",
+                (filename, category_id),
+            )
+            changed = cur.rowcount > 0
+            if changed:
+                self._log_change("category_unassign", filename, category_id)
+            self.conn.commit()
+            if changed:
+                self._after_write()
 
     def get_categories_for(self, filename: str) -> List[str]:
         cur = self.conn.cursor()
@@ -366,37 +932,40 @@ class IndexingAgent:
         query: str = "*",
         limit: int | None = None,
         offset: int = 0,
+        fields: Iterable[str] | None = None,
     ) -> List[Dict[str, str]]:
         """Return LoRAs in ``category_id`` optionally filtered by a query."""
         cur = self.conn.cursor()
+        columns = self._columns(fields)
+        select = ", ".join(f"l.{c}" for c in columns)
         if category_id == self.NO_CATEGORY_ID:
             if query == "*" or not query:
                 sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
+                    f"SELECT {select} "
                     "FROM lora_index l LEFT JOIN lora_category_map m ON l.filename = m.filename "
                     "WHERE m.filename IS NULL"
                 )
                 params: List = []
             else:
                 sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
+                    f"SELECT {select} "
                     "FROM lora_index l LEFT JOIN lora_category_map m ON l.filename = m.filename "
-                    "WHERE m.filename IS NULL AND l MATCH ?"
+                    "WHERE m.filename IS NULL AND l.lora_index MATCH ?"
                 )
                 params = [query]
         else:
             if query == "*" or not query:
                 sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
+                    f"SELECT {select} "
                     "FROM lora_index l JOIN lora_category_map m ON l.filename = m.filename "
                     "WHERE m.category_id = ?"
                 )
                 params = [category_id]
             else:
                 sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
+                    f"SELECT {select} "
                     "FROM lora_index l JOIN lora_category_map m ON l.filename = m.filename "
-                    "WHERE m.category_id = ? AND l MATCH ?"
+                    "WHERE m.category_id = ? AND l.lora_index MATCH ?"
                 )
                 params = [category_id, query]
         if limit is not None:
@@ -406,17 +975,58 @@ class IndexingAgent:
             sql += " LIMIT -1 OFFSET ?"
             params.append(offset)
         rows = cur.execute(sql, params).fetchall()
+        return [dict(zip(columns, r)) for r in rows]
+
+    # --- Change feed ----------------------------------------------------
+
+    def current_seq(self) -> int:
+        """Return the sequence number of the most recent change."""
+        row = self.conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def change_floor(self) -> int:
+        """Return the oldest ``since`` value the change feed can still serve.
+
+        Clients holding an older sequence number missed compacted entries and
+        must resynchronise from the full catalogue.
+        """
+        row = self.conn.execute("SELECT MIN(seq) FROM changes").fetchone()
+        if row[0] is None:
+            return self.current_seq()
+        return int(row[0]) - 1
+
+    def changes_since(self, since: int, limit: int = 1000) -> List[Dict[str, str]]:
+        """Return up to ``limit`` changes with a sequence number above ``since``."""
+        rows = self.conn.execute(
+            "SELECT seq, ts, kind, filename, category_id FROM changes "
+            "WHERE seq > ? ORDER BY seq LIMIT ?",
+            (since, limit),
+        ).fetchall()
         return [
             {
-                "filename": r[0],
-                "name": r[1],
-                "architecture": r[2],
-                "tags": r[3],
-                "base_model": r[4],
+                "seq": r[0],
+                "ts": r[1],
+                "kind": r[2],
+                "filename": r[3],
+                "category_id": r[4],
             }
             for r in rows
         ]
 
+    def compact_changes(self, max_age: float | None = None) -> int:
+        """Delete change feed entries older than ``max_age`` seconds."""
+        if max_age is None:
+            max_age = self.CHANGE_RETENTION
+        with self.write_lock:
+            cur = self.conn.execute(
+                "DELETE FROM changes WHERE ts < ?", (time.time() - max_age,)
+            )
+            self.conn.commit()
+            self._changes_since_compaction = 0
+            return cur.rowcount
+
     # --- Additional helpers for dashboard --------------------------------
 
     def storage_volume(self) -> int:
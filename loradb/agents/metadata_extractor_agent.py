@@ -1,11 +1,29 @@
+import json
+import struct
 from pathlib import Path
 from typing import Dict
 
-from safetensors import safe_open
-
 class MetadataExtractorAgent:
     """Extract metadata from LoRA files."""
 
+    #: Upper bound for a safetensors header; larger values indicate a corrupt file.
+    MAX_HEADER_SIZE = 100 * 1024**2
+
+    def read_header(self, filepath: Path) -> Dict:
+        """Return the JSON header of a safetensors file.
+
+        Only the header at the start of the file is read, so this neither
+        depends on the model size nor needs a tensor framework such as torch.
+        """
+        with Path(filepath).open("rb") as fh:
+            (length,) = struct.unpack("<Q", fh.read(8))
+            if length > self.MAX_HEADER_SIZE:
+                raise ValueError(f"Header of {length} bytes is too large")
+            header = json.loads(fh.read(length))
+        if not isinstance(header, dict):
+            raise ValueError("Invalid safetensors header")
+        return header
+
     def extract(self, filepath: Path, include_tensor_keys: bool = False) -> Dict[str, str]:
         """Extract basic metadata from a safetensors file.
 
@@ -19,12 +37,11 @@ class MetadataExtractorAgent:
         """
         metadata = {"filename": filepath.name}
         try:
-            with safe_open(str(filepath), framework="pt") as f:
-                meta = f.metadata() or {}
-                metadata.update(meta)
-                if include_tensor_keys:
-                    keys = list(f.keys())
-                    metadata["tensor_keys"] = ",".join(keys)
+            header = self.read_header(filepath)
+            metadata.update(header.get("__metadata__") or {})
+            if include_tensor_keys:
+                keys = sorted(k for k in header if k != "__metadata__")
+                metadata["tensor_keys"] = ",".join(keys)
         except Exception as exc:
             metadata["error"] = str(exc)
         return metadata
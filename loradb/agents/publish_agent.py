@@ -0,0 +1,351 @@
+import logging
+import os
+import re
+import sqlite3
+import string
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from ..coherence import process_lock
+from .frontend_agent import FrontendAgent
+from .indexing_agent import IndexingAgent
+
+logger = logging.getLogger(__name__)
+
+
+class PublishAgent:
+    """Mirror the catalogue as a tree of links for co-located consumers.
+
+    Every model is linked into ``publish_dir`` at the path produced by
+    ``template``, e.g. ``"{category}/{filename}"``, so tools running on the
+    same host can read the stored files without copying them. Available
+    placeholders are ``category``, ``base_model``, ``architecture``, ``name``,
+    ``stem`` and ``filename``; a template using ``category`` links a model
+    once per category. The first preview image is linked next to the model
+    as ``<stem>.preview.<ext>``.
+
+    The tree is updated incrementally from the index change feed. Links
+    created by the agent are recorded in the ``published`` table, so only
+    the affected models are touched and files not created by the agent are
+    never removed.
+    """
+
+    #: Supported link types.
+    MODES = ("hardlink", "symlink")
+    #: Template placeholders.
+    FIELDS = ("category", "base_model", "architecture", "name", "stem", "filename")
+    #: Seconds between checks of the change feed in :py:meth:`run`.
+    POLL_INTERVAL = 1.0
+    #: Number of entries processed per batch.
+    BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        indexer: IndexingAgent,
+        upload_dir: Path,
+        publish_dir: Path,
+        template: str = "{category}/{filename}",
+        mode: str = "hardlink",
+        frontend: FrontendAgent | None = None,
+        db_path: Path | None = None,
+    ) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {', '.join(self.MODES)}")
+        fields = {f for _, f, _, _ in string.Formatter().parse(template) if f}
+        unknown = fields - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown template fields: {', '.join(sorted(unknown))}")
+        if "filename" not in fields and "stem" not in fields:
+            raise ValueError("template must contain {filename} or {stem}")
+        self.indexer = indexer
+        self.upload_dir = Path(upload_dir).resolve()
+        self.publish_dir = Path(publish_dir).resolve()
+        self.publish_dir.mkdir(parents=True, exist_ok=True)
+        self.template = template
+        self.mode = mode
+        self.frontend = frontend
+        self.db_path = Path(db_path or indexer.db_path)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        # Last change applied by this process, ``None`` until it synced
+        self.applied_seq: int | None = None
+        self._ensure_table()
+
+    def _ensure_table(self) -> None:
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS published (
+                path TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                source TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS published_filename ON published(filename)"
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS publish_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    # --- State ------------------------------------------------------------
+
+    def _state(self, key: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT value FROM publish_state WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO publish_state(key, value) VALUES (?, ?)",
+            (key, value),
+        )
+
+    @property
+    def signature(self) -> str:
+        """Identify the settings the current tree was built with."""
+        return f"{self.publish_dir}\0{self.template}\0{self.mode}"
+
+    # --- Layout -----------------------------------------------------------
+
+    @staticmethod
+    def _component(value: str) -> str:
+        """Return ``value`` as a single safe path component."""
+        value = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", value or "").strip(" .")
+        return value or "unknown"
+
+    def desired_links(self, entry: Dict[str, str]) -> Dict[Path, str]:
+        """Return the links for an index ``entry`` mapped to their source file.
+
+        Sources are file names in the upload directory.
+        """
+        filename = entry["filename"]
+        stem = Path(filename).stem
+        values = {
+            "base_model": self._component(entry.get("base_model", "")),
+            "architecture": self._component(entry.get("architecture", "")),
+            "name": self._component(entry.get("name") or stem),
+            "stem": stem,
+            "filename": filename,
+        }
+        categories = entry.get("categories") or [IndexingAgent.NO_CATEGORY_NAME]
+        links: Dict[Path, str] = {}
+        for category in categories:
+            values["category"] = self._component(category)
+            relative = Path(self.template.format_map(values))
+            if relative.is_absolute() or ".." in relative.parts:
+                continue
+            if relative.suffix != ".safetensors":
+                relative = relative.with_name(relative.name + ".safetensors")
+            path = self.publish_dir / relative
+            links[path] = filename
+            for preview in entry.get("previews", [])[:1]:
+                ext = Path(preview).suffix
+                links[path.with_name(f"{path.stem}.preview{ext}")] = preview
+        return links
+
+    def _entries(self, filenames: Iterable[str] | None) -> Iterable[Dict[str, str]]:
+        """Yield index entries with categories and preview file names."""
+        names = None if filenames is None else list(filenames)
+        batches: Iterable[List[str] | None]
+        if names is None:
+            batches = [None]
+        else:
+            batches = [
+                names[i : i + self.BATCH_SIZE]
+                for i in range(0, len(names), self.BATCH_SIZE)
+            ]
+        fields = ["filename", "name", "architecture", "base_model"]
+        for batch in batches:
+            after = 0
+            while True:
+                entries, after = self.indexer.page_entries(
+                    after=after,
+                    limit=self.BATCH_SIZE,
+                    fields=fields,
+                    with_categories=True,
+                    filenames=batch,
+                )
+                if self.frontend is not None:
+                    previews = self.frontend.find_previews_bulk(
+                        Path(e["filename"]).stem for e in entries
+                    )
+                    for e in entries:
+                        urls = previews.get(Path(e["filename"]).stem, [])
+                        e["previews"] = [
+                            u.split("?", 1)[0].rsplit("/", 1)[-1] for u in urls
+                        ]
+                yield from entries
+                if after is None:
+                    break
+
+    # --- Links ------------------------------------------------------------
+
+    def _is_current(self, path: Path, source: Path) -> bool:
+        try:
+            if self.mode == "symlink":
+                return path.is_symlink() and os.readlink(path) == str(source)
+            return not path.is_symlink() and path.samefile(source)
+        except OSError:
+            return False
+
+    def _link(self, path: Path, source: Path) -> None:
+        """Atomically point ``path`` at ``source``."""
+        if self._is_current(path, source):
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.unlink(missing_ok=True)
+        if self.mode == "symlink":
+            os.symlink(source, tmp)
+        else:
+            os.link(source, tmp)
+        os.replace(tmp, path)
+
+    def _unlink(self, path: Path) -> None:
+        """Remove ``path`` and any directories left empty by it."""
+        path.unlink(missing_ok=True)
+        parent = path.parent
+        while parent != self.publish_dir and self.publish_dir in parent.parents:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    def _published(self, filenames: Iterable[str] | None) -> Dict[Path, Tuple[str, str]]:
+        if filenames is None:
+            rows = self.conn.execute("SELECT path, filename, source FROM published")
+        else:
+            names = list(filenames)
+            rows = []
+            for i in range(0, len(names), self.BATCH_SIZE):
+                batch = names[i : i + self.BATCH_SIZE]
+                rows += self.conn.execute(
+                    "SELECT path, filename, source FROM published "
+                    f"WHERE filename IN ({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+        return {Path(r[0]): (r[1], r[2]) for r in rows}
+
+    def refresh(self, filenames: Iterable[str] | None = None) -> Tuple[int, int]:
+        """Bring the links of ``filenames``, or of all models, up to date.
+
+        Returns the number of links created or updated and the number of
+        links removed.
+        """
+        names = None if filenames is None else set(filenames)
+        current = self._published(names)
+        desired: Dict[Path, Tuple[str, str]] = {}
+        for entry in self._entries(names):
+            for path, source in self.desired_links(entry).items():
+                desired[path] = (entry["filename"], source)
+        linked = removed = 0
+        for path in current.keys() - desired.keys():
+            self._unlink(path)
+            self.conn.execute("DELETE FROM published WHERE path = ?", (str(path),))
+            removed += 1
+        for path, (filename, source) in desired.items():
+            source_path = self.upload_dir / source
+            if not source_path.exists():
+                continue
+            if current.get(path) == (filename, source) and self._is_current(
+                path, source_path
+            ):
+                continue
+            try:
+                self._link(path, source_path)
+            except OSError as exc:
+                logger.warning("Could not publish %s: %s", path, exc)
+                continue
+            self.conn.execute(
+                "INSERT OR REPLACE INTO published(path, filename, source) "
+                "VALUES (?, ?, ?)",
+                (str(path), filename, source),
+            )
+            linked += 1
+        self.conn.commit()
+        return linked, removed
+
+    def rebuild(self) -> Tuple[int, int]:
+        """Reconcile the whole tree and continue from the current change."""
+        seq = self.indexer.current_seq()
+        result = self.refresh()
+        self._set_state("signature", self.signature)
+        self._set_state("seq", str(seq))
+        self.conn.commit()
+        self.applied_seq = seq
+        return result
+
+    def sync(self) -> Tuple[int, int]:
+        """Apply index changes recorded since the last call.
+
+        Falls back to :py:meth:`rebuild` on first use, after the settings
+        changed, when the change feed was compacted past the last applied
+        change, or when a category was deleted.
+        """
+        with self.lock:
+            since = self._state("seq")
+            if (
+                since is None
+                or self._state("signature") != self.signature
+                or int(since) < self.indexer.change_floor()
+            ):
+                return self.rebuild()
+            since = self.applied_seq = int(since)
+            linked = removed = 0
+            while True:
+                changes = self.indexer.changes_since(since, self.BATCH_SIZE)
+                if not changes:
+                    break
+                if any(c["kind"] == "category_delete" for c in changes):
+                    # The assignments are gone, so the affected models are unknown
+                    return self.rebuild()
+                affected = {
+                    c["filename"]
+                    for c in changes
+                    if c["filename"] and c["kind"] != "hash"
+                }
+                if affected:
+                    counts = self.refresh(affected)
+                    linked += counts[0]
+                    removed += counts[1]
+                since = changes[-1]["seq"]
+                self._set_state("seq", str(since))
+                self.conn.commit()
+                self.applied_seq = since
+            return linked, removed
+
+    def run(self) -> None:
+        """Follow the change feed until :py:meth:`stop` is called.
+
+        With several worker processes only one of them publishes; the others
+        wait on a lock and take over if it exits.
+        """
+        with process_lock(self.db_path.with_name("publish.lock")):
+            while not self.stop_event.is_set():
+                try:
+                    if self.indexer.shared is not None:
+                        # Previews may have changed in another worker
+                        self.indexer.shared.poll()
+                    self.sync()
+                except (OSError, sqlite3.Error):
+                    logger.exception("Publishing failed")
+                self.stop_event.wait(self.POLL_INTERVAL)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name="publish", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.stop_event.set()
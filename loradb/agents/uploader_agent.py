@@ -2,27 +2,53 @@ from __future__ import annotations
 
 from pathlib import Path
 from typing import Iterable, List
+import re
 import tempfile
 import zipfile
 
 import shutil
 
 import config
+from .. import metrics
 from .frontend_agent import FrontendAgent
+from .indexing_agent import IndexingAgent
 
 class UploaderAgent:
     """Handle uploading LoRA files and preview images."""
 
-    def __init__(self, upload_dir: Path | None = None, frontend: FrontendAgent | None = None) -> None:
+    def __init__(
+        self,
+        upload_dir: Path | None = None,
+        frontend: FrontendAgent | None = None,
+        indexer: IndexingAgent | None = None,
+    ) -> None:
         self.upload_dir = Path(upload_dir or config.UPLOAD_DIR)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
         self.frontend = frontend
+        self.indexer = indexer
+
+    def _preview_changed(self, stem: str) -> None:
+        """Record a preview change for the LoRA identified by ``stem``."""
+        if self.indexer:
+            self.indexer.record_change("preview", filename=f"{stem}.safetensors")
+
+    def _lora_stem_for(self, preview_name: str) -> str:
+        """Return the stem of the LoRA owning the preview ``preview_name``."""
+        stem = Path(preview_name).stem
+        if (self.upload_dir / f"{stem}.safetensors").exists():
+            return stem
+        return re.sub(r"_[0-9]+$", "", stem)
+
+    def _receive(self, fileobj, dest: Path) -> None:
+        """Copy an uploaded ``fileobj`` to ``dest`` and count the bytes."""
+        with dest.open("wb") as f:
+            shutil.copyfileobj(fileobj, f)
+            metrics.UPLOAD_BYTES.inc(f.tell())
 
     def save_file(self, filename: str, fileobj) -> Path:
         """Save a single file and return its path."""
         dest = self.upload_dir / filename
-        with dest.open("wb") as f:
-            shutil.copyfileobj(fileobj, f)
+        self._receive(fileobj, dest)
         return dest
 
     def save_files(self, files: Iterable) -> List[Path]:
@@ -38,8 +64,7 @@ class UploaderAgent:
             dest = self.upload_dir / name
             if dest.exists() or dest in seen:
                 raise FileExistsError(f"{name} already exists")
-            with dest.open("wb") as f:
-                shutil.copyfileobj(file.file, f)
+            self._receive(file.file, dest)
             saved.append(dest)
             seen.add(dest)
         return saved
@@ -50,8 +75,7 @@ class UploaderAgent:
         extracted: List[Path] = []
         with tempfile.TemporaryDirectory() as td:
             temp_path = Path(td) / zip_file.filename
-            with open(temp_path, "wb") as f:
-                shutil.copyfileobj(zip_file.file, f)
+            self._receive(zip_file.file, temp_path)
             with zipfile.ZipFile(temp_path) as zf:
                 index = 0
                 for info in zf.infolist():
@@ -71,6 +95,7 @@ class UploaderAgent:
                     index += 1
         if self.frontend:
             self.frontend.refresh_preview_cache(stem)
+        self._preview_changed(stem)
         return extracted
 
     def save_preview_files(self, stem: str, files: Iterable) -> List[Path]:
@@ -86,12 +111,12 @@ class UploaderAgent:
             else:
                 dest_name = f"{stem}_{index}{suffix}"
             dest = self.upload_dir / dest_name
-            with dest.open("wb") as out:
-                shutil.copyfileobj(file.file, out)
+            self._receive(file.file, dest)
             extracted.append(dest)
             index += 1
         if self.frontend:
             self.frontend.refresh_preview_cache(stem)
+        self._preview_changed(stem)
         return extracted
 
     def delete_lora(self, filename: str) -> None:
@@ -113,3 +138,4 @@ class UploaderAgent:
             path.unlink()
         if self.frontend:
             self.frontend.invalidate_preview_cache(Path(filename).stem)
+        self._preview_changed(self._lora_stem_for(filename))
@@ -0,0 +1,252 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+try:  # inotify is only available on Linux
+    from inotify_simple import INotify, flags
+except ImportError:  # pragma: no cover - depends on environment
+    INotify = None
+
+from ..coherence import process_lock
+from .frontend_agent import FrontendAgent
+from .indexing_agent import IndexingAgent
+from .metadata_extractor_agent import MetadataExtractorAgent
+from .uploader_agent import UploaderAgent
+
+logger = logging.getLogger(__name__)
+
+#: Modification time and size of a file, ``None`` once it is gone.
+FileState = Tuple[int, int] | None
+
+
+class WatchAgent:
+    """Keep the index and preview caches in sync with the upload directory.
+
+    Files copied into the upload directory by other means than the API, e.g.
+    ``rsync`` or ``docker cp``, are indexed and files removed from it are
+    dropped from the index. Previews added or removed this way refresh the
+    preview cache of their model. Changes are picked up with inotify where
+    available and by rescanning the directory otherwise.
+
+    Events are debounced: a file is only handled once its size and
+    modification time stayed the same for ``debounce`` seconds, so partially
+    written files are not indexed. Hidden files, such as the temporary files
+    of ``rsync``, are ignored until they are renamed into place.
+    """
+
+    #: Preview image types, see :py:class:`UploaderAgent`.
+    PREVIEW_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif"}
+
+    def __init__(
+        self,
+        uploader: UploaderAgent,
+        indexer: IndexingAgent,
+        frontend: FrontendAgent | None = None,
+        debounce: float = 1.0,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self.uploader = uploader
+        self.indexer = indexer
+        self.frontend = frontend
+        self.upload_dir = Path(uploader.upload_dir)
+        self.extractor = MetadataExtractorAgent()
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and INotify is not None
+        # Last handled state of every model file
+        self.known: Dict[str, FileState] = {}
+        # Files waiting to settle: handle time and state seen at that time
+        self.pending: Dict[str, Tuple[float, FileState]] = {}
+        # Directory listing of the previous scan in polling mode
+        self.snapshot: Dict[str, FileState] = {}
+        self.stop_event = threading.Event()
+
+    def _relevant(self, name: str) -> bool:
+        if name.startswith("."):
+            return False
+        suffix = Path(name).suffix.lower()
+        return suffix == ".safetensors" or suffix in self.PREVIEW_SUFFIXES
+
+    def _stat(self, name: str) -> FileState:
+        try:
+            st = (self.upload_dir / name).stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _scan(self) -> Dict[str, FileState]:
+        states: Dict[str, FileState] = {}
+        for path in self.upload_dir.iterdir():
+            if self._relevant(path.name):
+                state = self._stat(path.name)
+                if state is not None:
+                    states[path.name] = state
+        return states
+
+    # --- Events -----------------------------------------------------------
+
+    def notify(self, names: Iterable[str]) -> None:
+        """Schedule ``names`` to be handled once they stop changing."""
+        due = time.monotonic() + self.debounce
+        for name in names:
+            if self._relevant(name):
+                self.pending[name] = (due, None)
+
+    def poll_changes(self) -> None:
+        """Rescan the directory and schedule files that changed since the last scan."""
+        current = self._scan()
+        changed = [n for n in current.keys() | self.snapshot.keys()
+                   if current.get(n) != self.snapshot.get(n)]
+        self.snapshot = current
+        self.notify(changed)
+
+    def process_pending(self, force: bool = False) -> int:
+        """Handle scheduled files that settled and return how many were handled.
+
+        With ``force`` the debounce period is skipped.
+        """
+        now = time.monotonic()
+        models: List[str] = []
+        previews: Dict[str, None] = {}
+        for name, (due, seen) in list(self.pending.items()):
+            if due > now and not force:
+                continue
+            state = self._stat(name)
+            if state is not None and state != seen and not force:
+                # Still being written, check again after another period
+                self.pending[name] = (now + self.debounce, state)
+                continue
+            del self.pending[name]
+            if name.endswith(".safetensors"):
+                models.append(name)
+            else:
+                previews[self.uploader._lora_stem_for(name)] = None
+        for name in models:
+            self._model_changed(name)
+        for stem in previews:
+            self._previews_changed(stem)
+        return len(models) + len(previews)
+
+    def _model_changed(self, name: str) -> None:
+        state = self._stat(name)
+        previous = self.known.get(name)
+        if state is None:
+            self.known.pop(name, None)
+            # Hold the write lock so an upload cannot slip in between the
+            # check and the write
+            with self.indexer.write_lock:
+                if self.indexer.get_entry(name) is not None:
+                    self.indexer.remove_metadata(name)
+            return
+        self.known[name] = state
+        meta = self.extractor.extract(self.upload_dir / name)
+        with self.indexer.write_lock:
+            entry = self.indexer.get_entry(name)
+            if entry is not None and previous in (None, state):
+                row = tuple(entry[c] for c in IndexingAgent.COLUMNS)
+                if row == IndexingAgent._index_row(meta):
+                    # Already indexed, e.g. by the upload endpoint
+                    return
+            self.indexer.add_metadata_many([meta])
+
+    def _previews_changed(self, stem: str) -> None:
+        if self.frontend is None:
+            self.indexer.record_change("preview", filename=f"{stem}.safetensors")
+            return
+        before = self.frontend.preview_cache.pop(stem, None)
+        after = self.frontend._find_previews(stem)
+        if before == after:
+            # Already picked up, e.g. by the upload endpoint
+            return
+        self.frontend.invalidate_preview_cache(stem)
+        self.indexer.record_change("preview", filename=f"{stem}.safetensors")
+
+    # --- Reconciliation ---------------------------------------------------
+
+    def reconcile(self) -> Tuple[int, int]:
+        """Index models missing from the index and drop rows of missing files.
+
+        Returns the number of models added and removed.
+        """
+        on_disk = {
+            name: state
+            for name, state in self._scan().items()
+            if name.endswith(".safetensors")
+        }
+        indexed = {e["filename"] for e in self.indexer.iter_entries(fields=["filename"])}
+        added = sorted(on_disk.keys() - indexed)
+        removed = sorted(indexed - on_disk.keys())
+        for i in range(0, len(added), IndexingAgent.REINDEX_BATCH):
+            batch = added[i : i + IndexingAgent.REINDEX_BATCH]
+            self.indexer.add_metadata_many(
+                self.extractor.extract(self.upload_dir / n) for n in batch
+            )
+        for name in removed:
+            self.indexer.remove_metadata(name)
+        self.known = dict(on_disk)
+        return len(added), len(removed)
+
+    # --- Service ----------------------------------------------------------
+
+    def _open_inotify(self):
+        if not self.use_inotify:
+            return None
+        try:
+            inotify = INotify()
+            mask = (
+                flags.CREATE
+                | flags.CLOSE_WRITE
+                | flags.MOVED_TO
+                | flags.MOVED_FROM
+                | flags.DELETE
+            )
+            inotify.add_watch(str(self.upload_dir), mask)
+        except OSError as exc:
+            logger.warning("inotify unavailable, polling %s: %s", self.upload_dir, exc)
+            return None
+        return inotify
+
+    def run(self) -> None:
+        """Watch the upload directory until :py:meth:`stop` is called.
+
+        With several worker processes only one of them watches; the others
+        wait on a lock and take over if it exits.
+        """
+        with process_lock(self.indexer.db_path.with_name("watch.lock")):
+            # The initial index covers files present at startup
+            while not self.indexer.ready.wait(self.poll_interval):
+                if self.stop_event.is_set():
+                    return
+            inotify = self._open_inotify()
+            try:
+                self.snapshot = self._scan()
+                self.reconcile()
+                while not self.stop_event.is_set():
+                    if inotify is not None:
+                        timeout = self.debounce if self.pending else self.poll_interval
+                        events = inotify.read(timeout=int(timeout * 1000))
+                        self.notify(e.name for e in events if e.name)
+                    else:
+                        self.stop_event.wait(self.poll_interval)
+                        self.poll_changes()
+                    try:
+                        self.process_pending()
+                    except (OSError, sqlite3.Error):
+                        logger.exception(
+                            "Updating the index from %s failed", self.upload_dir
+                        )
+            finally:
+                if inotify is not None:
+                    inotify.close()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name="watch-uploads", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.stop_event.set()
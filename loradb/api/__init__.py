@@ -1,24 +1,100 @@
+import asyncio
 import random
 import re
+import time
 from pathlib import Path
 
-from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 
 import config
 
+from ..agents.download_agent import DownloadAgent
 from ..agents.frontend_agent import FrontendAgent
 from ..agents.indexing_agent import IndexingAgent
 from ..agents.metadata_extractor_agent import MetadataExtractorAgent
+from ..agents.publish_agent import PublishAgent
 from ..agents.uploader_agent import UploaderAgent
+from ..agents.watch_agent import WatchAgent
+from ..archive import archive_etag, iter_tar, iter_zip, model_members, tar_layout
+from ..coherence import SharedGenerations
+from ..file_response import (
+    RangeNotSatisfiable,
+    if_range_matches,
+    parse_range,
+    ranged_file_response,
+)
+from ..http_cache import (
+    CACHE_POLICIES,
+    cache_headers,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+from ..lazy import Lazy
+from ..query_log import SLOW_QUERIES
+from ..responses import FastJSONResponse, ndjson_chunks
 
 router = APIRouter()
 
-uploader = UploaderAgent()
+# Agents are built on first use, so importing the module stays cheap. The
+# initial index of an empty database is built in the background, see
+# ``IndexingAgent.start_initial_index``.
+
+
+def _make_indexer() -> IndexingAgent:
+    agent = IndexingAgent(defer_index=True)
+    agent.share(shared.get())
+    return agent
+
+
+def _make_frontend() -> FrontendAgent:
+    agent = FrontendAgent(Path(uploader.upload_dir), Path(config.TEMPLATE_DIR))
+    agent.share(shared.get())
+    return agent
+
+
+def _make_uploader() -> UploaderAgent:
+    agent = UploaderAgent()
+    # The frontend needs the upload directory, so it is only resolved on use
+    agent.frontend = frontend
+    agent.indexer = indexer.get()
+    return agent
+
+
+def _make_publisher() -> PublishAgent:
+    return PublishAgent(
+        indexer.get(),
+        uploader.upload_dir,
+        Path(config.PUBLISH_DIR),
+        template=config.PUBLISH_TEMPLATE,
+        mode=config.PUBLISH_MODE,
+        frontend=frontend.get(),
+    )
+
+
+def _make_watcher() -> WatchAgent:
+    return WatchAgent(
+        uploader.get(),
+        indexer.get(),
+        frontend.get(),
+        debounce=config.WATCH_DEBOUNCE,
+        poll_interval=config.WATCH_POLL_INTERVAL,
+    )
+
+
+uploader = Lazy(_make_uploader)
 extractor = MetadataExtractorAgent()
-indexer = IndexingAgent()
-frontend = FrontendAgent(Path(uploader.upload_dir), Path(config.TEMPLATE_DIR))
-uploader.frontend = frontend
+indexer = Lazy(_make_indexer)
+frontend = Lazy(_make_frontend)
+downloads = Lazy(DownloadAgent)
+# Keeps caches of all worker processes coherent; polled once per request
+shared = Lazy(lambda: SharedGenerations(IndexingAgent.DEFAULT_DB_PATH))
+# Link tree for co-located consumers, kept current from the change feed
+publisher = Lazy(_make_publisher) if config.PUBLISH_DIR else None
+# Picks up files placed in the upload directory without the API
+watcher = Lazy(_make_watcher) if config.WATCH_UPLOADS else None
 
 # Regular expression for valid LoRA filenames. Only allow alphanumerics,
 # dashes and underscores ending with the ``.safetensors`` extension. This
@@ -36,6 +112,51 @@ def _validate_filename(filename: str) -> str:
     return cleaned
 
 
+#: Fields computed by ``/grid_data`` in addition to the index columns.
+_GRID_EXTRA_FIELDS = frozenset({"categories", "preview_url"})
+
+
+def _parse_fields(
+    fields: str | None, extra: frozenset = frozenset()
+) -> tuple[list[str] | None, set[str]]:
+    """Split a comma separated ``fields`` parameter.
+
+    Returns the index columns to select (``None`` for all) and the requested
+    computed fields out of ``extra``. Unknown names raise ``HTTPException``.
+    """
+    if not fields:
+        return None, set(extra)
+    names = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = names - set(IndexingAgent.COLUMNS) - extra
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    columns = [c for c in IndexingAgent.COLUMNS if c in names]
+    return columns, names & extra
+
+
+def _index_validators(request: Request, *extra) -> tuple[str, float]:
+    """Return ``(etag, last_modified)`` for a response built from the index.
+
+    The ETag covers the index write generation, the preview cache state, the
+    requesting user and the full request URL so each distinct view gets its
+    own validator.
+    """
+    user = getattr(request.state, "user", None) or {}
+    etag = make_etag(
+        indexer.generation,
+        frontend.preview_generation,
+        user.get("id"),
+        user.get("role"),
+        request.url.path,
+        request.url.query,
+        *extra,
+    )
+    last_modified = max(indexer.last_modified, frontend.preview_last_modified)
+    return etag, last_modified
+
+
 @router.get("/upload", response_class=HTMLResponse)
 async def upload_form(request: Request):
     """Render HTML form for file uploads."""
@@ -101,35 +222,206 @@ async def upload_previews(
     return {"status": "ok"}
 
 
-@router.get("/search")
-async def search(query: str, limit: int | None = None, offset: int = 0):
-    return indexer.search(query, limit=limit, offset=offset)
+@router.get("/search", response_class=FastJSONResponse)
+async def search(
+    request: Request,
+    query: str,
+    limit: int | None = None,
+    offset: int = 0,
+    fields: str | None = None,
+):
+    columns, _ = _parse_fields(fields)
+    etag, modified = _index_validators(request)
+    policy = CACHE_POLICIES["/search"]
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, policy, modified)
+    return FastJSONResponse(
+        indexer.search(query, limit=limit, offset=offset, fields=columns),
+        headers=cache_headers(etag, policy, modified),
+    )
 
 
-@router.get("/grid_data")
+@router.get("/grid_data", response_class=FastJSONResponse)
 async def grid_data(
-    q: str = "*", category: int | None = None, offset: int = 0, limit: int = 50
+    request: Request,
+    q: str = "*",
+    category: int | None = None,
+    offset: int = 0,
+    limit: int = 50,
+    fields: str | None = None,
 ):
+    columns, extra = _parse_fields(fields, _GRID_EXTRA_FIELDS)
+    etag, modified = _index_validators(request)
+    policy = CACHE_POLICIES["/grid_data"]
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, policy, modified)
     if not q:
         q = "*"
     if category is not None:
-        entries = indexer.search_by_category(category, q, limit=limit, offset=offset)
+        entries = indexer.search_by_category(
+            category, q, limit=limit, offset=offset, fields=columns
+        )
     else:
-        entries = indexer.search(q, limit=limit, offset=offset)
+        entries = indexer.search(q, limit=limit, offset=offset, fields=columns)
     for e in entries:
-        e["categories"] = indexer.get_categories_for(e["filename"])
-        stem = Path(e.get("filename", "")).stem
-        previews = frontend._find_previews(stem)
-        e["preview_url"] = random.choice(previews) if previews else None
-    return entries
+        if "categories" in extra:
+            e["categories"] = indexer.get_categories_for(e["filename"])
+        if "preview_url" in extra:
+            previews = frontend._find_previews(Path(e["filename"]).stem)
+            e["preview_url"] = random.choice(previews) if previews else None
+    return FastJSONResponse(entries, headers=cache_headers(etag, policy, modified))
+
+
+@router.get("/catalog.ndjson")
+async def catalog_ndjson(
+    request: Request,
+    q: str = "*",
+    category: int | None = None,
+    fields: str | None = None,
+):
+    """Stream the catalogue as newline delimited JSON.
+
+    Rows are read from a SQLite cursor while the response is sent, so memory
+    use does not grow with the catalogue size.
+    """
+    columns, extra = _parse_fields(fields, frozenset({"categories"}))
+    etag, modified = _index_validators(request)
+    policy = CACHE_POLICIES["/catalog.ndjson"]
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, policy, modified)
+    # Clients continue with ``/changes?since=<X-Change-Seq>`` after the stream
+    headers = cache_headers(etag, policy, modified)
+    headers["X-Change-Seq"] = str(indexer.current_seq())
+    rows = indexer.iter_entries(
+        q or "*",
+        category_id=category,
+        fields=columns,
+        with_categories="categories" in extra,
+    )
+    return StreamingResponse(
+        ndjson_chunks(rows), media_type="application/x-ndjson", headers=headers
+    )
+
+
+#: Upper bound for the ``limit`` parameter of ``/manifest``.
+_MANIFEST_MAX_LIMIT = 1000
+
+
+def _manifest_page(
+    after: int, limit: int, hashes: bool, filenames: list[str] | None = None
+) -> dict:
+    """Build one ``/manifest`` page; runs in a worker thread as it reads the index.
+
+    With ``hashes`` only stored content hashes are returned. Missing ones are
+    ``None`` and computed in the background, so later requests include them.
+    """
+    entries, cursor = indexer.page_entries(
+        after,
+        limit,
+        fields=["filename", "name", "tags"],
+        with_categories=True,
+        filenames=filenames,
+    )
+    previews = frontend.find_previews_bulk(Path(e["filename"]).stem for e in entries)
+    upload_dir = Path(uploader.upload_dir)
+    digests = {}
+    if hashes:
+        digests = indexer.cached_hashes(upload_dir / e["filename"] for e in entries)
+    for e in entries:
+        path = upload_dir / e["filename"]
+        try:
+            e["size"] = path.stat().st_size
+        except OSError:
+            e["size"] = None
+        e["sha256"] = digests.get(e["filename"])
+        e["previews"] = previews[Path(e["filename"]).stem]
+    return {"entries": entries, "next": cursor}
+
+
+@router.get("/manifest", response_class=FastJSONResponse)
+async def manifest(
+    request: Request,
+    after: int = 0,
+    limit: int = 1000,
+    hashes: bool = False,
+    files: str | None = None,
+):
+    """Return export metadata for a page of models.
+
+    Each entry lists the file size, SHA-256 digest, preview URLs, categories
+    and tags, so exporters need one request per page instead of one detail
+    page per model. Digests are only included with ``hashes=true``; those
+    not computed yet are ``null`` and are hashed in the background. Continue with ``after=<next>`` until ``next`` is ``null``.
+    ``files`` restricts the page to a comma separated list of filenames,
+    e.g. those reported by ``/changes``.
+    """
+    # Digests computed in the background change the response
+    etag, modified = _index_validators(request, indexer.hash_seq())
+    policy = CACHE_POLICIES["/manifest"]
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, policy, modified)
+    limit = max(1, min(limit, _MANIFEST_MAX_LIMIT))
+    filenames = None
+    if files is not None:
+        filenames = [_validate_filename(f.strip()) for f in files.split(",") if f.strip()]
+        if len(filenames) > _MANIFEST_MAX_LIMIT:
+            raise HTTPException(status_code=400, detail="too many files")
+    seq = indexer.current_seq()
+    page = await run_in_threadpool(_manifest_page, after, limit, hashes, filenames)
+    page["seq"] = seq
+    return FastJSONResponse(page, headers=cache_headers(etag, policy, modified))
+
+
+#: Upper bound for the ``wait`` parameter of ``/changes`` in seconds.
+_CHANGES_MAX_WAIT = 60.0
+#: Poll interval while a ``/changes`` request waits for new entries.
+_CHANGES_POLL_INTERVAL = 0.5
+
+
+@router.get("/changes", response_class=FastJSONResponse)
+async def changes(since: int = 0, limit: int = 1000, wait: float = 0):
+    """Return index mutations with a sequence number above ``since``.
+
+    With ``wait`` the request is held open for up to that many seconds until
+    a change arrives (long polling). ``410 Gone`` signals that ``since`` is
+    outside the retained history and the client must resync the catalogue.
+    """
+    if since < indexer.change_floor() or since > indexer.current_seq():
+        raise HTTPException(
+            status_code=410, detail="Change history unavailable, resync required"
+        )
+    limit = max(1, min(limit, 10000))
+    deadline = time.monotonic() + max(0.0, min(wait, _CHANGES_MAX_WAIT))
+    while True:
+        entries = indexer.changes_since(since, limit)
+        if entries or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(_CHANGES_POLL_INTERVAL)
+    last_seq = entries[-1]["seq"] if entries else since
+    return FastJSONResponse(
+        {
+            "changes": entries,
+            "last_seq": last_seq,
+            "has_more": len(entries) == limit,
+        }
+    )
 
 
 @router.get("/showcase", response_class=HTMLResponse)
 async def showcase(request: Request):
     """Public showcase page listing models in the "Public viewing" category."""
     public_id = indexer.create_category("Public viewing")
-    entries = indexer.search_by_category(public_id, limit=100)
-    return frontend.render_showcase(entries, user=request.state.user)
+    etag, modified = _index_validators(request)
+    policy = CACHE_POLICIES["/showcase"]
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, policy, modified)
+    entries = indexer.search_by_category(
+        public_id, limit=100, fields=["filename", "name"]
+    )
+    return HTMLResponse(
+        frontend.render_showcase(entries, user=request.state.user),
+        headers=cache_headers(etag, policy, modified),
+    )
 
 
 @router.get("/showcase_detail/{filename}", response_class=HTMLResponse)
@@ -142,7 +434,12 @@ async def showcase_detail(request: Request, filename: str):
 
 
 @router.get("/categories")
-async def list_categories():
+async def list_categories(request: Request, response: Response):
+    etag, modified = _index_validators(request)
+    policy = CACHE_POLICIES["/categories"]
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, policy, modified)
+    response.headers.update(cache_headers(etag, policy, modified))
     return indexer.list_categories()
 
 
@@ -233,12 +530,14 @@ async def grid(request: Request):
     limit = int(request.query_params.get("limit", 50))
     offset = int(request.query_params.get("offset", 0))
     categories = indexer.list_categories()
+    # Cards only render the name, categories and a preview
+    fields = ["filename", "name"]
     if category:
         entries = indexer.search_by_category(
-            int(category), query, limit=limit, offset=offset
+            int(category), query, limit=limit, offset=offset, fields=fields
         )
     else:
-        entries = indexer.search(query, limit=limit, offset=offset)
+        entries = indexer.search(query, limit=limit, offset=offset, fields=fields)
     for e in entries:
         e["categories"] = indexer.get_categories_for(e["filename"])
     return frontend.render_grid(
@@ -256,6 +555,12 @@ async def detail(request: Request, filename: str):
     file_path = Path(uploader.upload_dir) / filename
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="not found")
+    stat = file_path.stat()
+    etag, modified = _index_validators(request, stat.st_mtime_ns, stat.st_size)
+    modified = max(modified, stat.st_mtime)
+    policy = CACHE_POLICIES["/detail"]
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, policy, modified)
     entry = indexer.get_entry(filename)
     if not entry:
         entry = {"filename": filename}
@@ -263,7 +568,102 @@ async def detail(request: Request, filename: str):
     entry["metadata"] = meta
     entry["categories"] = indexer.get_categories_with_ids(filename)
     categories = indexer.list_categories()
-    return frontend.render_detail(entry, categories=categories, user=request.state.user)
+    return HTMLResponse(
+        frontend.render_detail(entry, categories=categories, user=request.state.user),
+        headers=cache_headers(etag, policy, modified),
+    )
+
+
+@router.get("/download/{filename}")
+async def download(request: Request, filename: str):
+    """Stream a LoRA file with support for resumable ranged requests."""
+    fname = _validate_filename(filename)
+    file_path = Path(uploader.upload_dir) / fname
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="not found")
+    return ranged_file_response(
+        request,
+        file_path,
+        on_complete=lambda offset, sent: downloads.record(fname, offset, sent),
+    )
+
+
+def _archive_members(category: int | None, files: str | None) -> list:
+    """Collect the archive members for a category and/or explicit file list."""
+    names: list[str] = []
+    if category is not None:
+        names.extend(e["filename"] for e in indexer.iter_entries(category_id=category, fields=[]))
+    if files:
+        names.extend(_validate_filename(f.strip()) for f in files.split(",") if f.strip())
+    names = list(dict.fromkeys(names))
+    previews = frontend.find_previews_bulk(Path(n).stem for n in names)
+    return model_members(Path(uploader.upload_dir), names, previews)
+
+
+@router.get("/archive")
+async def archive(
+    request: Request,
+    category: int | None = None,
+    files: str | None = None,
+    format: str = "zip",
+):
+    """Stream the selected models and their previews as a zip or tar archive.
+
+    Archives are generated while they are sent. Zip members are stored
+    without compression; tar archives have a known size and support
+    ``Range`` requests so interrupted downloads can be resumed.
+    """
+    if format not in ("zip", "tar"):
+        raise HTTPException(status_code=400, detail="format must be zip or tar")
+    if category is None and not files:
+        raise HTTPException(status_code=400, detail="category or files required")
+    members = await run_in_threadpool(_archive_members, category, files)
+    if not members:
+        raise HTTPException(status_code=404, detail="no matching files")
+    label = f"category-{category}" if category is not None else "selection"
+    headers = {
+        "content-disposition": f'attachment; filename="loras-{label}.{format}"',
+        "etag": archive_etag(members),
+    }
+    if format == "zip":
+        return StreamingResponse(
+            iter_zip(members), media_type="application/zip", headers=headers
+        )
+
+    segments, size = tar_layout(members)
+    start, end = 0, size - 1
+    status_code = 200
+    headers["accept-ranges"] = "bytes"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # Archives have no modification date, so only ETags validate If-Range
+    if range_header and (
+        if_range is None or if_range_matches(if_range, headers["etag"], "")
+    ):
+        try:
+            requested = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{size}", "accept-ranges": "bytes"},
+            )
+        if requested is not None:
+            start, end = requested
+            status_code = 206
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+    headers["content-length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_tar(segments, start, end),
+        status_code=status_code,
+        media_type="application/x-tar",
+        headers=headers,
+    )
+
+
+@router.get("/download_stats")
+async def download_stats():
+    """Return download counts and bytes served per model."""
+    return downloads.stats()
 
 
 @router.post("/delete")
@@ -313,3 +713,57 @@ async def delete_user(request: Request, username: str = Form(...)):
     if "text/html" in request.headers.get("accept", ""):
         return RedirectResponse(url="/admin/users", status_code=303)
     return {"status": "ok"}
+
+
+@router.get("/admin/slow_queries")
+async def slow_queries(request: Request, limit: int = 20, sort: str = "total"):
+    """List the slowest index statements of this process.
+
+    ``sort`` orders them by ``total`` time, ``max`` time or ``count``.
+    """
+    try:
+        queries = SLOW_QUERIES.top(limit, sort)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if "text/html" in request.headers.get("accept", ""):
+        html = frontend.render_slow_queries(
+            queries, config.SLOW_QUERY_THRESHOLD, sort, user=request.state.user
+        )
+        return HTMLResponse(html)
+    return queries
+
+
+@router.post("/admin/slow_queries/clear")
+async def clear_slow_queries(request: Request):
+    SLOW_QUERIES.clear()
+    if "text/html" in request.headers.get("accept", ""):
+        return RedirectResponse(url="/admin/slow_queries", status_code=303)
+    return {"status": "ok"}
+
+
+@router.get("/api_tokens")
+async def list_api_tokens(request: Request):
+    """List the API tokens of the current user without their values."""
+    auth = request.app.state.auth
+    return auth.list_tokens(request.state.user["username"])
+
+
+@router.post("/api_tokens")
+async def create_api_token(request: Request, name: str = Form("")):
+    """Create an API token for the current user.
+
+    The token is only returned by this request; the server stores a hash.
+    """
+    user = request.state.user
+    if user.get("role") == "guest":
+        raise HTTPException(status_code=403, detail="Login required")
+    auth = request.app.state.auth
+    return {"token": auth.create_token(user["username"], name=name), "name": name}
+
+
+@router.post("/api_tokens/revoke")
+async def revoke_api_token(request: Request, token_id: int = Form(...)):
+    auth = request.app.state.auth
+    if not auth.revoke_token(request.state.user["username"], token_id):
+        raise HTTPException(status_code=404, detail="Token not found")
+    return {"status": "ok"}
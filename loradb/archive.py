@@ -0,0 +1,176 @@
+"""Streaming tar and zip archives built on the fly from files on disk.
+
+Archives are never staged: members are read in fixed size chunks while the
+response is sent, so memory use does not depend on the archive size. The tar
+layout is fully determined by the member list, which allows ``Range``
+requests to resume an interrupted download at any byte offset.
+"""
+
+import hashlib
+import os
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from .file_response import CHUNK_SIZE
+
+#: Size of a tar block; headers and member data are padded to a multiple.
+TAR_BLOCK = 512
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """A file to include in an archive, captured with its size and mtime."""
+
+    name: str
+    path: Path
+    size: int
+    mtime: float
+
+    @classmethod
+    def from_path(cls, name: str, path: Path) -> "ArchiveMember":
+        st = path.stat()
+        return cls(name=name, path=path, size=st.st_size, mtime=st.st_mtime)
+
+
+def archive_etag(members: Iterable[ArchiveMember]) -> str:
+    """Return a strong ETag identifying the exact archive content."""
+    digest = hashlib.sha1()
+    for m in members:
+        digest.update(f"{m.name}\0{m.size}\0{m.mtime!r}\n".encode("utf-8"))
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+# A segment is literal bytes or a member read from disk, plus its length
+Segment = Tuple[bytes | ArchiveMember, int]
+
+
+def tar_layout(members: Iterable[ArchiveMember]) -> Tuple[List[Segment], int]:
+    """Return the segments of a tar archive and its total size in bytes."""
+    segments: List[Segment] = []
+    total = 0
+    for m in members:
+        info = tarfile.TarInfo(m.name)
+        info.size = m.size
+        info.mtime = int(m.mtime)
+        info.mode = 0o644
+        header = info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8")
+        segments.append((header, len(header)))
+        segments.append((m, m.size))
+        padding = -m.size % TAR_BLOCK
+        if padding:
+            segments.append((bytes(padding), padding))
+        total += len(header) + m.size + padding
+    # End of archive marker: two zero blocks
+    segments.append((bytes(2 * TAR_BLOCK), 2 * TAR_BLOCK))
+    return segments, total + 2 * TAR_BLOCK
+
+
+def _read_member(member: ArchiveMember, offset: int, length: int) -> Iterator[bytes]:
+    """Yield ``length`` bytes of ``member`` starting at ``offset``.
+
+    A file that shrank since the layout was computed is padded with zeros so
+    the archive keeps its announced size.
+    """
+    with member.path.open("rb") as fh:
+        fh.seek(offset)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    while length > 0:
+        pad = min(CHUNK_SIZE, length)
+        length -= pad
+        yield bytes(pad)
+
+
+def iter_tar(segments: List[Segment], start: int, end: int) -> Iterator[bytes]:
+    """Yield bytes ``start`` through ``end`` (inclusive) of a tar archive."""
+    position = 0
+    for content, size in segments:
+        seg_start, seg_end = position, position + size
+        position = seg_end
+        if seg_end <= start:
+            continue
+        if seg_start > end:
+            break
+        lo = max(start, seg_start) - seg_start
+        hi = min(end + 1, seg_end) - seg_start
+        if isinstance(content, ArchiveMember):
+            yield from _read_member(content, lo, hi - lo)
+        else:
+            yield content[lo:hi]
+
+
+class _ChunkSink:
+    """Write-only file object collecting the output of :class:`zipfile.ZipFile`."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def iter_zip(members: Iterable[ArchiveMember]) -> Iterator[bytes]:
+    """Yield a zip archive with all ``members`` stored uncompressed.
+
+    Models and images do not compress, so storing them keeps the server
+    from spending CPU on it. ZIP64 records are used automatically when
+    members or offsets exceed 4 GiB.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED, strict_timestamps=False) as zf:
+        for m in members:
+            info = zipfile.ZipInfo.from_file(m.path, m.name, strict_timestamps=False)
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = m.size
+            with zf.open(info, "w") as dest:
+                for chunk in _read_member(m, 0, m.size):
+                    dest.write(chunk)
+                    if len(sink.buffer) >= CHUNK_SIZE:
+                        yield sink.take()
+            # Local header and data descriptor of the finished member
+            if sink.buffer:
+                yield sink.take()
+    # Central directory written on close
+    yield sink.take()
+
+
+def model_members(
+    upload_dir: Path, filenames: Iterable[str], previews: dict
+) -> List[ArchiveMember]:
+    """Return archive members for models and their preview images.
+
+    Each model is placed in ``<stem>/`` with its previews below
+    ``<stem>/<stem>-Images/``, the layout used by ``export_loras.py``.
+    Missing files are skipped.
+    """
+    members: List[ArchiveMember] = []
+    for filename in filenames:
+        stem = Path(filename).stem
+        path = upload_dir / filename
+        if not path.is_file():
+            continue
+        members.append(ArchiveMember.from_path(f"{stem}/{filename}", path))
+        for url in previews.get(stem, []):
+            name = url.split("?", 1)[0].rsplit("/", 1)[-1]
+            preview = upload_dir / name
+            if os.path.isfile(preview):
+                members.append(
+                    ArchiveMember.from_path(f"{stem}/{stem}-Images/{name}", preview)
+                )
+    return members
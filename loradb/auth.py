@@ -1,19 +1,48 @@
+import hashlib
+import hmac
+import secrets
 import sqlite3
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from passlib.hash import bcrypt
 
 import config
 
+from . import metrics
+from .coherence import SharedGenerations
+
 
 class AuthManager:
-    """Manage user accounts stored in the main SQLite database."""
+    """Manage user accounts stored in the main SQLite database.
+
+    Lookups by id, done for every authenticated request, are cached for
+    ``cache_ttl`` seconds. The cache is cleared whenever accounts change
+    through this instance; the TTL bounds how long changes made by other
+    processes (e.g. ``usersetup.py``) take to become visible.
+
+    Scripted clients authenticate with API tokens instead of a password.
+    Only an HMAC of each token is stored, keyed with ``config.SECRET_KEY``,
+    so verifying a token is a single indexed lookup instead of a bcrypt
+    computation.
+    """
 
-    def __init__(self, db_path: Path | None = None) -> None:
+    #: Prefix identifying MyLora API tokens.
+    TOKEN_PREFIX = "mlt_"
+
+    def __init__(self, db_path: Path | None = None, cache_ttl: float = 30.0) -> None:
         self.db_path = Path(db_path or "loradb/search_index/index.db")
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
+        # Shared by the middleware and handlers running in the thread pool
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.cache_ttl = cache_ttl
+        # Mapping of user id to ``(expiry, user)``; misses are cached as ``None``
+        self._user_cache: Dict[int, Tuple[float, Optional[Dict]]] = {}
+        # Mapping of token digest to ``(expiry, user)``
+        self._token_cache: Dict[str, Tuple[float, Optional[Dict]]] = {}
+        self._token_key = config.SECRET_KEY.encode("utf-8")
+        self.shared: SharedGenerations | None = None
         self._ensure_table()
 
     def _ensure_table(self) -> None:
@@ -27,6 +56,18 @@ class AuthManager:
             )
             """
         )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS api_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                name TEXT NOT NULL DEFAULT '',
+                token_hash TEXT UNIQUE NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL
+            )
+            """
+        )
         self.conn.commit()
 
     def create_user(self, username: str, password: str, role: str = "user") -> None:
@@ -37,6 +78,8 @@ class AuthManager:
             (username, pw_hash, role),
         )
         self.conn.commit()
+        # Replacing a user assigns a new id, so cached entries may be stale
+        self.invalidate_cache()
 
     def verify_user(self, username: str, password: str) -> bool:
         cur = self.conn.cursor()
@@ -58,13 +101,114 @@ class AuthManager:
         return None
 
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
+        now = time.monotonic()
+        cached = self._user_cache.get(user_id)
+        hit = cached is not None and cached[0] > now
+        metrics.cache_lookup("user", hit)
+        if hit:
+            return dict(cached[1]) if cached[1] else None
         row = self.conn.execute(
             "SELECT id, username, role FROM users WHERE id = ?",
             (user_id,),
         ).fetchone()
-        if row:
-            return {"id": row[0], "username": row[1], "role": row[2]}
-        return None
+        user = {"id": row[0], "username": row[1], "role": row[2]} if row else None
+        self._user_cache[user_id] = (now + self.cache_ttl, user)
+        return dict(user) if user else None
+
+    def invalidate_cache(self) -> None:
+        """Forget all cached user and token lookups."""
+        self._user_cache.clear()
+        self._token_cache.clear()
+        if self.shared is not None:
+            self.shared.bump("users")
+
+    def share(self, shared: SharedGenerations) -> None:
+        """Drop cached lookups when another worker changes accounts."""
+        self.shared = shared
+        shared.subscribe("users", self._users_changed)
+
+    def _users_changed(self, value: int, updated: float) -> None:
+        self._user_cache.clear()
+        self._token_cache.clear()
+
+    # --- API tokens -------------------------------------------------------
+
+    def _token_digest(self, token: str) -> str:
+        return hmac.new(self._token_key, token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def create_token(self, username: str, name: str = "") -> str:
+        """Create an API token for ``username`` and return it.
+
+        The token itself is not stored and cannot be shown again.
+        """
+        user = self.get_user(username)
+        if user is None:
+            raise ValueError(f"Unknown user {username}")
+        token = self.TOKEN_PREFIX + secrets.token_urlsafe(32)
+        self.conn.execute(
+            "INSERT INTO api_tokens(user_id, name, token_hash, created) VALUES (?, ?, ?, ?)",
+            (user["id"], name, self._token_digest(token), time.time()),
+        )
+        self.conn.commit()
+        return token
+
+    def verify_token(self, token: str) -> Optional[Dict]:
+        """Return the user owning ``token`` or ``None`` if it is not valid."""
+        if not token.startswith(self.TOKEN_PREFIX):
+            return None
+        digest = self._token_digest(token)
+        now = time.monotonic()
+        cached = self._token_cache.get(digest)
+        hit = cached is not None and cached[0] > now
+        metrics.cache_lookup("token", hit)
+        if hit:
+            return dict(cached[1]) if cached[1] else None
+        row = self.conn.execute(
+            """
+            SELECT t.id, t.token_hash, u.id, u.username, u.role
+            FROM api_tokens t JOIN users u ON u.id = t.user_id
+            WHERE t.token_hash = ?
+            """,
+            (digest,),
+        ).fetchone()
+        user = None
+        if row and hmac.compare_digest(row[1], digest):
+            user = {"id": row[2], "username": row[3], "role": row[4]}
+            # Updated once per cache period rather than on every request
+            self.conn.execute(
+                "UPDATE api_tokens SET last_used = ? WHERE id = ?", (time.time(), row[0])
+            )
+            self.conn.commit()
+        self._token_cache[digest] = (now + self.cache_ttl, user)
+        return dict(user) if user else None
+
+    def list_tokens(self, username: str) -> List[Dict]:
+        """Return the API tokens of ``username`` without their values."""
+        rows = self.conn.execute(
+            """
+            SELECT t.id, t.name, t.created, t.last_used
+            FROM api_tokens t JOIN users u ON u.id = t.user_id
+            WHERE u.username = ?
+            ORDER BY t.id
+            """,
+            (username,),
+        ).fetchall()
+        return [
+            {"id": r[0], "name": r[1], "created": r[2], "last_used": r[3]} for r in rows
+        ]
+
+    def revoke_token(self, username: str, token_id: int) -> bool:
+        """Delete the API token ``token_id`` of ``username``."""
+        cur = self.conn.execute(
+            """
+            DELETE FROM api_tokens WHERE id = ?
+            AND user_id = (SELECT id FROM users WHERE username = ?)
+            """,
+            (token_id, username),
+        )
+        self.conn.commit()
+        self.invalidate_cache()
+        return cur.rowcount > 0
 
     def list_users(self) -> List[Dict]:
         rows = self.conn.execute(
@@ -73,5 +217,11 @@ class AuthManager:
         return [{"id": r[0], "username": r[1], "role": r[2]} for r in rows]
 
     def delete_user(self, username: str) -> None:
+        self.conn.execute(
+            "DELETE FROM api_tokens WHERE user_id IN "
+            "(SELECT id FROM users WHERE username = ?)",
+            (username,),
+        )
         self.conn.execute("DELETE FROM users WHERE username = ?", (username,))
         self.conn.commit()
+        self.invalidate_cache()
@@ -0,0 +1,133 @@
+"""Cache coherence between worker processes sharing the index database.
+
+Each worker keeps in-process caches (previews, user lookups) and write
+generations used for HTTP validators. When the application runs with
+several workers, a change handled by one worker must invalidate the caches
+of all others. :class:`SharedGenerations` keeps named generation counters in
+SQLite; writers bump a counter and every worker polls for changes once per
+request. The poll reads ``PRAGMA data_version``, which only changes when
+another connection committed to the database, so it is a cheap in-memory
+check in the common case.
+"""
+
+import contextlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+try:  # File locks are only available on Unix
+    import fcntl
+except ImportError:  # pragma: no cover - depends on platform
+    fcntl = None
+
+#: Called with the new value and the time of the change.
+Listener = Callable[[int, float], None]
+
+
+class SharedGenerations:
+    """Named generation counters shared by all processes using ``db_path``."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS generations (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL,
+                updated REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+        self.listeners: Dict[str, List[Listener]] = {}
+        self.known: Dict[str, Tuple[int, float]] = {}
+        self.data_version = -1
+        self.poll()
+
+    def _read(self) -> Dict[str, Tuple[int, float]]:
+        rows = self.conn.execute("SELECT name, value, updated FROM generations")
+        return {r[0]: (int(r[1]), float(r[2])) for r in rows}
+
+    def value(self, name: str) -> Tuple[int, float]:
+        """Return the last seen value of ``name`` and the time it changed."""
+        return self.known.get(name, (0, 0.0))
+
+    def subscribe(self, name: str, listener: Listener) -> None:
+        """Call ``listener`` when another process bumps ``name``.
+
+        The listener is called once right away with the current value.
+        """
+        self.listeners.setdefault(name, []).append(listener)
+        listener(*self.value(name))
+
+    def bump(self, name: str) -> Tuple[int, float]:
+        """Increment ``name`` and return its new value and timestamp.
+
+        Listeners of this process are not called; the caller already
+        applied the change locally.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO generations(name, value, updated) VALUES (?, 1, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    value = value + 1, updated = MAX(updated, excluded.updated)
+                """,
+                (name, now),
+            )
+            row = self.conn.execute(
+                "SELECT value, updated FROM generations WHERE name = ?", (name,)
+            ).fetchone()
+            self.conn.commit()
+            self.known[name] = (int(row[0]), float(row[1]))
+        return self.known[name]
+
+    def poll(self) -> None:
+        """Notify listeners of counters changed by other processes."""
+        with self.lock:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self.data_version:
+                return
+            self.data_version = version
+            current = self._read()
+            changed = [
+                (name, value)
+                for name, value in current.items()
+                if self.known.get(name) != value
+            ]
+            self.known.update(current)
+        for name, (value, updated) in changed:
+            for listener in self.listeners.get(name, []):
+                listener(value, updated)
+
+
+@contextlib.contextmanager
+def process_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Hold an exclusive lock on ``path`` shared by all worker processes.
+
+    Yields ``False`` without waiting if ``blocking`` is disabled and another
+    process holds the lock. On platforms without ``fcntl`` the lock always
+    succeeds, which is correct for the single process setup they support.
+    """
+    if fcntl is None:  # pragma: no cover - depends on platform
+        yield True
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as fh:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fh, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
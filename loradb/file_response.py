@@ -0,0 +1,214 @@
+"""Ranged file responses for large model downloads."""
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response
+
+#: Size of a single read when ``sendfile`` is not available. The per-download
+#: memory overhead is bounded by this value regardless of the file size.
+CHUNK_SIZE = 1024 * 1024
+
+#: ASGI extension offered by servers supporting zero-copy transfers.
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a ``Range`` header cannot be satisfied for a file."""
+
+
+def parse_range(header: str, size: int) -> Tuple[int, int] | None:
+    """Return the inclusive byte range requested by ``header``.
+
+    ``None`` is returned if the header should be ignored, i.e. for unknown
+    units, malformed values or multiple ranges, in which case the full file is
+    sent. ``RangeNotSatisfiable`` is raised if the range lies outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            start = max(size - suffix, 0)
+            end = size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start < 0:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Return a strong ETag for a file based on its modification time and size."""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def if_range_matches(value: str, etag: str, last_modified: str) -> bool:
+    """Return ``True`` if the ``If-Range`` validator still matches the file."""
+    value = value.strip()
+    if value.startswith('"'):
+        return value == etag
+    if value.startswith("W/"):
+        # Weak validators must never be used with If-Range
+        return False
+    try:
+        return parsedate_to_datetime(value) == parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+class RangeFileResponse(Response):
+    """Stream ``path`` or a byte range of it to the client.
+
+    Uses the ASGI zero-copy ``sendfile`` extension when the server offers it
+    and falls back to reading fixed size chunks in a worker thread.
+    ``on_complete`` is called in a worker thread with the start offset and
+    the number of bytes sent.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        start: int,
+        end: int,
+        status_code: int = 200,
+        headers: Dict[str, str] | None = None,
+        on_complete: Callable[[int, int], None] | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.start = start
+        self.length = max(end - start + 1, 0)
+        self.status_code = status_code
+        self.media_type = None
+        self.background = None
+        self.on_complete = on_complete
+        self.init_headers(headers or {})
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope.get("method") == "HEAD" or not self.length:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        sent = 0
+        try:
+            with self.path.open("rb") as fh:
+                if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                    await send(
+                        {
+                            "type": ZEROCOPY_EXTENSION,
+                            "file": fh.fileno(),
+                            "offset": self.start,
+                            "count": self.length,
+                            "more_body": False,
+                        }
+                    )
+                    sent = self.length
+                    return
+                fh.seek(self.start)
+                remaining = self.length
+                while remaining > 0:
+                    chunk = await anyio.to_thread.run_sync(
+                        fh.read, min(CHUNK_SIZE, remaining)
+                    )
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    sent += len(chunk)
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": remaining > 0,
+                        }
+                    )
+                if remaining > 0:
+                    # File shrank while sending; terminate the body cleanly
+                    await send(
+                        {"type": "http.response.body", "body": b"", "more_body": False}
+                    )
+        finally:
+            if self.on_complete:
+                # The callback may write to the database; run it in a worker
+                # thread and still run it when the client disconnected
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(self.on_complete, self.start, sent)
+
+
+def ranged_file_response(
+    request: Request,
+    path: Path,
+    on_complete: Callable[[int, int], None] | None = None,
+) -> Response:
+    """Build a full, partial, ``304`` or ``416`` response for ``path``.
+
+    Honours ``Range`` and ``If-Range`` so interrupted downloads can resume and
+    clients may fetch several segments in parallel. ``If-None-Match`` with the
+    current ETag yields ``304 Not Modified``.
+    """
+    stat_result = path.stat()
+    size = stat_result.st_size
+    etag = file_etag(stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "accept-ranges": "bytes",
+        "content-type": "application/octet-stream",
+        "content-disposition": f'attachment; filename="{path.name}"',
+        "etag": etag,
+        "last-modified": last_modified,
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [v.strip() for v in if_none_match.split(",")]:
+        # Lets sync clients confirm an unchanged file without transferring it
+        return Response(
+            status_code=304, headers={"etag": etag, "last-modified": last_modified}
+        )
+    start, end = 0, size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (
+        if_range is None or if_range_matches(if_range, etag, last_modified)
+    ):
+        try:
+            requested = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{size}", "accept-ranges": "bytes"},
+            )
+        if requested is not None:
+            start, end = requested
+            status_code = 206
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+    headers["content-length"] = str(max(end - start + 1, 0))
+    return RangeFileResponse(
+        path,
+        start,
+        end,
+        status_code=status_code,
+        headers=headers,
+        on_complete=on_complete,
+    )
@@ -0,0 +1,96 @@
+"""Helpers for conditional GET handling using ETag and Last-Modified."""
+
+import hashlib
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict
+
+from fastapi import Request, Response
+
+from . import metrics
+
+# Random token mixed into every ETag, so validators issued by a previous run
+# never match the ones issued by the current one. Worker processes started
+# together inherit the token of their parent through ``MYLORA_BOOT_TOKEN``
+# and therefore issue identical validators.
+BOOT_TOKEN = os.environ.get("MYLORA_BOOT_TOKEN") or secrets.token_hex(8)
+
+#: ``Cache-Control`` policy for each route supporting conditional requests.
+#: Responses depend on the logged in user, so they are marked ``private`` and
+#: must always be revalidated with the server.
+CACHE_POLICIES: Dict[str, str] = {
+    "/search": "private, no-cache",
+    "/grid_data": "private, no-cache",
+    "/categories": "private, no-cache",
+    "/detail": "private, no-cache",
+    "/showcase": "private, no-cache",
+    "/catalog.ndjson": "private, no-cache",
+    "/manifest": "private, no-cache",
+}
+
+
+def make_etag(*parts) -> str:
+    """Return a weak ETag derived from ``parts``."""
+    raw = "|".join(str(p) for p in (BOOT_TOKEN, *parts))
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Return ``True`` if ``etag`` is listed in an ``If-None-Match`` header."""
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: float | None = None
+) -> bool:
+    """Check the conditional request headers of ``request``.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since`` as required
+    by RFC 9110. Every check is recorded as a lookup in the ``query`` cache:
+    a match answers the request without running its index query.
+    """
+    fresh = False
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    elif if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            since = None
+        fresh = since is not None and int(last_modified) <= since
+    metrics.cache_lookup("query", fresh)
+    return fresh
+
+
+def cache_headers(
+    etag: str, policy: str, last_modified: float | None = None
+) -> Dict[str, str]:
+    """Return the validator and caching headers for a response.
+
+    Responses depend on the caller, who is identified by a session cookie or
+    an API token, so both headers are listed in ``Vary``.
+    """
+    headers = {"ETag": etag, "Cache-Control": policy, "Vary": "Cookie, Authorization"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified_response(
+    etag: str, policy: str, last_modified: float | None = None
+) -> Response:
+    """Return an empty ``304 Not Modified`` response."""
+    return Response(status_code=304, headers=cache_headers(etag, policy, last_modified))
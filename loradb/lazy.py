@@ -0,0 +1,56 @@
+"""Deferred construction of module level singletons.
+
+The API module exposes its agents as module attributes. Building them
+opens databases and creates directories, which should not happen merely
+because the module was imported, e.g. by a tool or a test collecting
+routes. :class:`Lazy` stands in for such an object and builds it on first
+use.
+"""
+
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """Proxy building an object with ``factory`` on first attribute access.
+
+    Attribute reads and writes are forwarded to the object, so call sites
+    and tests monkeypatching attributes work unchanged.
+    """
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_instance", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def get(self) -> T:
+        """Return the object, building it if necessary."""
+        instance = self._lazy_instance
+        if instance is None:
+            with self._lazy_lock:
+                instance = self._lazy_instance
+                if instance is None:
+                    instance = self._lazy_factory()
+                    object.__setattr__(self, "_lazy_instance", instance)
+        return instance
+
+    @property
+    def built(self) -> bool:
+        """Return ``True`` once the object has been built."""
+        return self._lazy_instance is not None
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.get(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        if self.built:
+            return repr(self._lazy_instance)
+        return f"<Lazy {getattr(self._lazy_factory, '__name__', 'object')}>"
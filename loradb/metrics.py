@@ -0,0 +1,365 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Metrics are plain counters, gauges and histograms kept in memory and
+rendered by ``GET /metrics``. Updating one takes a lock and a few
+arithmetic operations, so instrumentation can stay enabled in production.
+Values are per process; with several workers every scrape is answered by
+one of them.
+"""
+
+import abc
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+#: Upper bounds of the latency histogram buckets in seconds.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[str]:
+        """Yield the sample lines of this metric."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        # Metrics without labels are reported from the start
+        self.values: Dict[LabelValues, float] = {} if self.label_names else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        self._add(self._key(labels), amount)
+
+    def _add(self, key: LabelValues, amount: float) -> None:
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose values are read from ``callback`` when rendered.
+
+    The callback returns a mapping of label values to the current value. It
+    runs on every scrape, so it must be cheap.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labels: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for key, value in sorted(self.callback().items()):
+            yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: bucket counts (last one is +Inf), sum
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: LabelValues, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self.values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> Iterable[str]:
+        with self.lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self.values.items())
+        names = self.label_names + ("le",)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {cumulative}"
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback_gauge(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labels: Sequence[str] = (),
+    ) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help, callback, labels))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as exc:  # pragma: no cover - defensive
+                # A failing callback must not hide the other metrics
+                lines.append(f"# {metric.name} unavailable: {exc}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "mylora_http_requests_total", "HTTP requests by route, method and status.",
+    ("route", "method", "status"),
+)
+HTTP_DURATION = REGISTRY.histogram(
+    "mylora_http_request_duration_seconds", "Time to answer HTTP requests.",
+    ("route", "method"),
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "mylora_http_requests_in_flight", "HTTP requests currently being answered."
+)
+INDEX_CALLS = REGISTRY.histogram(
+    "mylora_index_call_duration_seconds",
+    "Duration of IndexingAgent methods including their SQLite queries.",
+    ("method",),
+)
+INDEX_QUERIES = REGISTRY.counter(
+    "mylora_index_queries_total",
+    "SQLite statements executed on the index connection by IndexingAgent method.",
+    ("method",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "mylora_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result")
+)
+UPLOAD_BYTES = REGISTRY.counter(
+    "mylora_upload_bytes_total", "Bytes of models and previews received by uploads."
+)
+
+
+def _hit_ratios() -> Dict[LabelValues, float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in list(CACHE_REQUESTS.values.items()):
+        entry = totals.setdefault(cache, [0.0, 0.0])
+        entry[0 if result == "hit" else 1] += value
+    return {(cache,): hits / (hits + misses) for cache, (hits, misses) in totals.items()}
+
+
+REGISTRY.callback_gauge(
+    "mylora_cache_hit_ratio", "Share of cache lookups answered from the cache.",
+    _hit_ratios, ("cache",),
+)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    """Record a lookup in ``cache``."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# --- IndexingAgent instrumentation -------------------------------------------
+
+_current = threading.local()
+_TRANSACTION = ("BEGIN", "COMMIT", "ROLLBACK")
+_OTHER = ("other",)
+
+
+def count_query(statement: str) -> None:
+    """SQLite trace callback counting statements per running method."""
+    # Runs for every statement, so label handling is skipped
+    if not statement.startswith(_TRANSACTION):
+        INDEX_QUERIES._add(getattr(_current, "key", None) or _OTHER, 1.0)
+
+
+def instrument(cls: type) -> type:
+    """Time the public methods of ``cls`` in :data:`INDEX_CALLS`.
+
+    Statements counted by :py:func:`count_query` are attributed to the
+    innermost instrumented method running in the same thread. Generators
+    are left alone as their work happens after the call returns.
+    """
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(func):
+            continue
+        if inspect.isgeneratorfunction(func):
+            continue
+        setattr(cls, name, _timed(name, func))
+    return cls
+
+
+def _timed(name: str, func: Callable) -> Callable:
+    key = (name,)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outer = getattr(_current, "key", None)
+        _current.key = key
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            INDEX_CALLS._observe(key, time.perf_counter() - start)
+            _current.key = outer
+
+    return wrapper
+
+
+# --- HTTP instrumentation ----------------------------------------------------
+
+
+def route_label(scope) -> str:
+    """Return the route template of a handled request, e.g. ``/detail/{filename}``.
+
+    Using templates instead of paths keeps the number of series bounded.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    url = scope.get("path", "")
+    for prefix in ("/static", "/uploads"):
+        if url.startswith(prefix + "/"):
+            return prefix
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Record request counts, latencies and in-flight requests."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = route_label(scope)
+            method = scope.get("method", "GET")
+            HTTP_DURATION.observe(elapsed, route=route, method=method)
+            HTTP_REQUESTS.inc(route=route, method=method, status=str(status))
@@ -0,0 +1,246 @@
+"""Slow query log for SQLite connections.
+
+Connections opened with :py:func:`connect` time every statement from
+``execute`` until its last row is fetched. Statements slower than the
+threshold of their :py:class:`SlowQueryLog` are logged as warnings with
+their parameters, wall time and row count, and aggregated per statement. The
+``EXPLAIN QUERY PLAN`` output of a statement is captured the first time it
+is slow, so the plan can be read on ``/admin/slow_queries`` without
+reproducing the slow call.
+"""
+
+import itertools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import config
+
+logger = logging.getLogger(__name__)
+
+#: Characters of the parameter list kept in the log.
+MAX_PARAMS_LENGTH = 200
+
+
+def _normalize(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _format_params(parameters: Any) -> str:
+    text = repr(tuple(parameters) if isinstance(parameters, list) else parameters)
+    if len(text) > MAX_PARAMS_LENGTH:
+        text = text[: MAX_PARAMS_LENGTH - 3] + "..."
+    return text
+
+
+class SlowQueryLog:
+    """Aggregate statements slower than ``threshold`` seconds.
+
+    At most ``max_statements`` distinct statements are kept; when a new one
+    arrives the entry with the lowest total time is dropped.
+    """
+
+    def __init__(self, threshold: float = 0.1, max_statements: int = 500) -> None:
+        self.threshold = threshold
+        self.max_statements = max_statements
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def record(
+        self,
+        conn: sqlite3.Connection,
+        sql: str,
+        parameters: Any,
+        elapsed: float,
+        rows: int,
+    ) -> None:
+        """Record one execution of ``sql`` if it exceeded the threshold."""
+        if elapsed < self.threshold:
+            return
+        key = _normalize(sql)
+        params = _format_params(parameters)
+        logger.warning(
+            "Slow query (%.1f ms, %d rows): %s %s", elapsed * 1000, rows, key, params
+        )
+        with self.lock:
+            entry = self.entries.get(key)
+            first = entry is None
+            if first:
+                if len(self.entries) >= self.max_statements:
+                    cheapest = min(self.entries, key=lambda k: self.entries[k]["total"])
+                    del self.entries[cheapest]
+                entry = self.entries[key] = {
+                    "sql": key,
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "plan": None,
+                }
+            entry["count"] += 1
+            entry["total"] += elapsed
+            entry["last"] = elapsed
+            entry["rows"] = rows
+            entry["params"] = params
+            entry["seen"] = time.time()
+            if elapsed >= entry["max"]:
+                entry["max"] = elapsed
+                entry["max_params"] = params
+        if first:
+            entry["plan"] = self.explain(conn, sql, parameters)
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, sql: str, parameters: Any) -> str:
+        """Return the query plan of ``sql`` as an indented tree."""
+        try:
+            rows = sqlite3.Connection.execute(
+                conn, "EXPLAIN QUERY PLAN " + sql, parameters
+            ).fetchall()
+        except sqlite3.Error as exc:
+            return f"unavailable: {exc}"
+        depth: Dict[int, int] = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node] + detail)
+        return "\n".join(lines)
+
+    def top(self, limit: int = 20, sort: str = "total") -> List[Dict[str, Any]]:
+        """Return the ``limit`` slowest statements by ``total``, ``max`` or ``count``."""
+        if sort not in ("total", "max", "count"):
+            raise ValueError(f"Cannot sort by {sort}")
+        with self.lock:
+            entries = [dict(e) for e in self.entries.values()]
+        entries.sort(key=lambda e: e[sort], reverse=True)
+        for entry in entries:
+            entry["mean"] = entry["total"] / entry["count"]
+        return entries[:limit]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+#: Log shared by the connections of this process.
+SLOW_QUERIES = SlowQueryLog(config.SLOW_QUERY_THRESHOLD or 0.0)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor reporting its statements to the log of its connection.
+
+    The time spent in ``execute`` and the fetch calls is added up until the
+    result is exhausted, the cursor is reused or it is released, so lazily
+    evaluated statements are measured completely.
+    """
+
+    _trace: List | None = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._begin(sql, parameters, start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        # Keep the first parameter set for the log and query plan
+        params = iter(seq_of_parameters)
+        first = next(params, None)
+        if first is not None:
+            params = itertools.chain([first], params)
+        start = time.perf_counter()
+        super().executemany(sql, params)
+        self._begin(sql, () if first is None else first, start)
+        return self
+
+    def _begin(self, sql, parameters, start: float) -> None:
+        self._trace = [sql, parameters, time.perf_counter() - start, 0]
+        if self.description is None:
+            # Statements without result rows are complete
+            self._trace[3] = max(self.rowcount, 0)
+            self._finish()
+
+    def _fetched(self, start: float, rows: int, done: bool) -> None:
+        trace = self._trace
+        if trace is not None:
+            trace[2] += time.perf_counter() - start
+            trace[3] += rows
+            if done:
+                self._finish()
+
+    def _finish(self) -> None:
+        trace, self._trace = self._trace, None
+        if trace is not None:
+            log = getattr(self.connection, "query_log", None)
+            if log is not None:
+                log.record(self.connection, *trace)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors report slow statements to ``query_log``."""
+
+    query_log: SlowQueryLog | None = None
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_path: Path, log: SlowQueryLog | None = None) -> sqlite3.Connection:
+    """Open ``db_path`` for use from several threads, tracing slow statements.
+
+    ``log`` defaults to :data:`SLOW_QUERIES`. Without a log and with
+    ``config.SLOW_QUERY_THRESHOLD`` set to ``None`` a plain connection is
+    returned.
+    """
+    if log is None:
+        if config.SLOW_QUERY_THRESHOLD is None:
+            return sqlite3.connect(db_path, check_same_thread=False)
+        log = SLOW_QUERIES
+    conn = sqlite3.connect(db_path, check_same_thread=False, factory=TracedConnection)
+    conn.query_log = log
+    return conn
@@ -0,0 +1,186 @@
+"""Fast JSON responses and on-the-fly response compression."""
+
+import json
+import zlib
+from typing import Any, Iterable, Iterator
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+from .static_assets import accepted_encodings
+
+try:  # orjson is several times faster than the stdlib encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+try:  # zstd is optional; gzip is always available
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+#: Content types worth compressing. Images and model files are already dense.
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def json_dumps(content: Any) -> bytes:
+    """Serialize ``content`` to compact UTF-8 JSON, using orjson if available."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def ndjson_chunks(rows: Iterable[Any], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode ``rows`` as newline delimited JSON.
+
+    Lines are grouped into chunks of roughly ``chunk_size`` bytes to keep the
+    per-message overhead low while memory use stays bounded.
+    """
+    buffer = bytearray()
+    for row in rows:
+        buffer += json_dumps(row)
+        buffer += b"\n"
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with orjson when it is installed.
+
+    Routes should return this class directly instead of plain lists so the
+    content bypasses FastAPI's ``jsonable_encoder``.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+class CompressionMiddleware:
+    """Compress response bodies with zstd or gzip.
+
+    Bodies smaller than ``minimum_size`` bytes, ranged and already encoded
+    responses are passed through untouched. Streaming responses are compressed
+    incrementally and flushed per chunk so clients see data as it is produced.
+    Strong ETags of compressed responses are weakened, as they describe the
+    uncompressed representation.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if zstandard is not None and "zstd" in accepted:
+            encoding = "zstd"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-request state for :class:`CompressionMiddleware`."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: dict | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _compressor(self):
+        if self.encoding == "zstd":
+            cctx = zstandard.ZstdCompressor(level=self.middleware.zstd_level)
+            return cctx.compressobj()
+        return zlib.compressobj(self.middleware.gzip_level, zlib.DEFLATED, 31)
+
+    def _flush(self, final: bool) -> bytes:
+        if self.encoding == "zstd":
+            if final:
+                return self.compressor.flush()
+            return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    def _should_compress(self, headers: MutableHeaders) -> bool:
+        status = self.start_message["status"]
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def send(self, message) -> None:
+        if message["type"] == "http.response.start":
+            # Delay the headers until the first body chunk is known
+            self.start_message = message
+            return
+        if self.passthrough or self.start_message is None:
+            await self.downstream(message)
+            return
+        if self.compressor is None:
+            await self._begin(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        data = self.compressor.compress(body) + self._flush(final=not more_body)
+        await self.downstream(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
+
+    async def _begin(self, message) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if (
+            message["type"] != "http.response.body"
+            or not self._should_compress(headers)
+            or (not more_body and len(body) < self.middleware.minimum_size)
+        ):
+            self.passthrough = True
+            await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+        self.compressor = self._compressor()
+        data = self.compressor.compress(body) + self._flush(final=not more_body)
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed body differs byte for byte from the identity one
+            headers["etag"] = "W/" + etag
+        if more_body:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(len(data))
+        await self.downstream(self.start_message)
+        await self.downstream(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
@@ -0,0 +1,204 @@
+"""Fingerprinted asset URLs and cache-friendly static file serving.
+
+Assets are referenced as ``/static/<name>?v=<hash>`` where ``<hash>`` is
+derived from the file content. Requests carrying the current fingerprint are
+answered with ``Cache-Control: immutable`` so browsers never revalidate them;
+replacing a file changes its fingerprint and therefore its URL. Uploaded
+previews are too many to hash while rendering a page, so their fingerprint is
+derived from modification time and size instead.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+
+import config
+
+try:  # Brotli is optional; gzip variants are always produced
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+#: Cache policy for URLs carrying a matching content fingerprint.
+IMMUTABLE_POLICY = "public, max-age=31536000, immutable"
+#: Cache policy for unversioned URLs.
+REVALIDATE_POLICY = "no-cache"
+
+#: Supported precompressed variants in order of preference.
+PRECOMPRESSED: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+#: File types worth compressing. Images and model files are already dense.
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".html", ".json", ".txt", ".map"}
+#: File types never linked with a fingerprint. Hashing a model to check a
+#: ``?v=`` query would read gigabytes.
+UNVERSIONED_SUFFIXES = {".safetensors"}
+
+# Cache mapping a path to ``(mtime_ns, size, digest)``
+_fingerprints: Dict[str, Tuple[int, int, str]] = {}
+
+
+def fingerprint(path: Path, content: bool = True) -> str | None:
+    """Return a short version token for ``path`` or ``None`` if it is missing.
+
+    With ``content`` the token hashes the file content. Hashes are cached and
+    only recomputed when the file's modification time or size changes.
+    Otherwise the token is derived from modification time and size alone,
+    which needs no reads.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if not content:
+        stamp = f"{st.st_mtime_ns}:{st.st_size}".encode("ascii")
+        return hashlib.sha256(stamp).hexdigest()[:12]
+    key = str(path)
+    cached = _fingerprints.get(key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()[:12]
+    _fingerprints[key] = (st.st_mtime_ns, st.st_size, value)
+    return value
+
+
+def asset_url(prefix: str, directory: Path, name: str, content: bool = True) -> str:
+    """Return the fingerprinted URL for ``name`` served below ``prefix``.
+
+    ``content`` selects the kind of fingerprint, see :py:func:`fingerprint`.
+    """
+    url = f"{prefix}/{name}"
+    digest = fingerprint(Path(directory) / name, content)
+    return f"{url}?v={digest}" if digest else url
+
+
+def static_url(name: str) -> str:
+    """Return the fingerprinted ``/static`` URL for ``name``."""
+    return asset_url("/static", Path(config.STATIC_DIR), name)
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Return the content codings accepted by an ``Accept-Encoding`` header."""
+    accepted: Set[str] = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    """``StaticFiles`` with fingerprint-aware caching and precompressed variants.
+
+    ``content_fingerprints`` must match the ``content`` argument used to
+    build the URLs of the directory, see :py:func:`asset_url`.
+    """
+
+    def __init__(self, *args, content_fingerprints: bool = True, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.content_fingerprints = content_fingerprints
+
+    async def get_response(self, path: str, scope):
+        headers = Headers(scope=scope)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        version = (query.get("v") or [None])[0]
+
+        response = None
+        if Path(path).suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            accepted = accepted_encodings(headers.get("accept-encoding", ""))
+            source = Path(self.directory) / path
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding not in accepted:
+                    continue
+                if not _is_fresh(source.with_name(source.name + suffix), source):
+                    continue
+                try:
+                    response = await super().get_response(path + suffix, scope)
+                except HTTPException:
+                    continue
+                media_type = mimetypes.guess_type(path)[0] or "text/plain"
+                response.headers["content-type"] = media_type
+                response.headers["content-encoding"] = encoding
+                break
+            if response is None:
+                response = await super().get_response(path, scope)
+            response.headers["vary"] = "Accept-Encoding"
+        else:
+            response = await super().get_response(path, scope)
+
+        fresh = False
+        if version and Path(path).suffix.lower() not in UNVERSIONED_SUFFIXES:
+            # Hashing a changed file must not block the event loop
+            current = await run_in_threadpool(
+                fingerprint, Path(self.directory) / path, self.content_fingerprints
+            )
+            fresh = version == current
+        if fresh:
+            response.headers["cache-control"] = IMMUTABLE_POLICY
+        else:
+            response.headers["cache-control"] = REVALIDATE_POLICY
+        return response
+
+
+def precompress(directory: Path, min_size: int = 256) -> List[Path]:
+    """Write ``.gz`` (and ``.br`` if available) variants of compressible files.
+
+    Variants are only rewritten when they are older than their source. Files
+    smaller than ``min_size`` bytes are skipped. Returns the written paths.
+    """
+    written: List[Path] = []
+    for src in _compressible_files(Path(directory)):
+        if src.stat().st_size < min_size:
+            continue
+        data = None
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding == "br" and brotli is None:
+                continue
+            dest = src.with_name(src.name + suffix)
+            if _is_fresh(dest, src):
+                continue
+            if data is None:
+                data = src.read_bytes()
+            if encoding == "br":
+                payload = brotli.compress(data, quality=11)
+            else:
+                payload = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(payload) >= len(data):
+                dest.unlink(missing_ok=True)
+                continue
+            dest.write_bytes(payload)
+            written.append(dest)
+    return written
+
+
+def _is_fresh(variant: Path, source: Path) -> bool:
+    """Return ``True`` if ``variant`` exists and is not older than ``source``."""
+    try:
+        return variant.stat().st_mtime_ns >= source.stat().st_mtime_ns
+    except OSError:
+        return False
+
+
+def _compressible_files(directory: Path) -> Iterable[Path]:
+    for path in sorted(directory.rglob("*")):
+        if path.is_file() and path.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            yield path
@@ -1,36 +1,74 @@
+import argparse
 import os
+import secrets
 from pathlib import Path
 
 from fastapi import FastAPI, Form, Request, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, PlainTextResponse
 from jinja2 import Environment, FileSystemLoader
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 import config
-from loradb.api import indexer
+from loradb import metrics
+from loradb.api import downloads, indexer, publisher, shared, watcher
 from loradb.api import router as api_router
 from loradb.auth import AuthManager
+from loradb.responses import CompressionMiddleware
+from loradb.static_assets import CachedStaticFiles, static_url
 
 app = FastAPI(title="LoRA Database")
 app.state.auth = AuthManager()
 
-app.mount("/static", StaticFiles(directory=config.STATIC_DIR), name="static")
-app.mount("/uploads", StaticFiles(directory=config.UPLOAD_DIR), name="uploads")
+app.mount("/static", CachedStaticFiles(directory=config.STATIC_DIR), name="static")
+app.mount(
+    "/uploads",
+    CachedStaticFiles(directory=config.UPLOAD_DIR, content_fingerprints=False),
+    name="uploads",
+)
 
 UPLOAD_DIR = Path(config.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 env = Environment(loader=FileSystemLoader(config.TEMPLATE_DIR))
+env.globals["static_url"] = static_url
 
 app.include_router(api_router)
 
 
+#: Health checks used by process managers and load balancers.
+PROBE_PATHS = ("/healthz", "/readyz")
+
+
+def _is_public_asset(path: str) -> bool:
+    """Return ``True`` for static files, previews and health checks served to everyone."""
+    if path.startswith("/static") or path in PROBE_PATHS:
+        return True
+    # Preview images are public, model files require an account
+    return path.startswith("/uploads") and not path.endswith(".safetensors")
+
+
 @app.middleware("http")
 async def auth_middleware(request: Request, call_next):
+    path = request.url.path
+    if _is_public_asset(path):
+        # Skip the user lookup for the many asset requests of each page
+        request.state.user = {"username": "guest", "role": "guest"}
+        return await call_next(request)
+    # Pick up cache invalidations from other worker processes
+    shared.poll()
     auth = request.app.state.auth
     user = None
-    if request.session.get("user_id"):
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        # Scripted clients send an API token instead of a session cookie
+        user = auth.verify_token(authorization[7:].strip())
+        if user is None:
+            return JSONResponse(
+                {"detail": "Invalid API token"},
+                status_code=401,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    elif request.session.get("user_id"):
         user = auth.get_user_by_id(request.session["user_id"])
     elif request.cookies.get("remember_user_id"):
         uid = request.cookies.get("remember_user_id")
@@ -43,11 +81,8 @@ async def auth_middleware(request: Request, call_next):
     request.state.user = user
     if os.environ.get("TESTING"):
         return await call_next(request)
-    path = request.url.path
     if (
-        path.startswith("/static")
-        or path.startswith("/uploads")
-        or path.startswith("/login")
+        path.startswith("/login")
         or path == "/showcase"
         or path.startswith("/showcase_detail")
     ):
@@ -66,8 +101,14 @@ async def auth_middleware(request: Request, call_next):
         "/delete_category",
         "/delete",
         "/admin/users",
+        "/admin/slow_queries",
+        "/download_stats",
+        "/archive",
+        "/metrics",
     ]
-    if any(path.startswith(p) for p in admin_paths) and user.get("role") != "admin":
+    # Match whole path segments, "/upload" must not cover "/uploads/..."
+    is_admin_path = any(path == p or path.startswith(p + "/") for p in admin_paths)
+    if is_admin_path and user.get("role") != "admin":
         template = env.get_template("access_denied.html")
         return HTMLResponse(template.render(title="Access Denied", user=user), status_code=403)
     return await call_next(request)
@@ -75,6 +116,83 @@ async def auth_middleware(request: Request, call_next):
 
 # Add session support after registering the auth middleware so it runs earlier
 app.add_middleware(SessionMiddleware, secret_key=config.SECRET_KEY)
+# Compression is registered last so it wraps every route and static response
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+# Outermost, so request timings include authentication and compression
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.on_event("startup")
+def start_background_tasks() -> None:
+    app.state.auth.share(shared.get())
+    # Requests are served while an empty index is being built
+    indexer.start_initial_index()
+    if publisher is not None:
+        publisher.start()
+    if watcher is not None:
+        watcher.start()
+
+
+@app.on_event("shutdown")
+def flush_download_stats() -> None:
+    if downloads.built:
+        downloads.flush()
+    if publisher is not None:
+        publisher.stop()
+    if watcher is not None:
+        watcher.stop()
+
+
+@app.get("/healthz")
+async def healthz():
+    """Report that the process is alive."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Report whether the initial index is complete.
+
+    Answers ``503`` with the indexing progress until it is.
+    """
+    status = indexer.index_status()
+    code = 200 if indexer.ready.is_set() else 503
+    return JSONResponse(status, status_code=code)
+
+
+def _queue_depths() -> dict:
+    """Return the work waiting in each background job of this process.
+
+    Agents that were not built yet have nothing queued and are skipped.
+    """
+    depths = {}
+    if indexer.built:
+        if indexer.progress["state"] == "indexing":
+            depths[("initial_index",)] = indexer.progress["total"] - indexer.progress["done"]
+        depths[("hashes",)] = len(indexer.pending_hashes)
+    if downloads.built:
+        depths[("download_stats",)] = len(downloads.pending)
+    if watcher is not None and watcher.built:
+        depths[("watch",)] = len(watcher.pending)
+    if publisher is not None and publisher.built and publisher.applied_seq is not None:
+        depths[("publish",)] = max(indexer.current_seq() - publisher.applied_seq, 0)
+    return depths
+
+
+metrics.REGISTRY.callback_gauge(
+    "mylora_background_queue_depth",
+    "Items waiting to be processed by each background job.",
+    _queue_depths,
+    ("job",),
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Expose the metrics of this process in the Prometheus text format."""
+    return PlainTextResponse(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.exception_handler(StarletteHTTPException)
@@ -149,7 +267,27 @@ async def logout(request: Request):
     return response
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the MyLora server")
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address")
+    parser.add_argument("--port", type=int, default=5000, help="Port")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("MYLORA_WORKERS", "1")),
+        help="Number of worker processes (default: 1 or $MYLORA_WORKERS)",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=5000)
+    args = parse_args()
+    if args.workers > 1:
+        # Workers import the app themselves; sharing the boot token keeps
+        # their HTTP validators identical
+        os.environ.setdefault("MYLORA_BOOT_TOKEN", secrets.token_hex(8))
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
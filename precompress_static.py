@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+"""Write gzip/brotli variants of the static assets for faster delivery."""
+
+import argparse
+from pathlib import Path
+
+import config
+from loradb.static_assets import brotli, precompress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompress static assets")
+    parser.add_argument(
+        "directory",
+        type=Path,
+        nargs="?",
+        default=Path(config.STATIC_DIR),
+        help="Directory to compress (defaults to the static folder)",
+    )
+    args = parser.parse_args()
+
+    written = precompress(args.directory)
+    if brotli is None:
+        print("brotli not installed, only gzip variants were written")
+    print(f"Wrote {len(written)} precompressed file(s)")
+
+
+if __name__ == "__main__":
+    main()
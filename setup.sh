@@ -26,6 +26,7 @@ setup_venv() {
     python3 -m venv "$VENV_DIR"
     "$VENV_DIR/bin/pip" install --upgrade pip
     "$VENV_DIR/bin/pip" install -r "$INSTALL_DIR/requirements.txt"
+    "$VENV_DIR/bin/python" "$INSTALL_DIR/precompress_static.py"
 }
 
 create_service() {
@@ -62,6 +63,7 @@ update_app() {
     fi
     git -C "$INSTALL_DIR" pull
     "$VENV_DIR/bin/pip" install -r "$INSTALL_DIR/requirements.txt"
+    "$VENV_DIR/bin/python" "$INSTALL_DIR/precompress_static.py"
     systemctl restart mylora.service
     echo "MyLora updated"
 }
@@ -0,0 +1,60 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import main
+from loradb.auth import AuthManager
+
+client = TestClient(main.app)
+
+
+def test_token_lifecycle(tmp_path):
+    auth = AuthManager(db_path=tmp_path / "users.db")
+    auth.create_user("alice", "secret", role="admin")
+    token = auth.create_token("alice", name="exporter")
+    assert token.startswith(AuthManager.TOKEN_PREFIX)
+    # Only a keyed hash is stored
+    stored = auth.conn.execute("SELECT token_hash FROM api_tokens").fetchone()[0]
+    assert token not in stored
+
+    assert auth.verify_token(token)["username"] == "alice"
+    assert auth.verify_token(token + "x") is None
+    assert auth.verify_token("not-a-token") is None
+    tokens = auth.list_tokens("alice")
+    assert [t["name"] for t in tokens] == ["exporter"]
+    assert tokens[0]["last_used"] is not None
+
+    assert auth.revoke_token("alice", tokens[0]["id"])
+    assert auth.verify_token(token) is None
+    assert not auth.revoke_token("alice", tokens[0]["id"])
+
+
+def test_deleting_user_revokes_tokens(tmp_path):
+    auth = AuthManager(db_path=tmp_path / "users.db")
+    auth.create_user("bob", "secret")
+    token = auth.create_token("bob")
+    auth.delete_user("bob")
+    assert auth.verify_token(token) is None
+    assert auth.conn.execute("SELECT COUNT(*) FROM api_tokens").fetchone()[0] == 0
+
+
+def test_bearer_token_authenticates_requests():
+    auth = main.app.state.auth
+    auth.create_user("token_user", "secret", role="user")
+    token = auth.create_token("token_user")
+    os.environ.pop("TESTING", None)
+    try:
+        resp = client.get(
+            "/manifest", params={"limit": 1},
+            headers={"authorization": f"Bearer {token}"},
+        )
+        assert resp.status_code == 200
+        resp = client.get("/manifest", headers={"authorization": "Bearer mlt_wrong"})
+        assert resp.status_code == 401
+        assert resp.headers["www-authenticate"] == "Bearer"
+    finally:
+        os.environ["TESTING"] = "1"
+        auth.delete_user("token_user")
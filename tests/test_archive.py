@@ -0,0 +1,77 @@
+import io
+import os
+import sys
+import tarfile
+import zipfile
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import loradb.api as api
+import main
+from loradb.archive import iter_tar, iter_zip, model_members, tar_layout
+
+client = TestClient(main.app)
+
+
+def _members(tmp_path):
+    (tmp_path / "a.safetensors").write_bytes(bytes(range(256)) * 12)
+    (tmp_path / "a.png").write_bytes(b"png")
+    (tmp_path / "b.safetensors").write_bytes(b"b" * 512)
+    return model_members(
+        tmp_path,
+        ["a.safetensors", "b.safetensors", "missing.safetensors"],
+        {"a": ["/uploads/a.png?v=123"]},
+    )
+
+
+def test_tar_ranges_match_full_archive(tmp_path):
+    members = _members(tmp_path)
+    assert [m.name for m in members] == [
+        "a/a.safetensors",
+        "a/a-Images/a.png",
+        "b/b.safetensors",
+    ]
+    segments, size = tar_layout(members)
+    full = b"".join(iter_tar(segments, 0, size - 1))
+    assert len(full) == size
+    with tarfile.open(fileobj=io.BytesIO(full)) as tf:
+        assert tf.extractfile("a/a-Images/a.png").read() == b"png"
+    for start, end in [(0, 0), (500, 1500), (size - 10, size - 1)]:
+        assert b"".join(iter_tar(segments, start, end)) == full[start : end + 1]
+
+
+def test_zip_members_are_stored(tmp_path):
+    data = b"".join(iter_zip(_members(tmp_path)))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert {i.compress_type for i in zf.infolist()} == {zipfile.ZIP_STORED}
+        assert zf.read("b/b.safetensors") == b"b" * 512
+
+
+def test_archive_endpoint_supports_tar_range():
+    path = api.uploader.upload_dir / "archive_test.safetensors"
+    path.write_bytes(b"0123456789" * 100)
+    try:
+        full = client.get("/archive", params={"files": path.name, "format": "tar"})
+        assert full.status_code == 200
+        assert int(full.headers["content-length"]) == len(full.content)
+
+        part = client.get(
+            "/archive",
+            params={"files": path.name, "format": "tar"},
+            headers={"range": "bytes=100-", "if-range": full.headers["etag"]},
+        )
+        assert part.status_code == 206
+        assert part.content == full.content[100:]
+
+        zipped = client.get("/archive", params={"files": path.name})
+        assert zipped.headers["content-type"] == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(zipped.content)) as zf:
+            assert zf.namelist() == ["archive_test/archive_test.safetensors"]
+
+        assert client.get("/archive", params={"files": "../x"}).status_code == 400
+        assert client.get("/archive").status_code == 400
+    finally:
+        path.unlink(missing_ok=True)
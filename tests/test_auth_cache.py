@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from loradb.auth import AuthManager
+
+
+def _count_queries(auth):
+    queries = []
+    auth.conn.set_trace_callback(queries.append)
+    return queries
+
+
+def test_user_lookup_is_cached(tmp_path):
+    auth = AuthManager(db_path=tmp_path / "users.db")
+    auth.create_user("alice", "secret")
+    uid = auth.get_user("alice")["id"]
+    queries = _count_queries(auth)
+
+    assert auth.get_user_by_id(uid)["username"] == "alice"
+    # Callers may modify the returned dict without affecting the cache
+    auth.get_user_by_id(uid)["role"] = "admin"
+    assert auth.get_user_by_id(uid)["role"] == "user"
+    assert auth.get_user_by_id(uid + 1) is None
+    assert auth.get_user_by_id(uid + 1) is None
+    assert len(queries) == 2
+
+
+def test_cache_invalidated_on_user_changes(tmp_path):
+    auth = AuthManager(db_path=tmp_path / "users.db")
+    auth.create_user("bob", "secret")
+    uid = auth.get_user("bob")["id"]
+    assert auth.get_user_by_id(uid) is not None
+    auth.delete_user("bob")
+    assert auth.get_user_by_id(uid) is None
+
+    # A previously unknown id becomes valid once the user is created
+    assert auth.get_user_by_id(uid + 1) is None
+    auth.create_user("carol", "secret")
+    assert auth.get_user_by_id(uid + 1)["username"] == "carol"
+
+
+def test_cache_expires(tmp_path):
+    auth = AuthManager(db_path=tmp_path / "users.db", cache_ttl=0)
+    auth.create_user("dave", "secret")
+    uid = auth.get_user("dave")["id"]
+    queries = _count_queries(auth)
+    auth.get_user_by_id(uid)
+    auth.get_user_by_id(uid)
+    assert len(queries) == 2
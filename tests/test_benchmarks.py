@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks import compare
+from benchmarks.corpus import CATEGORIES, LAYOUTS, build_header, generate_corpus
+from loradb.agents.metadata_extractor_agent import MetadataExtractorAgent
+
+
+def test_corpus_models_have_realistic_headers(tmp_path):
+    categories = generate_corpus(tmp_path, 4, sdxl_ratio=0.5, previews=2, tags=5)
+    assert len(categories) == 4
+    assert all(set(names) <= set(CATEGORIES) for names in categories.values())
+
+    extractor = MetadataExtractorAgent()
+    path = tmp_path / "synthetic_lora_000000.safetensors"
+    meta = extractor.extract(path)
+    assert "error" not in meta
+    assert meta["ss_base_model_version"] in ("sd_v1", "sdxl_base_v1-0")
+    assert "ss_tag_frequency" in meta
+    header = extractor.read_header(path)
+    end = max(t["data_offsets"][1] for k, t in header.items() if k != "__metadata__")
+    header_size = int.from_bytes(path.read_bytes()[:8], "little")
+    # Tensor data is sparse but the file has its real size
+    assert path.stat().st_size == 8 + header_size + end
+    assert (tmp_path / "synthetic_lora_000000_1.png").read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
+
+    # Growing the corpus keeps existing files and yields the same categories
+    mtime = path.stat().st_mtime_ns
+    grown = generate_corpus(tmp_path, 6, sdxl_ratio=0.5, tags=5)
+    assert len(grown) == 6
+    assert {k: grown[k] for k in categories} == categories
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_sd15_layout_matches_kohya_keys():
+    header, data_size = build_header(LAYOUTS["sd15"], 8, {})
+    assert b'"lora_unet_down_blocks_0_attentions_0_transformer_blocks_0_attn2_to_k.lora_down.weight"' in header
+    assert b'"lora_te_text_model_encoder_layers_11_mlp_fc2.alpha"' in header
+    assert len(header) % 8 == 0
+    assert data_size > 0
+
+
+def test_compare_flags_regressions():
+    base = {(1000, "index.search"): 1.0, (1000, "route.grid"): 2.0}
+    new = {(1000, "index.search"): 1.5, (1000, "route.grid"): 2.1}
+    rows = compare.compare(base, new, threshold=0.1)
+    assert [(r["benchmark"], r["regression"]) for r in rows] == [
+        ("index.search", True),
+        ("route.grid", False),
+    ]
@@ -0,0 +1,91 @@
+import io
+import json
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import bulk_import
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.agents.uploader_agent import UploaderAgent
+
+
+def _write_model(path, title):
+    header = json.dumps(
+        {
+            "__metadata__": {"modelspec.title": title},
+            "w": {"dtype": "F32", "shape": [1], "data_offsets": [0, 4]},
+        }
+    ).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(struct.pack("<Q", len(header)) + header + bytes(4))
+
+
+def test_extract_metadata_reads_header(tmp_path):
+    path = tmp_path / "a.safetensors"
+    _write_model(path, "Alpha")
+    assert bulk_import.extract_metadata(path) == {
+        "filename": "a.safetensors",
+        "modelspec.title": "Alpha",
+    }
+    path.write_bytes(b"broken")
+    assert "error" in bulk_import.extract_metadata(path)
+
+
+def test_transfer_file_modes(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"payload")
+    for mode in bulk_import.TRANSFER_MODES:
+        dest = tmp_path / f"{mode}.bin"
+        used = bulk_import.transfer_file(src, dest, mode)
+        assert used in (mode, "copy")
+        assert dest.read_bytes() == b"payload"
+    assert (tmp_path / "hardlink.bin").samefile(src)
+    assert not list(tmp_path.glob(".*.part"))
+
+
+def test_import_resumes_from_journal(tmp_path):
+    safe_dir = tmp_path / "models"
+    img_dir = tmp_path / "images"
+    for stem in ("a", "b", "c"):
+        _write_model(safe_dir / "sub" / f"{stem}.safetensors", stem.upper())
+    (img_dir / "sub" / "a").mkdir(parents=True)
+    (img_dir / "sub" / "a" / "1.png").write_bytes(b"png")
+    uploader = UploaderAgent(upload_dir=tmp_path / "uploads")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    journal = bulk_import.ImportJournal(tmp_path / "import.journal")
+    progress = io.StringIO()
+
+    stats = bulk_import.import_loras(
+        safe_dir,
+        img_dir,
+        uploader,
+        indexer,
+        {"a.safetensors": ["Styles"]},
+        mode="hardlink",
+        workers=2,
+        batch_size=2,
+        journal=journal,
+        progress=progress,
+    )
+    journal.close()
+    assert (stats.imported, stats.skipped, stats.previews) == (3, 0, 1)
+    assert "files/s" in progress.getvalue()
+    assert indexer.get_entry("b.safetensors")["name"] == "B"
+    assert indexer.get_categories_for("a.safetensors") == ["Styles"]
+    assert (tmp_path / "uploads" / "a.png").read_bytes() == b"png"
+
+    # A rerun skips completed files and reimports modified ones
+    _write_model(safe_dir / "sub" / "c.safetensors", "C2")
+    journal = bulk_import.ImportJournal(tmp_path / "import.journal")
+    stats = bulk_import.import_loras(
+        safe_dir, img_dir, uploader, indexer, journal=journal
+    )
+    journal.close()
+    assert (stats.imported, stats.skipped) == (1, 2)
+    rows = indexer.conn.execute(
+        "SELECT name FROM lora_index WHERE filename = 'c.safetensors'"
+    ).fetchall()
+    assert rows == [("C2",)]
+    assert sorted(p.name for p in (tmp_path / "uploads").glob("a*.png")) == ["a.png"]
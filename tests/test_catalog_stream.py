@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import main
+from loradb.agents.indexing_agent import IndexingAgent
+
+client = TestClient(main.app)
+
+
+def test_iter_entries_filters_and_projects(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    for stem in ("alpha", "beta"):
+        indexer.add_metadata({"filename": f"{stem}.safetensors", "modelspec.title": stem})
+    cid = indexer.create_category("Styles")
+    indexer.assign_category("alpha.safetensors", cid)
+
+    rows = list(indexer.iter_entries(fields=["name"], with_categories=True, batch_size=1))
+    assert rows == [
+        {"filename": "alpha.safetensors", "name": "alpha", "categories": ["Styles"]},
+        {"filename": "beta.safetensors", "name": "beta", "categories": ["No Category"]},
+    ]
+    rows = list(indexer.iter_entries("beta", category_id=0, fields=[]))
+    assert rows == [{"filename": "beta.safetensors"}]
+
+
+def test_catalog_endpoint_streams_ndjson():
+    resp = client.get("/catalog.ndjson", params={"fields": "filename"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    for line in resp.text.splitlines():
+        assert set(json.loads(line)) == {"filename"}
@@ -0,0 +1,42 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import main
+from loradb.agents.indexing_agent import IndexingAgent
+
+client = TestClient(main.app)
+
+
+def test_mutations_are_recorded(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    start = indexer.current_seq()
+    indexer.add_metadata({"filename": "a.safetensors"})
+    cid = indexer.create_category("Styles")
+    indexer.create_category("Styles")
+    indexer.assign_category("a.safetensors", cid)
+    indexer.remove_metadata("a.safetensors")
+
+    kinds = [c["kind"] for c in indexer.changes_since(start)]
+    assert kinds == ["add", "category_create", "category_assign", "remove"]
+    assert indexer.changes_since(indexer.current_seq()) == []
+
+
+def test_compaction_forces_resync(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata({"filename": "a.safetensors"})
+    seq = indexer.current_seq()
+    indexer.compact_changes(max_age=-1)
+    assert indexer.change_floor() == seq
+    assert indexer.changes_since(seq) == []
+
+
+def test_changes_endpoint():
+    resp = client.get("/changes", params={"since": 0})
+    assert resp.status_code in (200, 410)
+    if resp.status_code == 200:
+        assert "last_seq" in resp.json()
+    assert client.get("/changes", params={"since": 10**12}).status_code == 410
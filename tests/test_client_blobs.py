@@ -0,0 +1,92 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from client.client import BlobStore, is_placeholder
+
+
+def _fetcher(content, calls, delay=0.0):
+    def download(path):
+        calls.append(path)
+        time.sleep(delay)
+        path.write_bytes(content)
+        return hashlib.sha256(content).hexdigest()
+
+    return download
+
+
+def test_concurrent_materialize_downloads_once(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    content = b"weights"
+    digest = hashlib.sha256(content).hexdigest()
+    calls = []
+    mounts = [tmp_path / f"mount{i}" for i in range(3)]
+    threads = []
+    for mount in mounts:
+        mount.mkdir()
+        dest = mount / "a.safetensors"
+        threads.append(
+            threading.Thread(
+                target=store.materialize,
+                args=(digest, dest, _fetcher(content, calls, delay=0.1)),
+            )
+        )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    for mount in mounts:
+        assert (mount / "a.safetensors").read_bytes() == content
+    assert store.total_bytes() == len(content)
+    assert not list((tmp_path / "blobs" / "tmp").iterdir())
+
+
+def test_hash_mismatch_keeps_no_blob(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    dest = tmp_path / "a.safetensors"
+    with pytest.raises(ValueError):
+        store.materialize("0" * 64, dest, _fetcher(b"other", []))
+    assert not store.blob_path("0" * 64).exists()
+    assert not dest.exists()
+    assert store.total_bytes() == 0
+    assert not list((tmp_path / "blobs" / "tmp").iterdir())
+
+
+def test_budget_evicts_blobs_and_their_links(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    mounts = [tmp_path / "one", tmp_path / "two"]
+    for mount in mounts:
+        mount.mkdir()
+    digests = {}
+    for name, content in (("old", b"o" * 100), ("used", b"u" * 100), ("new", b"n" * 100)):
+        digests[name] = hashlib.sha256(content).hexdigest()
+        for mount in mounts:
+            store.materialize(
+                digests[name], mount / f"{name}.safetensors", _fetcher(content, [])
+            )
+        time.sleep(0.01)
+    for name in ("old", "used", "new"):
+        store.record_access(digests[name])
+        time.sleep(0.01)
+
+    # "old" is the least recently used but still open in the second mount
+    keep = lambda path: path == (mounts[1] / "old.safetensors").resolve()
+    store.enforce_budget(200, "lru", keep)
+    assert store.total_bytes() == 200
+    assert not store.blob_path(digests["used"]).exists()
+    for mount in mounts:
+        assert is_placeholder(mount / "used.safetensors")
+        assert (mount / "used.safetensors").stat().st_size == 100
+        assert (mount / "old.safetensors").read_bytes() == b"o" * 100
+
+    store.enforce_budget(100, "lfu", lambda path: False)
+    assert store.total_bytes() == 100
+    assert store.blob_path(digests["new"]).exists()
+    assert is_placeholder(mounts[0] / "old.safetensors")
@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from client.client import CacheState, LazyDownloader, is_placeholder, write_placeholder
+
+
+def _downloader(tmp_path, **kwargs):
+    data_dir = tmp_path / "mount"
+    data_dir.mkdir()
+    return LazyDownloader("http://mylora.test", data_dir, prefetch=0, **kwargs)
+
+
+def _download(downloader, name, size, last_access, hits=1):
+    (downloader.data_dir / name).write_bytes(b"x" * size)
+    downloader.state.mark_downloaded(name, size)
+    for _ in range(hits):
+        downloader.state.record_access(name)
+    downloader.state.conn.execute(
+        "UPDATE cache_entries SET last_access = ? WHERE name = ?", (last_access, name)
+    )
+
+
+def test_placeholders_are_sparse(tmp_path):
+    path = tmp_path / "a.safetensors"
+    path.write_bytes(b"data")
+    write_placeholder(path, 1 << 20)
+    assert path.stat().st_size == 1 << 20
+    assert is_placeholder(path)
+    assert not list(tmp_path.glob(".*"))
+
+    path.write_bytes(b"data")
+    assert not is_placeholder(path)
+
+
+def test_state_migrates_old_schema(tmp_path):
+    db = tmp_path / "state.db"
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE cache_entries (name TEXT PRIMARY KEY, size INTEGER NOT NULL "
+        "DEFAULT 0, hits INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL DEFAULT 0)"
+    )
+    # Older versions stored placeholders with a size of zero
+    conn.executemany(
+        "INSERT INTO cache_entries(name, size, hits) VALUES (?, ?, ?)",
+        [("local.safetensors", 100, 2), ("remote.safetensors", 0, 0)],
+    )
+    conn.commit()
+    conn.close()
+
+    state = CacheState(db)
+    assert state.entry("local.safetensors") == (True, 100, None)
+    assert state.entry("remote.safetensors") == (False, 0, None)
+    assert state.hits(["local.safetensors"]) == {"local.safetensors": 2}
+    # Opening the migrated database again leaves it alone
+    assert CacheState(db).entry("local.safetensors") == (True, 100, None)
+
+
+def test_state_keeps_hash_of_placeholders(tmp_path):
+    state = CacheState(tmp_path / "state.db")
+    state.mark_placeholder("a.safetensors", 10, "abc")
+    state.mark_placeholder("a.safetensors", 12)
+    assert state.entry("a.safetensors") == (False, 12, "abc")
+    state.mark_downloaded("a.safetensors", 12)
+    assert state.is_downloaded("a.safetensors")
+    assert state.cached_bytes() == 12
+    state.forget("a.safetensors")
+    assert state.entry("a.safetensors") is None
+    assert state.names() == set()
+
+
+@pytest.mark.parametrize(
+    "eviction, evicted", [("lru", "old.safetensors"), ("lfu", "rare.safetensors")]
+)
+def test_budget_evicts_by_policy(tmp_path, eviction, evicted):
+    downloader = _downloader(tmp_path, cache_bytes=250, eviction=eviction)
+    _download(downloader, "old.safetensors", 100, last_access=1, hits=5)
+    _download(downloader, "rare.safetensors", 100, last_access=2, hits=1)
+    _download(downloader, "new.safetensors", 100, last_access=3, hits=3)
+
+    downloader.enforce_budget()
+    assert downloader.state.cached_bytes() == 200
+    assert is_placeholder(downloader.data_dir / evicted)
+    assert (downloader.data_dir / evicted).stat().st_size == 100
+    assert not downloader.state.is_downloaded(evicted)
+    assert downloader.state.entry(evicted)[1] == 100
+
+
+def test_budget_skips_open_files_and_counts_wasted_prefetches(tmp_path):
+    downloader = _downloader(tmp_path, cache_bytes=150)
+    _download(downloader, "open.safetensors", 100, last_access=1)
+    _download(downloader, "prefetched.safetensors", 100, last_access=2)
+    downloader.state.set_prefetched("prefetched.safetensors", True)
+    downloader.open_files["open.safetensors"] += 1
+
+    downloader.enforce_budget()
+    assert downloader.state.is_downloaded("open.safetensors")
+    assert not downloader.state.is_downloaded("prefetched.safetensors")
+    assert downloader.prefetch_stats()["wasted"] == 1
+
+
+def test_reconcile_restores_placeholders(tmp_path):
+    downloader = _downloader(tmp_path)
+    _download(downloader, "changed.safetensors", 100, last_access=1)
+    _download(downloader, "deleted.safetensors", 100, last_access=1)
+    (downloader.data_dir / "changed.safetensors").write_bytes(b"y" * 50)
+    (downloader.data_dir / "deleted.safetensors").unlink()
+    (downloader.data_dir / "copied.safetensors").write_bytes(b"z" * 10)
+    write_placeholder(downloader.data_dir / "empty.safetensors", 1 << 20)
+
+    downloader.reconcile()
+    for name in ("changed.safetensors", "deleted.safetensors"):
+        assert is_placeholder(downloader.data_dir / name)
+        assert downloader.state.entry(name) == (False, 100, None)
+    assert downloader.state.entry("copied.safetensors") == (True, 10, None)
+    assert downloader.state.entry("empty.safetensors") == (False, 1 << 20, None)
+
+
+def test_unknown_eviction_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        _downloader(tmp_path, eviction="fifo")
@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from client.client import NO_CATEGORY_NAME, CacheState, PrefetchPolicy
+
+
+def _policy(tmp_path, window=300.0):
+    return PrefetchPolicy(CacheState(tmp_path / "state.db"), window=window)
+
+
+def test_models_opened_together_are_predicted(tmp_path):
+    policy = _policy(tmp_path)
+    for start in (0, 1000, 2000):
+        policy.observe("base.safetensors", now=start)
+        policy.observe("base.safetensors", now=start + 1)
+        policy.observe("detail.safetensors", now=start + 10)
+    policy.observe("base.safetensors", now=3000)
+    policy.observe("other.safetensors", now=3010)
+
+    assert policy.state.co_accessed("base.safetensors", 5) == [
+        ("detail.safetensors", 3),
+        ("other.safetensors", 1),
+    ]
+    # Only models opened afterwards count, and reopening a file while
+    # loading it is not a co-access with itself
+    assert policy.state.co_accessed("detail.safetensors", 5) == []
+    assert ("base.safetensors", "base.safetensors") not in {
+        (a, b) for a, b, _ in policy.state.conn.execute("SELECT * FROM co_access")
+    }
+    assert policy.predict("base.safetensors", 1) == ["detail.safetensors"]
+
+
+def test_accesses_outside_the_window_are_unrelated(tmp_path):
+    policy = _policy(tmp_path, window=60)
+    policy.observe("a.safetensors", now=0)
+    policy.observe("b.safetensors", now=61)
+    assert policy.predict("a.safetensors", 3) == []
+
+
+def test_categories_predict_before_history_exists(tmp_path):
+    policy = _policy(tmp_path)
+    policy.set_categories("a.safetensors", ["Styles", "Anime"])
+    policy.set_categories("b.safetensors", ["Styles", "Anime"])
+    policy.set_categories("c.safetensors", ["Styles"])
+    policy.set_categories("d.safetensors", [NO_CATEGORY_NAME])
+    policy.set_categories("e.safetensors", [NO_CATEGORY_NAME])
+    assert policy.predict("a.safetensors", 3) == ["b.safetensors", "c.safetensors"]
+    assert policy.predict("d.safetensors", 3) == []
+
+    # Popular models win ties
+    policy.state.record_access("c.safetensors")
+    policy.set_categories("b.safetensors", ["Styles"])
+    assert policy.predict("a.safetensors", 1) == ["c.safetensors"]
+
+    policy.remove("c.safetensors")
+    assert policy.predict("a.safetensors", 3) == ["b.safetensors"]
+    assert "c.safetensors" not in policy.categories
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from client.client import LazyDownloader, is_placeholder
+
+
+class FakeServer:
+    """Serve ``/manifest``, ``/changes`` and ``/download`` from memory."""
+
+    def __init__(self):
+        self.models = {}
+        self.changes = []
+        self.floor = 0
+        self.downloads = 0
+
+    def add(self, name, content=b"weights", categories=(), hashed=True, log=True):
+        self.models[name] = {
+            "content": content,
+            "categories": list(categories),
+            "hashed": hashed,
+        }
+        if log:
+            self.log("add", name)
+
+    def remove(self, name):
+        del self.models[name]
+        self.log("remove", name)
+
+    def log(self, kind, filename=None):
+        self.changes.append(
+            {"seq": len(self.changes) + 1, "kind": kind, "filename": filename}
+        )
+
+    def _row(self, name, hashes):
+        model = self.models[name]
+        digest = hashlib.sha256(model["content"]).hexdigest()
+        return {
+            "filename": name,
+            "size": len(model["content"]),
+            "sha256": digest if hashes and model["hashed"] else None,
+            "categories": model["categories"] or ["No Category"],
+        }
+
+    def handle(self, request):
+        params = request.url.params
+        if request.url.path == "/manifest":
+            hashes = params.get("hashes") == "true"
+            if params.get("files"):
+                names = [n for n in params["files"].split(",") if n in self.models]
+            else:
+                names = sorted(self.models)
+            return httpx.Response(
+                200,
+                json={
+                    "seq": len(self.changes),
+                    "entries": [self._row(n, hashes) for n in names],
+                    "next": None,
+                },
+            )
+        if request.url.path == "/changes":
+            since = int(params["since"])
+            if since < self.floor:
+                return httpx.Response(410)
+            entries = self.changes[since:]
+            return httpx.Response(
+                200,
+                json={
+                    "changes": entries,
+                    "last_seq": entries[-1]["seq"] if entries else since,
+                    "has_more": False,
+                },
+            )
+        if request.url.path.startswith("/download/"):
+            self.downloads += 1
+            name = request.url.path.rsplit("/", 1)[1]
+            return httpx.Response(200, content=self.models[name]["content"])
+        return httpx.Response(404)
+
+
+def _downloader(tmp_path, server, mount="mount", **kwargs):
+    data_dir = tmp_path / mount
+    data_dir.mkdir()
+    downloader = LazyDownloader("http://mylora.test", data_dir, prefetch=0, **kwargs)
+    downloader.client = httpx.Client(transport=httpx.MockTransport(server.handle))
+    return downloader
+
+
+def test_full_sync_mirrors_catalogue(tmp_path):
+    server = FakeServer()
+    server.add("a.safetensors", b"aaaa", categories=["Styles"])
+    server.add("b.safetensors", b"bb")
+    downloader = _downloader(tmp_path, server)
+    (downloader.data_dir / "stale.safetensors").write_bytes(b"old")
+
+    downloader.sync_changes()
+    mount = downloader.data_dir
+    assert sorted(p.name for p in mount.glob("*.safetensors")) == [
+        "a.safetensors",
+        "b.safetensors",
+    ]
+    assert is_placeholder(mount / "a.safetensors")
+    assert (mount / "a.safetensors").stat().st_size == 4
+    assert downloader.state.entry("b.safetensors") == (False, 2, None)
+    assert downloader.policy.categories["a.safetensors"] == ["Styles"]
+    assert downloader.state.sync_value("since") == 2
+
+
+def test_incremental_sync_applies_changes(tmp_path):
+    server = FakeServer()
+    for name in ("a", "b", "c"):
+        server.add(f"{name}.safetensors")
+    downloader = _downloader(tmp_path, server)
+    downloader.sync_changes()
+
+    server.remove("a.safetensors")
+    # Replaced on the server: removed and added again
+    server.remove("b.safetensors")
+    server.add("b.safetensors", b"new weights")
+    server.add("d.safetensors")
+    # Added and removed again before the client looked
+    server.add("e.safetensors")
+    server.remove("e.safetensors")
+    # Logged, but gone by the time the manifest is read
+    server.log("add", "f.safetensors")
+    server.log("preview", "c.safetensors")
+    downloader.sync_changes()
+
+    mount = downloader.data_dir
+    assert sorted(p.name for p in mount.glob("*.safetensors")) == [
+        "b.safetensors",
+        "c.safetensors",
+        "d.safetensors",
+    ]
+    assert (mount / "b.safetensors").stat().st_size == len(b"new weights")
+    assert downloader.state.names() == {"b.safetensors", "c.safetensors", "d.safetensors"}
+    assert downloader.state.sync_value("since") == len(server.changes)
+
+
+def test_expired_position_and_category_delete_resync(tmp_path):
+    server = FakeServer()
+    server.add("a.safetensors", categories=["Styles"])
+    downloader = _downloader(tmp_path, server)
+    downloader.sync_changes()
+
+    # Deleting a category changes models without a change of their own
+    server.models["a.safetensors"]["categories"] = []
+    server.log("category_delete")
+    downloader.sync_changes()
+    assert downloader.policy.categories["a.safetensors"] == []
+
+    # History compacted past the stored position
+    server.add("b.safetensors", log=False)
+    server.log("add", "b.safetensors")
+    server.floor = len(server.changes)
+    downloader.sync_changes()
+    assert (downloader.data_dir / "b.safetensors").exists()
+    assert downloader.state.sync_value("since") == len(server.changes)
+
+
+def test_hash_changes_reach_placeholders(tmp_path):
+    server = FakeServer()
+    server.add("a.safetensors", hashed=False)
+    downloader = _downloader(tmp_path, server, blob_dir=tmp_path / "blobs")
+    downloader.sync_changes()
+    assert downloader.state.entry("a.safetensors")[2] is None
+
+    server.models["a.safetensors"]["hashed"] = True
+    server.log("hash", "a.safetensors")
+    downloader.sync_changes()
+    digest = hashlib.sha256(b"weights").hexdigest()
+    assert downloader.state.entry("a.safetensors") == (False, 7, digest)
+
+
+def test_mounts_share_downloaded_blobs(tmp_path):
+    server = FakeServer()
+    server.add("a.safetensors")
+    first = _downloader(tmp_path, server, "one", blob_dir=tmp_path / "blobs")
+    second = _downloader(tmp_path, server, "two", blob_dir=tmp_path / "blobs")
+    for downloader in (first, second):
+        downloader.sync_changes()
+        downloader.download("a.safetensors")
+        assert (downloader.data_dir / "a.safetensors").read_bytes() == b"weights"
+        assert downloader.is_local("a.safetensors")
+    assert server.downloads == 1
+
+    # Without a hash the model is fetched directly
+    server.add("b.safetensors", hashed=False)
+    first.sync_changes()
+    first.download("b.safetensors")
+    assert (first.data_dir / "b.safetensors").read_bytes() == b"weights"
+    assert server.downloads == 2
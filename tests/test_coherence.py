@@ -0,0 +1,66 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.auth import AuthManager
+from loradb.coherence import SharedGenerations, process_lock
+
+
+def test_bumps_reach_other_connections(tmp_path):
+    db = tmp_path / "index.db"
+    first, second = SharedGenerations(db), SharedGenerations(db)
+    seen = []
+    second.subscribe("previews", lambda value, updated: seen.append(value))
+    assert seen == [0]
+
+    second.poll()
+    assert seen == [0]
+    first.bump("previews")
+    first.bump("previews")
+    second.poll()
+    assert seen == [0, 2]
+    # Own bumps are applied by the caller and not reported again
+    second.bump("previews")
+    second.poll()
+    assert seen == [0, 2]
+
+
+def test_index_generation_is_shared(tmp_path):
+    db = tmp_path / "index.db"
+    worker_a = IndexingAgent(db_path=db)
+    worker_b = IndexingAgent(db_path=db)
+    worker_a.share(SharedGenerations(db))
+    shared_b = SharedGenerations(db)
+    worker_b.share(shared_b)
+
+    worker_a.add_metadata({"filename": "a.safetensors"})
+    assert worker_b.generation != worker_a.generation
+    shared_b.poll()
+    assert worker_b.generation == worker_a.generation
+    assert worker_b.last_modified >= worker_a.last_modified
+
+
+def test_user_changes_invalidate_other_workers(tmp_path):
+    db = tmp_path / "index.db"
+    worker_a, worker_b = AuthManager(db_path=db), AuthManager(db_path=db)
+    worker_a.share(SharedGenerations(db))
+    shared_b = SharedGenerations(db)
+    worker_b.share(shared_b)
+    worker_a.create_user("alice", "secret")
+    uid = worker_a.get_user("alice")["id"]
+    assert worker_b.get_user_by_id(uid) is not None
+
+    worker_a.delete_user("alice")
+    shared_b.poll()
+    assert worker_b.get_user_by_id(uid) is None
+
+
+def test_process_lock(tmp_path):
+    lock = tmp_path / "test.lock"
+    with process_lock(lock) as acquired:
+        assert acquired
+        with process_lock(lock, blocking=False) as again:
+            assert not again
+    with process_lock(lock, blocking=False) as acquired:
+        assert acquired
@@ -0,0 +1,50 @@
+import gzip
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.responses import CompressionMiddleware, FastJSONResponse
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/big", response_class=FastJSONResponse)
+async def big():
+    return FastJSONResponse(
+        [{"filename": f"m{i}.safetensors"} for i in range(200)],
+        headers={"etag": '"big"'},
+    )
+
+
+@app.get("/small", response_class=FastJSONResponse)
+async def small():
+    return FastJSONResponse({"status": "ok"})
+
+
+client = TestClient(app)
+
+
+def test_large_json_is_gzipped():
+    resp = client.get("/big", headers={"accept-encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert resp.headers["etag"] == 'W/"big"'
+    assert len(resp.json()) == 200
+
+
+def test_small_json_is_not_compressed():
+    resp = client.get("/small", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.json() == {"status": "ok"}
+
+
+def test_identity_when_not_accepted():
+    resp = client.get("/big", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["etag"] == '"big"'
+    assert len(resp.json()) == 200
@@ -0,0 +1,38 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import loradb.api as api
+import main
+
+client = TestClient(main.app)
+
+
+def test_categories_not_modified():
+    first = client.get("/categories")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert "private" in first.headers["cache-control"]
+    assert "Authorization" in first.headers["vary"]
+    second = client.get("/categories", headers={"if-none-match": etag})
+    assert second.status_code == 304
+    assert "Authorization" in second.headers["vary"]
+    assert second.content == b""
+
+
+def test_etag_changes_after_index_write():
+    etag = client.get("/grid_data").headers["etag"]
+    api.indexer._touch()
+    resp = client.get("/grid_data", headers={"if-none-match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+
+def test_etag_changes_after_preview_invalidation():
+    etag = client.get("/search", params={"query": "*"}).headers["etag"]
+    api.frontend.invalidate_preview_cache()
+    resp = client.get("/search", params={"query": "*"}, headers={"if-none-match": etag})
+    assert resp.status_code == 200
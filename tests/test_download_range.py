@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sys
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import loradb.api as api
+import main
+from loradb.agents.download_agent import DownloadAgent
+from loradb.file_response import RangeFileResponse, RangeNotSatisfiable, parse_range
+
+client = TestClient(main.app)
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+
+
+def test_download_stats_are_batched(tmp_path):
+    agent = DownloadAgent(db_path=tmp_path / "index.db", flush_interval=3600)
+    agent.record("a.safetensors", 0, 10)
+    agent.record("a.safetensors", 10, 5)
+    assert agent.conn.execute("SELECT COUNT(*) FROM download_stats").fetchone()[0] == 0
+    assert agent.stats() == [
+        {"filename": "a.safetensors", "downloads": 1, "bytes_served": 15}
+    ]
+    agent.flush()
+    assert agent.stats()[0]["bytes_served"] == 15
+
+
+def test_completion_callback_runs_off_the_event_loop(tmp_path):
+    path = tmp_path / "a.safetensors"
+    path.write_bytes(bytes(range(100)))
+    calls = []
+
+    def on_complete(offset, sent):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append((offset, sent))
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    response = RangeFileResponse(path, 10, 19, on_complete=on_complete)
+    anyio.run(response, {"type": "http", "method": "GET"}, receive, send)
+    assert calls == [(10, 10)]
+
+
+def test_download_range_request():
+    path = api.uploader.upload_dir / "range_test.safetensors"
+    path.write_bytes(bytes(range(100)))
+    try:
+        full = client.get("/download/range_test.safetensors")
+        assert full.status_code == 200
+        assert full.headers["accept-ranges"] == "bytes"
+        assert len(full.content) == 100
+
+        part = client.get(
+            "/download/range_test.safetensors", headers={"range": "bytes=10-19"}
+        )
+        assert part.status_code == 206
+        assert part.content == bytes(range(10, 20))
+        assert part.headers["content-range"] == "bytes 10-19/100"
+
+        stale = client.get(
+            "/download/range_test.safetensors",
+            headers={"range": "bytes=10-19", "if-range": '"outdated"'},
+        )
+        assert stale.status_code == 200
+        assert len(stale.content) == 100
+
+        bad = client.get(
+            "/download/range_test.safetensors", headers={"range": "bytes=200-"}
+        )
+        assert bad.status_code == 416
+
+        unchanged = client.get(
+            "/download/range_test.safetensors",
+            headers={"if-none-match": full.headers["etag"]},
+        )
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+    finally:
+        path.unlink(missing_ok=True)
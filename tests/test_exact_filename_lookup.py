@@ -1,9 +1,11 @@
 import os
+import sqlite3
 import sys
 from pathlib import Path
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from loradb import metrics
 from loradb.agents.indexing_agent import IndexingAgent
 
 
@@ -17,3 +19,65 @@ def test_exact_filename_lookup(tmp_path):
     entry = indexer.get_entry("Blossom.safetensors")
     assert entry is not None
     assert entry["filename"] == "Blossom.safetensors"
+
+
+def test_replacing_entries_deletes_by_rowid(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata_many(
+        [{"filename": f"m{i}.safetensors", "modelspec.title": "Old"} for i in range(3)]
+    )
+    statements = []
+    indexer.conn.set_trace_callback(statements.append)
+    indexer.add_metadata_many(
+        [
+            {"filename": "m1.safetensors", "modelspec.title": "New"},
+            {"filename": "m9.safetensors", "modelspec.title": "New"},
+        ]
+    )
+    indexer.conn.set_trace_callback(metrics.count_query)
+
+    deletes = [s for s in statements if s.startswith("DELETE FROM lora_index")]
+    assert len(deletes) == 1
+    assert "WHERE rowid IN" in deletes[0]
+    assert indexer.get_entry("m1.safetensors")["name"] == "New"
+    assert indexer.get_entry("m9.safetensors")["name"] == "New"
+    assert indexer.get_entry("m0.safetensors")["name"] == "Old"
+    count = indexer.conn.execute("SELECT COUNT(*) FROM lora_index").fetchone()[0]
+    assert count == 4
+
+    # New files only need inserts
+    statements.clear()
+    indexer.conn.set_trace_callback(statements.append)
+    indexer.add_metadata_many([{"filename": "m5.safetensors"}])
+    indexer.conn.set_trace_callback(metrics.count_query)
+    assert not [s for s in statements if s.startswith("DELETE FROM lora_index")]
+
+    indexer.remove_metadata("m1.safetensors")
+    assert indexer.get_entry("m1.safetensors") is None
+    assert indexer.get_entry("m5.safetensors") is not None
+
+
+def test_migration_drops_duplicate_rows(tmp_path):
+    db = tmp_path / "index.db"
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE VIRTUAL TABLE lora_index USING fts5("
+        "filename, name, architecture, tags, base_model)"
+    )
+    # Indexes from before ``lora_files`` could hold several rows per file
+    conn.executemany(
+        "INSERT INTO lora_index(filename, name) VALUES (?, ?)",
+        [
+            ("a.safetensors", "Old"),
+            ("b.safetensors", "Other"),
+            ("a.safetensors", "New"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    indexer = IndexingAgent(db_path=db)
+    assert indexer.get_entry("a.safetensors")["name"] == "New"
+    assert [e["name"] for e in indexer.search("a")] == ["New"]
+    count = indexer.conn.execute("SELECT COUNT(*) FROM lora_index").fetchone()[0]
+    assert count == 2
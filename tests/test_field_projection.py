@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.agents.indexing_agent import IndexingAgent
+
+
+def test_search_selects_requested_columns(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata(
+        {"filename": "a.safetensors", "modelspec.title": "A", "ss_tag_frequency": "{}"}
+    )
+
+    rows = indexer.search("*", fields=["name"])
+    assert rows == [{"filename": "a.safetensors", "name": "A"}]
+
+    cid = indexer.create_category("Styles")
+    indexer.assign_category("a.safetensors", cid)
+    rows = indexer.search_by_category(cid, fields=["filename"])
+    assert rows == [{"filename": "a.safetensors"}]
+
+
+def test_unknown_field_rejected(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    with pytest.raises(ValueError):
+        indexer.search("*", fields=["password_hash"])
@@ -58,3 +58,24 @@ def test_access_denied_page_for_user():
     assert "Permission, you have not" in resp.text
     assert "/static/accessdenied.jpg" in resp.text
     os.environ["TESTING"] = "1"
+
+
+def test_user_can_fetch_model_files_from_uploads():
+    os.environ.pop("TESTING", None)
+    import config
+
+    model = config.UPLOAD_DIR / "regular_access.safetensors"
+    model.write_bytes(b"model")
+    try:
+        auth = main.app.state.auth
+        auth.create_user("regular_files", "secret", role="user")
+        token = auth.create_token("regular_files")
+        headers = {"authorization": f"Bearer {token}"}
+        resp = client.get("/uploads/regular_access.safetensors", headers=headers)
+        assert resp.status_code == 200
+        assert resp.content == b"model"
+        # Admin pages sharing the prefix stay protected
+        assert client.get("/upload_wizard", headers=headers).status_code == 403
+    finally:
+        model.unlink()
+        os.environ["TESTING"] = "1"
@@ -0,0 +1,33 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import loradb.api as api
+import main
+
+client = TestClient(main.app)
+
+
+def test_healthz():
+    response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_reports_indexing_progress(monkeypatch):
+    indexer = api.indexer.get()
+    monkeypatch.setattr(indexer, "progress", {"state": "indexing", "done": 5, "total": 8})
+    indexer.ready.clear()
+    try:
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json() == {"state": "indexing", "done": 5, "total": 8}
+    finally:
+        indexer.ready.set()
+    monkeypatch.setattr(indexer, "progress", {"state": "ready", "done": 8, "total": 8})
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["state"] == "ready"
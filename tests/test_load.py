@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks import load
+
+SCENARIO = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "scenarios", "mixed.toml")
+
+
+def test_shipped_scenario_parses():
+    scenario = load.load_scenario(SCENARIO)
+    assert {g.name for g in scenario.groups} == {"guest", "scroller", "uploader"}
+    scroller = next(g for g in scenario.groups if g.name == "scroller")
+    grid = next(a for a in scroller.actions if a.route == "grid_data")
+    assert grid.scroll == 10 and grid.previews
+    assert scenario.base_url == "" and scenario.testing
+
+
+def test_percentiles_and_report():
+    values = sorted(i / 1000 for i in range(1, 101))
+    assert load.percentile(values, 50) == 0.05
+    assert load.percentile(values, 99) == 0.099
+    assert load.percentile([], 95) == 0.0
+
+    recorder = load.Recorder()
+    recorder.add("grid", 1.0, ok=True)  # before the measured window
+    recorder.started = 0.0
+    for value in values:
+        recorder.add("grid", value, ok=value < 0.1, size=10)
+    recorder.stopped = 10.0
+    report = recorder.report()
+    grid = report["routes"]["grid"]
+    assert (grid["requests"], grid["errors"], grid["bytes"]) == (100, 1, 1000)
+    assert grid["throughput"] == 10.0
+    assert report["requests"] == 100
+
+
+def test_scrolling_paths_walk_pages():
+    group = load.UserGroup("u", 1, [load.Action("grid", "/grid_data?offset={offset}", scroll=2)])
+    user = load.User(group, None, load.Recorder(), ["a.safetensors"], [], random.Random(0))
+    paths = [user._path(group.actions[0]) for _ in range(3)]
+    assert paths == ["/grid_data?offset=0", "/grid_data?offset=50", "/grid_data?offset=0"]
+    assert user._path(load.Action("d", "/detail/{model}")) == "/detail/a.safetensors"
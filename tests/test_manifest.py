@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import loradb.api as api
+import main
+from loradb.agents.frontend_agent import FrontendAgent
+from loradb.agents.indexing_agent import IndexingAgent
+
+client = TestClient(main.app)
+
+
+def test_page_entries_uses_cursor(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    for stem in ("alpha", "beta", "gamma"):
+        indexer.add_metadata({"filename": f"{stem}.safetensors", "modelspec.title": stem})
+
+    first, cursor = indexer.page_entries(limit=2, fields=["name"])
+    assert [e["filename"] for e in first] == ["alpha.safetensors", "beta.safetensors"]
+    assert cursor is not None
+    # Removing an entry already returned must not shift the next page
+    indexer.remove_metadata("alpha.safetensors")
+    second, cursor = indexer.page_entries(after=cursor, limit=2, with_categories=True)
+    assert [e["filename"] for e in second] == ["gamma.safetensors"]
+    assert second[0]["categories"] == ["No Category"]
+    assert cursor is None
+
+
+def test_file_hash_is_cached(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    path = tmp_path / "model.safetensors"
+    path.write_bytes(b"weights")
+    assert indexer.file_hash(path) == hashlib.sha256(b"weights").hexdigest()
+    row = indexer.conn.execute("SELECT size FROM file_hashes").fetchone()
+    assert row[0] == len(b"weights")
+
+    path.write_bytes(b"new weights")
+    assert indexer.file_hash(path) == hashlib.sha256(b"new weights").hexdigest()
+    assert indexer.file_hash(tmp_path / "missing.safetensors") is None
+
+
+def test_cached_hashes_do_not_read_files(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    path = tmp_path / "model.safetensors"
+    path.write_bytes(b"weights")
+    seq = indexer.current_seq()
+    assert indexer.cached_hashes([path, tmp_path / "missing.safetensors"]) == {
+        path.name: None
+    }
+    deadline = time.monotonic() + 10
+    while indexer.pending_hashes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    digest = hashlib.sha256(b"weights").hexdigest()
+    assert indexer.cached_hashes([path]) == {path.name: digest}
+    assert indexer.hash_seq() > 0
+    # Synchronising clients learn about the new digest from the change feed
+    changes = indexer.changes_since(seq)
+    assert [(c["kind"], c["filename"]) for c in changes] == [("hash", path.name)]
+
+
+def test_find_previews_bulk_matches_single_lookup(tmp_path):
+    for name in ("a.png", "a_1.png", "a_1_2.jpg", "a_other.png", "b.jpg"):
+        (tmp_path / name).write_bytes(b"img")
+    bulk = FrontendAgent(tmp_path, tmp_path).find_previews_bulk(["a", "a_1", "b", "c"])
+    single = FrontendAgent(tmp_path, tmp_path)
+    for stem in ("a", "a_1", "b", "c"):
+        assert bulk[stem] == single._find_previews(stem)
+    assert [u.split("?")[0] for u in bulk["a"]] == ["/uploads/a.png", "/uploads/a_1.png"]
+
+
+def test_manifest_endpoint():
+    upload_dir = api.uploader.upload_dir
+    path = upload_dir / "manifest_test.safetensors"
+    preview = upload_dir / "manifest_test.png"
+    path.write_bytes(b"0123456789")
+    preview.write_bytes(b"png")
+    api.indexer.add_metadata(
+        {"filename": path.name, "modelspec.title": "Manifest Test"}
+    )
+    api.frontend.invalidate_preview_cache("manifest_test")
+    try:
+        entries = []
+        after = 0
+        while True:
+            resp = client.get(
+                "/manifest", params={"after": after, "limit": 2, "hashes": "true"}
+            )
+            assert resp.status_code == 200
+            payload = resp.json()
+            assert "seq" in payload
+            entries.extend(payload["entries"])
+            if payload["next"] is None:
+                break
+            after = payload["next"]
+        entry = next(e for e in entries if e["filename"] == path.name)
+        assert entry["size"] == 10
+        # Hashes are computed in the background instead of by the request
+        assert entry["sha256"] is None
+        assert entry["categories"] == ["No Category"]
+        assert [u.split("?")[0] for u in entry["previews"]] == [
+            "/uploads/manifest_test.png"
+        ]
+
+        deadline = time.monotonic() + 10
+        while api.indexer.pending_hashes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        hashed = client.get("/manifest", params={"files": path.name, "hashes": "true"})
+        digest = hashlib.sha256(b"0123456789").hexdigest()
+        assert hashed.json()["entries"][0]["sha256"] == digest
+
+        cached = client.get(
+            "/manifest", params={"files": path.name, "hashes": "true"},
+            headers={"if-none-match": hashed.headers["etag"]},
+        )
+        assert cached.status_code == 304
+
+        selected = client.get(
+            "/manifest",
+            params={"files": f"{path.name},missing.safetensors"},
+        ).json()
+        assert [e["filename"] for e in selected["entries"]] == [path.name]
+        # Without ``hashes`` digests are neither returned nor scheduled
+        assert selected["entries"][0]["sha256"] is None
+        path.write_bytes(b"replaced")
+        client.get("/manifest", params={"files": path.name})
+        assert not api.indexer.pending_hashes
+        assert client.get("/manifest", params={"files": "../x"}).status_code == 400
+    finally:
+        api.indexer.remove_metadata(path.name)
+        path.unlink(missing_ok=True)
+        preview.unlink(missing_ok=True)
+        api.frontend.invalidate_preview_cache("manifest_test")
@@ -0,0 +1,91 @@
+import io
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+from loradb import metrics
+from loradb.agents.frontend_agent import FrontendAgent
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.agents.uploader_agent import UploaderAgent
+import main
+
+client = TestClient(main.app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    hist = registry.histogram("test_seconds", "Test.", ("op",), buckets=(0.1, 1.0))
+    hist.observe(0.05, op="a")
+    hist.observe(0.5, op="a")
+    hist.observe(3, op="a")
+    text = registry.render()
+    assert 'test_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{op="a",le="1"} 2' in text
+    assert 'test_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 'test_seconds_count{op="a"} 3' in text
+    assert "# TYPE test_seconds histogram" in text
+
+
+def test_label_values_are_escaped():
+    registry = metrics.Registry()
+    registry.counter("test_total", "Test.", ("path",)).inc(path='a"b\\c')
+    assert 'test_total{path="a\\"b\\\\c"} 1' in registry.render()
+
+
+def test_metrics_endpoint_reports_route_templates():
+    client.get("/healthz")
+    client.get("/detail/missing.safetensors")
+    client.get("/no/such/page")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'mylora_http_requests_total{route="/healthz",method="GET",status="200"}' in text
+    assert 'route="/detail/{filename}",method="GET",status="404"' in text
+    assert 'route="unmatched",method="GET",status="404"' in text
+    assert "missing.safetensors" not in text
+    assert "mylora_http_requests_in_flight 1" in text
+    assert "mylora_upload_bytes_total" in text
+
+
+def test_index_methods_are_timed_and_queries_counted(tmp_path):
+    indexer = IndexingAgent(tmp_path / "index.db", defer_index=True)
+    calls = metrics.INDEX_CALLS.count(method="lora_count")
+    queries = metrics.INDEX_QUERIES.value(method="lora_count")
+    indexer.lora_count()
+    assert metrics.INDEX_CALLS.count(method="lora_count") == calls + 1
+    assert metrics.INDEX_QUERIES.value(method="lora_count") > queries
+    # Statements of nested calls are counted for the innermost method
+    before = metrics.INDEX_QUERIES.value(method="add_metadata")
+    indexer.add_metadata({"filename": "a.safetensors", "name": "A"})
+    assert metrics.INDEX_QUERIES.value(method="add_metadata") == before
+    assert metrics.INDEX_CALLS.count(method="add_metadata_many") > 0
+
+
+def test_preview_cache_lookups_are_counted(tmp_path):
+    frontend = FrontendAgent(tmp_path, tmp_path)
+    (tmp_path / "model.png").write_bytes(b"png")
+    hits = metrics.CACHE_REQUESTS.value(cache="preview", result="hit")
+    misses = metrics.CACHE_REQUESTS.value(cache="preview", result="miss")
+    frontend._find_previews("model")
+    frontend._find_previews("model")
+    frontend.find_previews_bulk(["model", "other"])
+    assert metrics.CACHE_REQUESTS.value(cache="preview", result="hit") == hits + 2
+    assert metrics.CACHE_REQUESTS.value(cache="preview", result="miss") == misses + 2
+    assert 'mylora_cache_hit_ratio{cache="preview"}' in metrics.REGISTRY.render()
+
+
+def test_upload_bytes_are_counted(tmp_path):
+    class Upload:
+        def __init__(self, name, data):
+            self.filename = name
+            self.file = io.BytesIO(data)
+
+    uploader = UploaderAgent(tmp_path)
+    before = metrics.UPLOAD_BYTES.value()
+    uploader.save_files([Upload("a.safetensors", b"x" * 100)])
+    uploader.save_preview_files("a", [Upload("p.png", b"y" * 20)])
+    assert metrics.UPLOAD_BYTES.value() == before + 120
@@ -17,8 +17,19 @@ def test_preview_filtering(tmp_path):
     (tmp_path / "Mizuki_Furui_SDXL_10.png").write_text("a")
 
     agent = FrontendAgent(tmp_path, Path("loradb/templates"))
-    previews = agent._find_previews("Mizuki")
+    previews = [url.split("?")[0] for url in agent._find_previews("Mizuki")]
 
     assert "/uploads/Mizuki.png" in previews
     assert "/uploads/Mizuki_18.png" in previews
     assert "/uploads/Mizuki_Furui_SDXL_10.png" not in previews
+
+
+def test_preview_url_changes_on_replacement(tmp_path):
+    (tmp_path / "Mizuki.png").write_text("a")
+    agent = FrontendAgent(tmp_path, Path("loradb/templates"))
+    before = agent._find_previews("Mizuki")
+    assert before[0].startswith("/uploads/Mizuki.png?v=")
+
+    (tmp_path / "Mizuki.png").write_text("replacement")
+    after = agent.refresh_preview_cache("Mizuki")
+    assert after != before
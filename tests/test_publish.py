@@ -0,0 +1,77 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+from loradb.agents.frontend_agent import FrontendAgent
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.agents.publish_agent import PublishAgent
+
+
+def _setup(tmp_path, **kwargs):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    frontend = FrontendAgent(uploads, uploads)
+    publisher = PublishAgent(
+        indexer, uploads, tmp_path / "published", frontend=frontend, **kwargs
+    )
+    return uploads, indexer, frontend, publisher
+
+
+def test_publish_follows_index_changes(tmp_path):
+    uploads, indexer, frontend, publisher = _setup(tmp_path)
+    (uploads / "a.safetensors").write_bytes(b"weights")
+    (uploads / "a.png").write_bytes(b"png")
+    indexer.add_metadata({"filename": "a.safetensors"})
+    publisher.sync()
+
+    root = tmp_path / "published"
+    link = root / "No Category" / "a.safetensors"
+    assert link.samefile(uploads / "a.safetensors")
+    assert (root / "No Category" / "a.preview.png").samefile(uploads / "a.png")
+
+    cid = indexer.create_category("Styles/Anime")
+    indexer.assign_category("a.safetensors", cid)
+    assert publisher.sync() == (2, 2)
+    assert (root / "Styles_Anime" / "a.safetensors").exists()
+    # Emptied directories are cleaned up
+    assert not (root / "No Category").exists()
+
+    # Unchanged entries are not touched again
+    indexer.record_change("preview", "a.safetensors")
+    assert publisher.sync() == (0, 0)
+
+    indexer.remove_metadata("a.safetensors")
+    assert publisher.sync() == (0, 2)
+    assert list(root.iterdir()) == []
+
+
+def test_publish_rebuilds_on_category_delete(tmp_path):
+    uploads, indexer, _, publisher = _setup(
+        tmp_path, template="{base_model}/{category}/{stem}", mode="symlink"
+    )
+    (uploads / "b.safetensors").write_bytes(b"weights")
+    indexer.add_metadata({"filename": "b.safetensors", "ss_base_model_version": "sdxl"})
+    cid = indexer.create_category("Faces")
+    indexer.assign_category("b.safetensors", cid)
+    publisher.sync()
+    link = tmp_path / "published" / "sdxl" / "Faces" / "b.safetensors"
+    assert link.is_symlink()
+
+    indexer.delete_category(cid)
+    publisher.sync()
+    assert not link.exists()
+    assert (tmp_path / "published" / "sdxl" / "No Category" / "b.safetensors").exists()
+
+
+def test_publish_leaves_foreign_files(tmp_path):
+    uploads, indexer, _, publisher = _setup(tmp_path)
+    (uploads / "c.safetensors").write_bytes(b"weights")
+    indexer.add_metadata({"filename": "c.safetensors"})
+    publisher.sync()
+    foreign = tmp_path / "published" / "No Category" / "notes.txt"
+    foreign.write_text("keep")
+    indexer.remove_metadata("c.safetensors")
+    publisher.sync()
+    assert foreign.read_text() == "keep"
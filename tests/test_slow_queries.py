@@ -0,0 +1,90 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+from loradb import query_log
+from loradb.agents.indexing_agent import IndexingAgent
+import main
+
+client = TestClient(main.app)
+
+
+def _indexer(tmp_path, log):
+    indexer = IndexingAgent(tmp_path / "index.db", defer_index=True)
+    indexer.conn.query_log = log
+    return indexer
+
+
+def test_slow_statements_are_recorded_with_plan(tmp_path, caplog):
+    log = query_log.SlowQueryLog(threshold=0)
+    indexer = _indexer(tmp_path, log)
+    indexer.add_metadata_many(
+        {"filename": f"m{i}.safetensors", "name": f"Model {i}"} for i in range(3)
+    )
+    log.clear()
+    indexer.search("*", limit=2)
+    indexer.search("*", limit=5)
+    [entry] = [e for e in log.top() if e["sql"].startswith("SELECT filename")]
+    assert entry["count"] == 2
+    assert entry["rows"] == 3
+    assert entry["params"] == "(5, 0)"
+    assert entry["plan"].startswith("SCAN")
+    assert "Slow query" in caplog.text
+
+
+def test_statements_below_threshold_are_ignored(tmp_path):
+    log = query_log.SlowQueryLog(threshold=10)
+    indexer = _indexer(tmp_path, log)
+    indexer.lora_count()
+    assert log.top() == []
+
+
+def test_rows_are_counted_across_fetches(tmp_path):
+    log = query_log.SlowQueryLog(threshold=0)
+    conn = query_log.connect(tmp_path / "t.db", log)
+    conn.execute("CREATE TABLE t(x)")
+    conn.executemany("INSERT INTO t VALUES (?)", ((i,) for i in range(10)))
+    cur = conn.execute("SELECT x FROM t WHERE x >= ?", (2,))
+    cur.fetchmany(3)
+    assert list(cur) == [(i,) for i in range(5, 10)]
+    entries = {e["sql"]: e for e in log.top()}
+    assert entries["SELECT x FROM t WHERE x >= ?"]["rows"] == 8
+    assert entries["INSERT INTO t VALUES (?)"]["rows"] == 10
+    assert entries["INSERT INTO t VALUES (?)"]["params"] == "(0,)"
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (10,)
+
+
+def test_top_limits_and_sorts(tmp_path):
+    log = query_log.SlowQueryLog(threshold=0, max_statements=2)
+    conn = query_log.connect(tmp_path / "t.db", log)
+    for sql in ("SELECT 1", "SELECT 2", "SELECT 3"):
+        log.record(conn, sql, (), 0.5 if sql == "SELECT 2" else 0.1, 1)
+    log.record(conn, "SELECT 3", (), 0.1, 1)
+    assert [e["sql"] for e in log.top()] == ["SELECT 2", "SELECT 3"]
+    assert [e["sql"] for e in log.top(sort="count")][0] == "SELECT 3"
+    assert len(log.top(limit=1)) == 1
+
+
+def test_admin_page_lists_slow_queries(monkeypatch):
+    monkeypatch.setattr(query_log.SLOW_QUERIES, "threshold", 0)
+    client.get("/grid_data")
+    response = client.get("/admin/slow_queries", params={"sort": "max"})
+    assert response.status_code == 200
+    assert any("FROM lora_index" in e["sql"] for e in response.json())
+    html = client.get("/admin/slow_queries", headers={"accept": "text/html"})
+    assert "Slow Queries" in html.text
+    assert client.get("/admin/slow_queries", params={"sort": "rows"}).status_code == 400
+    assert client.post("/admin/slow_queries/clear").json() == {"status": "ok"}
+    assert query_log.SLOW_QUERIES.top() == []
+
+
+def test_admin_page_escapes_parameters(tmp_path):
+    conn = query_log.connect(tmp_path / "t.db")
+    query_log.SLOW_QUERIES.record(conn, "SELECT ?", ("<script>x</script>",), 1.0, 1)
+    html = client.get("/admin/slow_queries", headers={"accept": "text/html"}).text
+    query_log.SLOW_QUERIES.clear()
+    assert "<script>x" not in html
+    assert "&lt;script&gt;x" in html
@@ -0,0 +1,168 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+import config
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.coherence import process_lock
+from loradb.agents.metadata_extractor_agent import MetadataExtractorAgent
+from loradb.lazy import Lazy
+
+#: Seconds a cold ``import main`` may take, including interpreter start.
+IMPORT_BUDGET = float(os.environ.get("MYLORA_IMPORT_BUDGET", "5"))
+
+
+def _write_model(path, title):
+    header = json.dumps(
+        {
+            "__metadata__": {"modelspec.title": title},
+            "b": {"dtype": "F32", "shape": [1], "data_offsets": [0, 4]},
+            "a": {"dtype": "F32", "shape": [1], "data_offsets": [4, 8]},
+        }
+    ).encode("utf-8")
+    path.write_bytes(struct.pack("<Q", len(header)) + header + bytes(8))
+
+
+def test_import_main_within_budget():
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        "import loradb.api as api\n"
+        "print(time.perf_counter() - start)\n"
+        "print('torch' in sys.modules, api.indexer.built, api.uploader.built)\n"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "TESTING": "1"},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    total = time.perf_counter() - start
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.strip().splitlines()
+    # Importing must neither load torch nor build any agent
+    assert lines[-1] == "False False False"
+    assert total < IMPORT_BUDGET, f"import main took {total:.2f}s ({lines[-2]}s in import)"
+
+
+def test_initial_index_runs_in_background(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    for stem in ("a", "b", "c"):
+        _write_model(uploads / f"{stem}.safetensors", stem.upper())
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(IndexingAgent, "REINDEX_BATCH", 2)
+
+    indexer = IndexingAgent(db_path=tmp_path / "index.db", defer_index=True)
+    assert not indexer.ready.is_set()
+    assert indexer.index_status() == {"state": "pending", "done": 0, "total": 0}
+    indexer.start_initial_index().join(timeout=10)
+    assert indexer.ready.is_set()
+    assert indexer.index_status() == {"state": "ready", "done": 3, "total": 3}
+    assert indexer.get_entry("b.safetensors")["name"] == "B"
+
+    # A populated index is ready right away
+    again = IndexingAgent(db_path=tmp_path / "index.db", defer_index=True)
+    assert again.ready.is_set()
+    assert again.start_initial_index() is None
+
+
+
+def test_initial_index_waits_for_other_writes(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    _write_model(uploads / "a.safetensors", "A")
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(uploads))
+    indexer = IndexingAgent(db_path=tmp_path / "index.db", defer_index=True)
+
+    # An open transaction on the shared connection must not be committed
+    # by the indexing thread
+    with indexer.write_lock:
+        indexer.conn.execute("INSERT INTO categories(name) VALUES ('Draft')")
+        thread = indexer.start_initial_index()
+        time.sleep(0.2)
+        assert indexer.index_status()["done"] == 0
+        indexer.conn.rollback()
+    thread.join(timeout=10)
+    assert indexer.index_status()["done"] == 1
+    assert indexer.get_entry("a.safetensors")["name"] == "A"
+    assert indexer.conn.execute("SELECT COUNT(*) FROM categories").fetchone() == (0,)
+
+
+def test_other_workers_wait_for_the_initial_index(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    _write_model(uploads / "a.safetensors", "A")
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(IndexingAgent, "INDEX_POLL_INTERVAL", 0.05)
+    db = tmp_path / "index.db"
+    holding, release = threading.Event(), threading.Event()
+
+    def other_worker():
+        # Stands in for a worker process building the index
+        with process_lock(db.with_name("index.db.lock")):
+            holding.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=other_worker)
+    holder.start()
+    holding.wait(5)
+    try:
+        start = time.monotonic()
+        indexer = IndexingAgent(db_path=db, defer_index=True)
+        assert time.monotonic() - start < 1
+        thread = indexer.start_initial_index()
+        time.sleep(0.2)
+        assert not indexer.ready.is_set()
+        assert indexer.index_status()["state"] == "indexing"
+    finally:
+        release.set()
+        holder.join()
+    # The other worker exited without finishing, so this one takes over
+    thread.join(timeout=10)
+    assert indexer.ready.is_set()
+    assert indexer.get_entry("a.safetensors")["name"] == "A"
+    assert IndexingAgent(db_path=db, defer_index=True).ready.is_set()
+
+def test_extractor_reads_header_only(tmp_path):
+    path = tmp_path / "m.safetensors"
+    _write_model(path, "Model")
+    meta = MetadataExtractorAgent().extract(path, include_tensor_keys=True)
+    assert meta == {
+        "filename": "m.safetensors",
+        "modelspec.title": "Model",
+        "tensor_keys": "a,b",
+    }
+    path.write_bytes(struct.pack("<Q", 1 << 40))
+    assert "error" in MetadataExtractorAgent().extract(path)
+
+
+def test_lazy_builds_once_and_forwards():
+    calls = []
+
+    class Agent:
+        value = 1
+
+    def factory():
+        calls.append(1)
+        return Agent()
+
+    proxy = Lazy(factory)
+    assert not proxy.built and calls == []
+    proxy.value = 2
+    assert proxy.value == 2 and proxy.get().value == 2
+    assert calls == [1]
+    with pytest.raises(AttributeError):
+        proxy.missing
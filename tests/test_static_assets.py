@@ -0,0 +1,65 @@
+import os
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import config
+from loradb import static_assets
+from loradb.agents.frontend_agent import FrontendAgent
+import main
+
+client = TestClient(main.app)
+
+
+def test_fingerprinted_preview_is_immutable():
+    preview = config.UPLOAD_DIR / "fingerprint_test.png"
+    preview.write_bytes(b"png")
+    try:
+        url = static_assets.asset_url(
+            "/uploads", config.UPLOAD_DIR, preview.name, content=False
+        )
+        resp = client.get(url)
+        assert resp.headers["cache-control"] == static_assets.IMMUTABLE_POLICY
+        resp = client.get(f"/uploads/{preview.name}?v=outdated")
+        assert resp.headers["cache-control"] == static_assets.REVALIDATE_POLICY
+    finally:
+        preview.unlink()
+
+
+def test_model_versions_are_not_hashed(monkeypatch):
+    model = config.UPLOAD_DIR / "fingerprint_test.safetensors"
+    model.write_bytes(b"model")
+
+    def fail(path, content=True):
+        raise AssertionError(f"{path} was hashed")
+
+    monkeypatch.setattr(static_assets, "fingerprint", fail)
+    try:
+        resp = client.get(f"/uploads/{model.name}?v=anything")
+        assert resp.status_code == 200
+        assert resp.headers["cache-control"] == static_assets.REVALIDATE_POLICY
+    finally:
+        model.unlink()
+
+
+def test_preview_urls_do_not_read_files(tmp_path, monkeypatch):
+    (tmp_path / "a.png").write_bytes(b"png")
+    (tmp_path / "b_1.jpg").write_bytes(b"jpg")
+    frontend = FrontendAgent(tmp_path, config.TEMPLATE_DIR)
+
+    def fail(self, *args, **kwargs):
+        raise AssertionError(f"{self} was read")
+
+    monkeypatch.setattr(Path, "open", fail)
+    [url] = frontend._find_previews("a")
+    assert url.startswith("/uploads/a.png?v=")
+    assert frontend.find_previews_bulk(["b"])["b"][0].startswith("/uploads/b_1.jpg?v=")
+    monkeypatch.undo()
+
+    # Replacing a preview changes its URL
+    os.utime(tmp_path / "a.png", ns=(1, 1))
+    frontend.invalidate_preview_cache("a")
+    assert frontend._find_previews("a") != [url]
@@ -0,0 +1,124 @@
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+from loradb.agents import watch_agent
+from loradb.agents.frontend_agent import FrontendAgent
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.agents.uploader_agent import UploaderAgent
+from loradb.agents.watch_agent import WatchAgent
+
+
+def _write_model(path, title):
+    header = json.dumps({"__metadata__": {"modelspec.title": title}}).encode("utf-8")
+    path.write_bytes(struct.pack("<Q", len(header)) + header)
+
+
+def _setup(tmp_path, **kwargs):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    frontend = FrontendAgent(uploads, uploads)
+    uploader = UploaderAgent(upload_dir=uploads, frontend=frontend, indexer=indexer)
+    watcher = WatchAgent(uploader, indexer, frontend, debounce=0.05, **kwargs)
+    return uploads, indexer, frontend, watcher
+
+
+def _settle(watcher, handled=1):
+    deadline = time.monotonic() + 5
+    count = 0
+    while count < handled and time.monotonic() < deadline:
+        time.sleep(watcher.debounce)
+        watcher.poll_changes()
+        count += watcher.process_pending()
+    return count
+
+
+def test_reconcile_adds_missing_and_drops_stale_rows(tmp_path):
+    uploads, indexer, _, watcher = _setup(tmp_path, use_inotify=False)
+    _write_model(uploads / "new.safetensors", "New")
+    indexer.add_metadata({"filename": "gone.safetensors"})
+    assert watcher.reconcile() == (1, 1)
+    assert indexer.get_entry("new.safetensors")["name"] == "New"
+    assert indexer.get_entry("gone.safetensors") is None
+    assert watcher.reconcile() == (0, 0)
+
+
+def test_polling_indexes_settled_files(tmp_path):
+    uploads, indexer, frontend, watcher = _setup(tmp_path, use_inotify=False)
+    watcher.reconcile()
+    watcher.poll_changes()
+
+    # Hidden temporary files are ignored until renamed into place
+    tmp = uploads / ".a.safetensors.part"
+    _write_model(tmp, "A")
+    watcher.poll_changes()
+    assert not watcher.pending
+    tmp.rename(uploads / "a.safetensors")
+    assert _settle(watcher) == 1
+    assert indexer.get_entry("a.safetensors")["name"] == "A"
+
+    seq = indexer.current_seq()
+    assert frontend._find_previews("a") == []
+    (uploads / "a.png").write_bytes(b"png")
+    assert _settle(watcher) == 1
+    assert len(frontend._find_previews("a")) == 1
+    changes = indexer.changes_since(seq)
+    assert [(c["kind"], c["filename"]) for c in changes] == [("preview", "a.safetensors")]
+
+    (uploads / "a.safetensors").unlink()
+    assert _settle(watcher) == 1
+    assert indexer.get_entry("a.safetensors") is None
+
+
+def test_files_indexed_by_the_api_are_not_reindexed(tmp_path):
+    uploads, indexer, _, watcher = _setup(tmp_path, use_inotify=False)
+    watcher.poll_changes()
+    _write_model(uploads / "b.safetensors", "B")
+    indexer.add_metadata(watcher.extractor.extract(uploads / "b.safetensors"))
+    seq = indexer.current_seq()
+    assert _settle(watcher) == 1
+    assert indexer.changes_since(seq) == []
+    assert indexer.lora_count() == 1
+
+
+
+def test_watcher_waits_for_open_write_transactions(tmp_path):
+    uploads, indexer, _, watcher = _setup(tmp_path, use_inotify=False)
+    watcher.poll_changes()
+    _write_model(uploads / "c.safetensors", "C")
+    watcher.poll_changes()
+
+    with indexer.write_lock:
+        indexer.conn.execute("INSERT INTO categories(name) VALUES ('Draft')")
+        thread = threading.Thread(target=watcher.process_pending, args=(True,))
+        thread.start()
+        thread.join(timeout=0.2)
+        assert thread.is_alive()
+        indexer.conn.rollback()
+    thread.join(timeout=5)
+    assert indexer.get_entry("c.safetensors")["name"] == "C"
+    assert indexer.conn.execute("SELECT COUNT(*) FROM categories").fetchone() == (0,)
+
+@pytest.mark.skipif(watch_agent.INotify is None, reason="inotify_simple not installed")
+def test_inotify_service(tmp_path):
+    uploads, indexer, _, watcher = _setup(tmp_path)
+    thread = watcher.start()
+    try:
+        time.sleep(0.2)
+        _write_model(uploads / "c.safetensors", "C")
+        deadline = time.monotonic() + 5
+        while indexer.get_entry("c.safetensors") is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert indexer.get_entry("c.safetensors")["name"] == "C"
+    finally:
+        watcher.stop()
+        thread.join(timeout=5)
+    assert not thread.is_alive()
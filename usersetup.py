@@ -10,11 +10,18 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Create an admin user")
     parser.add_argument("user", help="username")
     parser.add_argument("password", help="password")
+    parser.add_argument(
+        "--api-token",
+        action="store_true",
+        help="also create an API token for scripted clients and print it",
+    )
     args = parser.parse_args()
 
     auth = AuthManager()
     auth.create_user(args.user, args.password, role="admin")
     print(f"Admin user '{args.user}' created")
+    if args.api_token:
+        print(f"API token: {auth.create_token(args.user, name='usersetup')}")
 
 
 if __name__ == "__main__":